@@ -0,0 +1,46 @@
+"""Add content hash to embedding tables
+
+Revision ID: a7c3e1d9b254
+Revises: f41ba96cab17
+Create Date: 2026-10-19 09:12:44.518203
+
+"""
+
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+from src.config.config import settings
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c3e1d9b254"  # pragma: allowlist secret
+down_revision: Union[str, None] = "f41ba96cab17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger()
+
+embedding_tables = [
+    f"data_{settings.DB_EMBEDDING_TABLE_FOR_PRODUCTS}",
+    f"data_{settings.DB_EMBEDDING_TABLE_FOR_REVIEWS}",
+]
+
+
+def upgrade() -> None:
+    for table_name in embedding_tables:
+        op.execute(
+            f"ALTER TABLE IF EXISTS {table_name} ADD COLUMN IF NOT EXISTS content_hash VARCHAR;",
+        )
+        # Syncs upsert and delete rows by node_id
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {table_name}_node_id_idx ON {table_name} (node_id);",
+        )
+        logger.info(f"Added content_hash column to {table_name}")
+
+
+def downgrade() -> None:
+    for table_name in embedding_tables:
+        op.execute(f"DROP INDEX IF EXISTS {table_name}_node_id_idx;")
+        op.execute(
+            f"ALTER TABLE IF EXISTS {table_name} DROP COLUMN IF EXISTS content_hash;",
+        )
@@ -0,0 +1,127 @@
+"""Add catalog cache tables
+
+Revision ID: b2f4c8e1a3d7
+Revises: a7c3e1d9b254
+Create Date: 2026-10-19 13:40:21.372915
+
+"""
+
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b2f4c8e1a3d7"  # pragma: allowlist secret
+down_revision: Union[str, None] = "a7c3e1d9b254"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger()
+
+# Tables whose rows are part of a product detail or product list response, with the
+# version keys their changes bump besides the products'. Product list pages only show
+# products, their images and average ratings; ratings are left to lag there, so that
+# reviews and stock updates don't invalidate every page.
+catalog_tables = {
+    "products": ["catalog"],
+    "product_images": ["catalog"],
+    "variants": [],
+    "variant_attributes": [],
+    "product_reviews": ["reviews"],
+}
+trigger_events = {
+    "insert": "REFERENCING NEW TABLE AS new_rows",
+    "update": "REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows",
+    "delete": "REFERENCING OLD TABLE AS old_rows",
+}
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS catalog_cache_versions (
+            key TEXT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """,
+    )
+    # Shared cache tier. Entries are disposable, so skip the WAL.
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS catalog_cache_entries (
+            key TEXT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            body BYTEA NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """,
+    )
+    # Bumps, once per statement, the versions of the changed products and the keys given
+    # as trigger arguments, and notifies listening workers of them.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_catalog_cache_version() RETURNS trigger AS $$
+        DECLARE
+            id_column TEXT := CASE
+                WHEN TG_TABLE_NAME = 'products' THEN 'id' ELSE 'product_id'
+            END;
+            changed_rows TEXT := CASE TG_OP
+                WHEN 'INSERT' THEN 'SELECT %1$I FROM new_rows'
+                WHEN 'DELETE' THEN 'SELECT %1$I FROM old_rows'
+                ELSE 'SELECT %1$I FROM new_rows UNION SELECT %1$I FROM old_rows'
+            END;
+            cache_keys TEXT[];
+            cache_key TEXT;
+            new_version BIGINT;
+        BEGIN
+            EXECUTE format(
+                'SELECT array_agg(DISTINCT ''product:'' || %1$I) '
+                'FROM (' || changed_rows || ') changed WHERE %1$I IS NOT NULL',
+                id_column
+            ) INTO cache_keys;
+            IF cache_keys IS NULL THEN
+                RETURN NULL;
+            END IF;
+            cache_keys := cache_keys || TG_ARGV;
+
+            -- Sorted, so that concurrent statements lock the keys in the same order
+            FOR cache_key, new_version IN
+                INSERT INTO catalog_cache_versions (key, version)
+                SELECT key, 1 FROM unnest(cache_keys) AS key ORDER BY key
+                ON CONFLICT (key) DO UPDATE
+                SET version = catalog_cache_versions.version + 1, updated_at = now()
+                RETURNING key, version
+            LOOP
+                PERFORM pg_notify('catalog_cache', cache_key || '=' || new_version);
+            END LOOP;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+    )
+    for table_name, version_keys in catalog_tables.items():
+        trigger_args = ", ".join(f"'{key}'" for key in version_keys)
+        for event, referencing in trigger_events.items():
+            op.execute(
+                f"""
+                CREATE OR REPLACE TRIGGER {table_name}_catalog_cache_version_{event}
+                AFTER {event.upper()} ON {table_name}
+                {referencing}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_cache_version({trigger_args});
+                """,
+            )
+        logger.info(f"Added catalog cache version triggers to {table_name}")
+
+
+def downgrade() -> None:
+    for table_name in catalog_tables:
+        for event in trigger_events:
+            op.execute(
+                f"DROP TRIGGER IF EXISTS {table_name}_catalog_cache_version_{event} ON {table_name};",
+            )
+    op.execute("DROP FUNCTION IF EXISTS bump_catalog_cache_version();")
+    op.execute("DROP TABLE IF EXISTS catalog_cache_entries;")
+    op.execute("DROP TABLE IF EXISTS catalog_cache_versions;")
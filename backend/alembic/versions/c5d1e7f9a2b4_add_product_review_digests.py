@@ -0,0 +1,35 @@
+"""Add product review digests
+
+Revision ID: c5d1e7f9a2b4
+Revises: b2f4c8e1a3d7
+Create Date: 2026-10-19 16:05:47.120384
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d1e7f9a2b4"  # pragma: allowlist secret
+down_revision: Union[str, None] = "b2f4c8e1a3d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One digest per product, rebuilt when the fingerprint of its reviews changes
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS product_review_digests (
+            product_id INTEGER PRIMARY KEY REFERENCES products (id) ON DELETE CASCADE,
+            digest JSONB NOT NULL,
+            source_hash TEXT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS product_review_digests;")
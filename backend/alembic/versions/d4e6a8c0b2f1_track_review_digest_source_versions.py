@@ -0,0 +1,34 @@
+"""Track review digest source versions
+
+Revision ID: d4e6a8c0b2f1
+Revises: a9d3f5b7c1e2
+Create Date: 2026-10-19 23:12:08.530417
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4e6a8c0b2f1"  # pragma: allowlist secret
+down_revision: Union[str, None] = "a9d3f5b7c1e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Catalog cache version of the product (`product:{id}`) a digest was built at. The
+    # product_reviews triggers bump it, so a digest is stale once the version moved past it.
+    op.execute(
+        """
+        ALTER TABLE product_review_digests
+        ADD COLUMN IF NOT EXISTS source_version BIGINT;
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "ALTER TABLE product_review_digests DROP COLUMN IF EXISTS source_version;",
+    )
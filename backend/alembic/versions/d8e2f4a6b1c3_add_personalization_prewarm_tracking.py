@@ -0,0 +1,51 @@
+"""Add personalization prewarm tracking
+
+Revision ID: d8e2f4a6b1c3
+Revises: c5d1e7f9a2b4
+Create Date: 2026-10-19 17:32:08.564213
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d8e2f4a6b1c3"  # pragma: allowlist secret
+down_revision: Union[str, None] = "c5d1e7f9a2b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # How often each product page was opened, a signal for what to pre-generate
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS product_views (
+            product_id INTEGER PRIMARY KEY REFERENCES products (id) ON DELETE CASCADE,
+            view_count BIGINT NOT NULL DEFAULT 0,
+            last_viewed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """,
+    )
+    # What generated a section, and whether it was ready when the user first opened it
+    op.execute(
+        """
+        ALTER TABLE personalized_product_sections
+            ADD COLUMN IF NOT EXISTS source VARCHAR(16) NOT NULL DEFAULT 'on_demand',
+            ADD COLUMN IF NOT EXISTS first_viewed_at TIMESTAMPTZ,
+            ADD COLUMN IF NOT EXISTS served_warm BOOLEAN;
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE personalized_product_sections
+            DROP COLUMN IF EXISTS served_warm,
+            DROP COLUMN IF EXISTS first_viewed_at,
+            DROP COLUMN IF EXISTS source;
+        """,
+    )
+    op.execute("DROP TABLE IF EXISTS product_views;")
@@ -0,0 +1,38 @@
+"""Add personalization input versions
+
+Revision ID: e3f5a7c9b2d4
+Revises: d8e2f4a6b1c3
+Create Date: 2026-10-19 19:04:51.218374
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3f5a7c9b2d4"  # pragma: allowlist secret
+down_revision: Union[str, None] = "d8e2f4a6b1c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Versions of the inputs a section was generated from, and the agents that contributed
+    op.execute(
+        """
+        ALTER TABLE personalized_product_sections
+            ADD COLUMN IF NOT EXISTS input_versions JSONB,
+            ADD COLUMN IF NOT EXISTS agents JSONB;
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE personalized_product_sections
+            DROP COLUMN IF EXISTS agents,
+            DROP COLUMN IF EXISTS input_versions;
+        """,
+    )
@@ -0,0 +1,88 @@
+"""Add shared rate limit buckets
+
+Revision ID: f7a9c1e3d5b8
+Revises: e3f5a7c9b2d4
+Create Date: 2026-10-19 20:11:37.904512
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f7a9c1e3d5b8"  # pragma: allowlist secret
+down_revision: Union[str, None] = "e3f5a7c9b2d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Token buckets shared by the workers' rate governors
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            name TEXT PRIMARY KEY,
+            tokens DOUBLE PRECISION NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+        );
+        """,
+    )
+    # Refills the buckets, then takes `amounts` from all of them if they all fit. Returns
+    # 0 when they were taken, otherwise the seconds until they fit.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION take_rate_limit_tokens(
+            bucket_names TEXT[],
+            capacities DOUBLE PRECISION[],
+            amounts DOUBLE PRECISION[],
+            period DOUBLE PRECISION
+        ) RETURNS DOUBLE PRECISION AS $$
+        DECLARE
+            taken_at TIMESTAMPTZ := clock_timestamp();
+            available DOUBLE PRECISION[] := '{}';
+            current_tokens DOUBLE PRECISION;
+            wait DOUBLE PRECISION := 0;
+        BEGIN
+            INSERT INTO rate_limit_buckets (name, tokens)
+            SELECT name, capacity FROM unnest(bucket_names, capacities) AS b (name, capacity)
+            ON CONFLICT (name) DO NOTHING;
+
+            FOR i IN 1 .. array_length(bucket_names, 1) LOOP
+                SELECT LEAST(
+                    capacities[i],
+                    tokens + capacities[i] / period
+                        * GREATEST(extract(epoch FROM taken_at - updated_at), 0)
+                )
+                INTO current_tokens
+                FROM rate_limit_buckets
+                WHERE name = bucket_names[i]
+                FOR UPDATE;
+
+                available := available || current_tokens;
+                wait := GREATEST(
+                    wait,
+                    (LEAST(amounts[i], capacities[i]) - current_tokens) / (capacities[i] / period)
+                );
+            END LOOP;
+
+            FOR i IN 1 .. array_length(bucket_names, 1) LOOP
+                UPDATE rate_limit_buckets
+                SET tokens = available[i]
+                        - CASE WHEN wait <= 0 THEN LEAST(amounts[i], capacities[i]) ELSE 0 END,
+                    updated_at = taken_at
+                WHERE name = bucket_names[i];
+            END LOOP;
+
+            RETURN GREATEST(wait, 0);
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "DROP FUNCTION IF EXISTS take_rate_limit_tokens(TEXT[], DOUBLE PRECISION[], DOUBLE PRECISION[], DOUBLE PRECISION);",
+    )
+    op.execute("DROP TABLE IF EXISTS rate_limit_buckets;")
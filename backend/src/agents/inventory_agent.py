@@ -1,23 +1,29 @@
+from typing import Dict, List, Optional
+
 from llama_index.core import SQLDatabase
 from llama_index.core.agent.workflow import FunctionAgent
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.base.llms.base import BaseLLM
 from llama_index.core.query_engine import NLSQLTableQueryEngine
-from llama_index.core.tools import QueryEngineTool, ToolMetadata
+from llama_index.core.tools import FunctionTool, QueryEngineTool, ToolMetadata
 from src.agents.prompts import INVENTORY_AGENT_PROMPT
 from src.config.config import settings
 from src.database import sync_engine as engine
 from src.schemas.enums import AgentNames
+from src.services.variant_index import describe_product_variants, match_product_variants
 
 
 def get_inventory_agent(
     llm: BaseLLM,
     embed_model: BaseEmbedding,
+    product_id: Optional[int] = None,
 ):
     """
     Creates FunctionAgent configured to interact with a product inventory database.
     Args:
         llm: The language model to be used for natural language processing and query generation.
+        product_id: The current product. When given, its variants are matched in memory and
+            the NL to SQL tool is only a fallback.
     Returns:
         FunctionAgent: An agent configured to query product inventory information from the database.
     """
@@ -48,6 +54,32 @@ def get_inventory_agent(
         ),
     )
 
+    tools = [database_tool]
+    if product_id is not None:
+
+        async def product_variant_attributes() -> Dict[str, List[str]]:
+            """
+            Returns every variant attribute of the current product with its distinct values.
+            """
+            return await describe_product_variants(product_id)
+
+        async def find_product_variants(preferences: Dict[str, List[str]]) -> dict:
+            """
+            Finds the variants of the current product matching the user's preferences.
+
+            `preferences` maps each attribute name to the list of values the user prefers,
+            e.g. color to black and grey. A variant matches when it has one of the preferred
+            values of every attribute. Returns the matching variants with their attributes,
+            price, units in stock and stock level.
+            """
+            return await match_product_variants(product_id, preferences)
+
+        tools = [
+            FunctionTool.from_defaults(product_variant_attributes),
+            FunctionTool.from_defaults(find_product_variants),
+            database_tool,
+        ]
+
     agent = FunctionAgent(
         name=AgentNames.INVENTORY_AGENT.value,
         description=(
@@ -55,7 +87,7 @@ def get_inventory_agent(
             "profile data and available product attributes."
         ),
         llm=llm,
-        tools=[database_tool],
+        tools=tools,
         verbose=settings.VERBOSE,
         system_prompt=INVENTORY_AGENT_PROMPT,
     )
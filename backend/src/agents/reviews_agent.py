@@ -17,38 +17,47 @@ def get_reviews_agent(
     embed_model: BaseEmbedding,
     vector_store: BasePydanticVectorStore,
     filters: MetadataFilters,
+    with_review_search: bool = True,
 ):
+    """
+    Builds the reviews agent.
 
-    index = VectorStoreIndex.from_vector_store(
-        vector_store=vector_store,
-        embed_model=embed_model,
-    )
+    Products with a review digest get it in the agent's input, so their agent is built
+    without `with_review_search` and answers in a single LLM call. The others need the
+    agent to search and summarize their raw reviews.
+    """
+    tools = []
+    if with_review_search:
+        index = VectorStoreIndex.from_vector_store(
+            vector_store=vector_store,
+            embed_model=embed_model,
+        )
 
-    query_engine = index.as_query_engine(
-        similarity_top_k=settings.TOP_K,
-        verbose=settings.VERBOSE,
-        use_async=True,
-        llm=llm,
-        filters=filters,
-    )
+        query_engine = index.as_query_engine(
+            similarity_top_k=settings.TOP_K,
+            verbose=settings.VERBOSE,
+            use_async=True,
+            llm=llm,
+            filters=filters,
+        )
 
-    query_engine_tools = [
-        QueryEngineTool(
-            query_engine=query_engine,
-            metadata=ToolMetadata(
-                name="product_reviews_summarization",
-                description=(
-                    "Retrieves, summarizes and answers questions about customer reviews for a specified product."
+        tools.append(
+            QueryEngineTool(
+                query_engine=query_engine,
+                metadata=ToolMetadata(
+                    name="product_reviews_summarization",
+                    description=(
+                        "Retrieves, summarizes and answers questions about customer reviews for a specified product."
+                    ),
                 ),
             ),
-        ),
-    ]
+        )
 
     return FunctionAgent(
         name=AgentNames.REVIEWS_AGENT.value,
         description="Extracts and summarizes product review insights that align with user preferences or queries.",
         llm=llm,
-        tools=query_engine_tools,
+        tools=tools,
         verbose=settings.VERBOSE,
         allow_parallel_tool_calls=False,
         system_prompt=REVIEWS_AGENT_PROMPT,
@@ -12,7 +12,7 @@ from openinference.instrumentation.llama_index import get_current_span
 from sqlalchemy import text
 from src.agents.prompts import USER_QUERY_AGENT_PROMPT
 from src.config.config import settings
-from src.database import Session
+from src.database import GraphSession, Session
 from src.logging import logger
 from src.schemas.enums import AgentNames, EventType, StatusEnum, UserQueryAgentAction
 from src.services.agent_workflow import MultiAgentWorkflowService
@@ -318,8 +318,7 @@ class UserQueryAgent:
         sentiment = sentiments_map.get(sentiment, "positive_sentiment")
         logger.info("Sentiment being passed to cypher query: %s", sentiment)
 
-        async with Session() as db:
-            await db.execute(text('SET search_path = ag_catalog, "$user", public;'))
+        async with GraphSession() as db:
             cypher_query = text(
                 f"""
                     SELECT * FROM ag_catalog.cypher('product_review_graph', $$
@@ -0,0 +1,180 @@
+"""
+Throughput benchmark for catalog response paths.
+
+Requests are sent in-process through an ASGI transport, so the numbers are the requests
+per second a single worker can serve, without network or uvicorn overhead.
+
+Usage:
+    python -m src.benchmarks.catalog_responses serialization [--reviews N] [--seconds S]
+    python -m src.benchmarks.catalog_responses detail [--product-id ID] [--seconds S]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Awaitable, Callable
+
+import httpx
+from fastapi import FastAPI
+from src.database import Session
+from src.repository import ProductRepository
+from src.routes.utils import json_bytes_response, serialize
+from src.schemas.products import ProductDetailsResponseSchema
+from src.schemas.reviews import PaginatedReviewResponseSchema, ReviewResponseSchema
+
+
+async def measure(
+    app: FastAPI,
+    path: str,
+    seconds: float,
+    concurrency: int,
+) -> dict:
+    """Sends requests to `path` from `concurrency` clients for `seconds`."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+    ) as client:
+        # Warm up route and serializer caches.
+        (await client.get(path)).raise_for_status()
+
+        requests = 0
+        deadline = time.perf_counter() + seconds
+
+        async def send() -> None:
+            nonlocal requests
+            while time.perf_counter() < deadline:
+                (await client.get(path)).raise_for_status()
+                requests += 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(send() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started_at
+
+    return {
+        "path": path,
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 1),
+    }
+
+
+async def run_benchmarks(
+    app: FastAPI,
+    paths: list[str],
+    seconds: float,
+    concurrency: int,
+) -> None:
+    results = [await measure(app, path, seconds, concurrency) for path in paths]
+    print(json.dumps(results, indent=2))
+
+
+def build_serialization_app(
+    reviews: int,
+) -> tuple[FastAPI, list[str]]:
+    """
+    Serves the same review page through the `response_model` path and the bytes path.
+
+    Rows are plain attribute objects standing in for ORM instances, so only validation
+    and serialization are measured.
+    """
+    rows = [
+        SimpleNamespace(
+            id=i,
+            user_name=f"user_{i}",
+            review=f"Review number {i}. " * 20,
+            rating=4.5,
+            created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        )
+        for i in range(reviews)
+    ]
+
+    def build_page() -> PaginatedReviewResponseSchema:
+        return PaginatedReviewResponseSchema(
+            page=1,
+            page_size=reviews,
+            total=reviews,
+            reviews=[ReviewResponseSchema.model_validate(row) for row in rows],
+        )
+
+    app = FastAPI()
+
+    @app.get("/response-model", response_model=PaginatedReviewResponseSchema)
+    async def response_model_path():
+        return build_page()
+
+    @app.get("/bytes", response_model=PaginatedReviewResponseSchema)
+    async def bytes_path():
+        return json_bytes_response(serialize(build_page()))
+
+    return app, ["/response-model", "/bytes"]
+
+
+def build_detail_app(product_id: int) -> tuple[FastAPI, list[str]]:
+    """
+    Serves a product detail page from the ORM path and from the SQL-assembled document.
+
+    Neither route is cached, so each request measures the full database round trips and
+    response assembly.
+    """
+    app = FastAPI()
+
+    @app.get("/orm/{product_id}", response_model=ProductDetailsResponseSchema)
+    async def orm_path(product_id: int):
+        async with Session() as db:
+            product = await ProductRepository(db).get_by_id(product_id)
+            return json_bytes_response(
+                serialize(ProductDetailsResponseSchema.model_validate(product)),
+            )
+
+    @app.get("/sql/{product_id}", response_model=ProductDetailsResponseSchema)
+    async def sql_path(product_id: int):
+        async with Session() as db:
+            document = await ProductRepository(db).get_detail_json(product_id)
+            return json_bytes_response(document)
+
+    return app, [f"/orm/{product_id}", f"/sql/{product_id}"]
+
+
+BENCHMARKS: dict[str, Callable[[argparse.Namespace], Awaitable[None]]] = {
+    "serialization": lambda args: run_benchmarks(
+        *build_serialization_app(args.reviews),
+        args.seconds,
+        args.concurrency,
+    ),
+    "detail": lambda args: run_benchmarks(
+        *build_detail_app(args.product_id),
+        args.seconds,
+        args.concurrency,
+    ),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.benchmarks.catalog_responses")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serialization_parser = subparsers.add_parser(
+        "serialization",
+        help="Compare response_model validation with pre-serialized bytes responses.",
+    )
+    serialization_parser.add_argument("--reviews", type=int, default=500)
+
+    detail_parser = subparsers.add_parser(
+        "detail",
+        help="Compare the ORM product detail path with the SQL-assembled document.",
+    )
+    detail_parser.add_argument("--product-id", type=int, default=1)
+
+    for subparser in subparsers.choices.values():
+        subparser.add_argument("--seconds", type=float, default=10.0)
+        subparser.add_argument("--concurrency", type=int, default=8)
+
+    args = parser.parse_args()
+    asyncio.run(BENCHMARKS[args.command](args))
+
+
+if __name__ == "__main__":
+    main()
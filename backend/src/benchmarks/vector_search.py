@@ -0,0 +1,324 @@
+"""
+Recall/latency benchmark for PGDiskAnnVectorStore search settings.
+
+Ground truth is computed with an exact sequential scan of the same `data_*` table, then every
+configuration of the parameter grid is searched with the same query set. Index parameters
+(`pq_param_num_chunks`) are applied by rebuilding the index, search parameters
+(`diskann_l_value_is`, `quantized_fetch_limit`, `use_reranking`) per query.
+
+Usage:
+    python -m src.benchmarks.vector_search generate --table NAME [--rows N] [--clusters N]
+    python -m src.benchmarks.vector_search run --table NAME [--queries FILE] [--grid FILE]
+        [--top-k K] [--output results.json|results.csv]
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+from sqlalchemy import func, select
+from src.config.config import settings
+from src.config.embed_model import EmbedModelManager
+from src.config.vector_store import VectorStoreManager
+from src.llama_index.vector_stores.pgdiskann import PGDiskAnnVectorStore
+from src.logging import logger
+
+DEFAULT_GRID = {
+    "diskann_l_value_is": [32, 64, 128],
+    "quantized_fetch_limit": [20, 50, 100],
+    "use_reranking": [True, False],
+    "pq_param_num_chunks": [None],
+}
+INDEX_PARAMETERS = ("pq_param_num_chunks",)
+
+
+def generate_synthetic_nodes(
+    rows: int,
+    dim: int,
+    clusters: int = 50,
+    spread: float = 0.3,
+    seed: int = 42,
+) -> Iterator[TextNode]:
+    """Yields nodes with unit vectors drawn around random cluster centers.
+
+    Clustered data is closer to real embeddings than uniform noise, where every point is
+    almost equidistant from every other and recall numbers are meaningless.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    for i in range(rows):
+        cluster = int(rng.integers(clusters))
+        vector = centers[cluster] + spread * rng.standard_normal(dim)
+        vector /= np.linalg.norm(vector)
+        yield TextNode(
+            id_=f"synthetic_{i}",
+            text=f"Synthetic row {i}",
+            metadata={"cluster": cluster},
+            embedding=vector.tolist(),
+        )
+
+
+def perturb(
+    embeddings: List[List[float]],
+    noise: float,
+    seed: int,
+) -> List[List[float]]:
+    rng = np.random.default_rng(seed)
+    queries = []
+    for embedding in embeddings:
+        vector = np.asarray(embedding) + noise * rng.standard_normal(len(embedding))
+        queries.append((vector / np.linalg.norm(vector)).tolist())
+    return queries
+
+
+async def load_queries(
+    vector_store: PGDiskAnnVectorStore,
+    queries_path: Optional[Path],
+    sample_size: int,
+    noise: float,
+    seed: int,
+) -> List[List[float]]:
+    """Loads the query set.
+
+    The file holds a JSON list of query texts, embedded with the configured model, or of
+    vectors. Without a file, stored vectors are sampled and perturbed, so that queries do
+    not trivially match a row.
+    """
+    if queries_path:
+        queries = json.loads(queries_path.read_text())
+        texts = [query for query in queries if isinstance(query, str)]
+        if not texts:
+            return queries
+        embed_model = await EmbedModelManager.get_embed_model()
+        embeddings = iter(await embed_model.aget_text_embedding_batch(texts))
+        return [
+            next(embeddings) if isinstance(query, str) else query for query in queries
+        ]
+
+    with vector_store._session() as session:
+        sample = (
+            session.execute(
+                select(vector_store._table_class.embedding)
+                .order_by(func.random())
+                .limit(sample_size),
+            )
+            .scalars()
+            .all()
+        )
+    return perturb([list(embedding) for embedding in sample], noise, seed)
+
+
+def iter_configurations(grid: Dict[str, List[Any]]) -> Iterator[Dict[str, Any]]:
+    """Yields the grid's configurations grouped by index parameters.
+
+    Configurations sharing index parameters are adjacent, so the index is rebuilt once
+    per distinct combination.
+    """
+    index_keys = [key for key in grid if key in INDEX_PARAMETERS]
+    search_keys = [key for key in grid if key not in INDEX_PARAMETERS]
+    for index_values in itertools.product(*(grid[key] for key in index_keys)):
+        for search_values in itertools.product(*(grid[key] for key in search_keys)):
+            yield {
+                **dict(zip(index_keys, index_values)),
+                **dict(zip(search_keys, search_values)),
+            }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_configuration(
+    vector_store: PGDiskAnnVectorStore,
+    queries: List[List[float]],
+    ground_truth: List[List[str]],
+    top_k: int,
+    configuration: Dict[str, Any],
+) -> Dict[str, Any]:
+    vector_store.use_reranking = configuration.get(
+        "use_reranking",
+        vector_store.use_reranking,
+    )
+    search_kwargs = {
+        key: configuration[key]
+        for key in ("diskann_l_value_is", "quantized_fetch_limit")
+        if configuration.get(key) is not None
+    }
+
+    latencies = []
+    found = 0
+    started_at = time.perf_counter()
+    for embedding, expected in zip(queries, ground_truth):
+        query_started_at = time.perf_counter()
+        result = vector_store.query(
+            VectorStoreQuery(query_embedding=embedding, similarity_top_k=top_k),
+            **search_kwargs,
+        )
+        latencies.append((time.perf_counter() - query_started_at) * 1000)
+        found += len(set(expected) & set(result.ids or []))
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    expected_total = sum(len(expected) for expected in ground_truth)
+    return {
+        **configuration,
+        f"recall@{top_k}": round(found / expected_total, 4) if expected_total else 0.0,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "qps": round(len(queries) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def write_results(results: List[Dict[str, Any]], output: Optional[Path]) -> None:
+    if output is None:
+        print(json.dumps(results, indent=2))
+    elif output.suffix == ".csv":
+        with output.open("w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        output.write_text(json.dumps(results, indent=2))
+
+
+async def generate(table: str, rows: int, clusters: int, batch_size: int) -> None:
+    vector_store = await VectorStoreManager.get_vector_store(
+        db_embedding_table_name=table,
+    )
+    nodes = generate_synthetic_nodes(rows, settings.EMBEDDING_DIMENSIONS, clusters)
+    try:
+        for batch in itertools.batched(nodes, batch_size):
+            await vector_store.async_copy_add(list(batch))
+        logger.info(f"Inserted {rows} synthetic vectors into data_{table}")
+    finally:
+        await vector_store.close()
+
+
+async def run(
+    table: str,
+    queries_path: Optional[Path],
+    grid_path: Optional[Path],
+    sample_size: int,
+    noise: float,
+    top_k: int,
+    output: Optional[Path],
+    seed: int,
+) -> None:
+    vector_store = await VectorStoreManager.get_vector_store(
+        db_embedding_table_name=table,
+    )
+    grid = json.loads(grid_path.read_text()) if grid_path else DEFAULT_GRID
+    try:
+        queries = await load_queries(
+            vector_store,
+            queries_path,
+            sample_size,
+            noise,
+            seed,
+        )
+        logger.info(f"Computing exact ground truth for {len(queries)} queries")
+        ground_truth = await asyncio.to_thread(
+            vector_store.get_exact_neighbors,
+            queries,
+            top_k,
+        )
+
+        results = []
+        index_configuration = None
+        for configuration in iter_configurations(grid):
+            index_kwargs = {
+                key: configuration[key]
+                for key in INDEX_PARAMETERS
+                if configuration.get(key) is not None
+            }
+            if index_kwargs and index_kwargs != index_configuration:
+                await asyncio.to_thread(
+                    vector_store.rebuild_pgdiskann_index,
+                    index_kwargs,
+                    min_recall=0.0,
+                )
+                index_configuration = index_kwargs
+            result = await asyncio.to_thread(
+                run_configuration,
+                vector_store,
+                queries,
+                ground_truth,
+                top_k,
+                configuration,
+            )
+            logger.info(f"Benchmark result: {result}")
+            results.append(result)
+        write_results(results, output)
+    finally:
+        await vector_store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.benchmarks.vector_search")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser(
+        "generate",
+        help="Insert clustered synthetic vectors into an embedding table.",
+    )
+    generate_parser.add_argument("--table", required=True)
+    generate_parser.add_argument("--rows", type=int, default=100000)
+    generate_parser.add_argument("--clusters", type=int, default=50)
+    generate_parser.add_argument("--batch-size", type=int, default=1000)
+
+    run_parser = subparsers.add_parser(
+        "run",
+        help="Report recall@k, latency percentiles and QPS for a parameter grid.",
+    )
+    run_parser.add_argument("--table", required=True)
+    run_parser.add_argument(
+        "--queries",
+        type=Path,
+        help="JSON list of query texts or vectors. Defaults to perturbed stored vectors.",
+    )
+    run_parser.add_argument(
+        "--grid",
+        type=Path,
+        help="JSON object mapping each parameter to the list of values to sweep.",
+    )
+    run_parser.add_argument("--sample-size", type=int, default=200)
+    run_parser.add_argument("--noise", type=float, default=0.05)
+    run_parser.add_argument("--top-k", type=int, default=10)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument(
+        "--output",
+        type=Path,
+        help="Write results to a .json or .csv file instead of stdout.",
+    )
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        asyncio.run(generate(args.table, args.rows, args.clusters, args.batch_size))
+    elif args.command == "run":
+        asyncio.run(
+            run(
+                args.table,
+                args.queries,
+                args.grid,
+                args.sample_size,
+                args.noise,
+                args.top_k,
+                args.output,
+                args.seed,
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Embedding maintenance commands.
+
+Usage:
+    python -m src.commands.embed sync [--target {products,reviews,all}] [--source {db,csv}]
+    python -m src.commands.embed benchmark [--rows N] [--latency SECONDS]
+"""
+
+import argparse
+import asyncio
+import json
+
+from llama_index.core.schema import TextNode
+from sqlalchemy import text
+from src.config.config import settings
+from src.config.embed_model import DeterministicFakeEmbedding
+from src.config.vector_store import VectorStoreManager
+from src.logging import logger
+from src.utils.embeddings import (
+    get_ingestion_engine,
+    sync_embeddings_for_products,
+    sync_embeddings_for_reviews,
+)
+
+BENCHMARK_TABLE_NAME = "embedding_ingestion_benchmark"
+
+
+async def sync(target: str, source: str, batch_size: int) -> None:
+    if target in ("products", "all"):
+        result = await sync_embeddings_for_products(source, batch_size)
+        logger.info(f"Products: {result._asdict()}")
+    if target in ("reviews", "all"):
+        result = await sync_embeddings_for_reviews(source, batch_size)
+        logger.info(f"Reviews: {result._asdict()}")
+
+
+async def benchmark(rows: int, latency: float, batch_size: int) -> None:
+    """
+    Measures ingestion throughput into a scratch table with the offline fake embedder.
+    """
+    vector_store = await VectorStoreManager.get_vector_store(
+        db_embedding_table_name=BENCHMARK_TABLE_NAME,
+        pgdiskann_kwargs=None,
+    )
+    embed_model = DeterministicFakeEmbedding(
+        embed_dim=settings.EMBEDDING_DIMENSIONS,
+        latency_seconds=latency,
+    )
+    nodes = (
+        TextNode(id_=f"benchmark_{i}", text=f"Synthetic review number {i}")
+        for i in range(rows)
+    )
+
+    try:
+        stats = await get_ingestion_engine(
+            vector_store,
+            embed_model,
+            batch_size=batch_size,
+        ).ingest(nodes)
+        print(json.dumps(stats.to_dict(), indent=2))
+    finally:
+        with vector_store.client.begin() as connection:
+            connection.execute(
+                text(f"DROP TABLE IF EXISTS data_{BENCHMARK_TABLE_NAME}"),
+            )
+        await vector_store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.commands.embed")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sync_parser = subparsers.add_parser(
+        "sync",
+        help="Embed new or changed rows and delete embeddings of removed rows.",
+    )
+    sync_parser.add_argument(
+        "--target",
+        choices=["products", "reviews", "all"],
+        default="all",
+    )
+    sync_parser.add_argument("--source", choices=["db", "csv"], default="db")
+    sync_parser.add_argument("--batch-size", type=int, default=100)
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark",
+        help="Measure ingestion rows/sec with the offline fake embedder.",
+    )
+    benchmark_parser.add_argument("--rows", type=int, default=10000)
+    benchmark_parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.2,
+        help="Simulated seconds per embedding request.",
+    )
+    benchmark_parser.add_argument("--batch-size", type=int, default=100)
+
+    args = parser.parse_args()
+    if args.command == "sync":
+        asyncio.run(sync(args.target, args.source, args.batch_size))
+    elif args.command == "benchmark":
+        asyncio.run(benchmark(args.rows, args.latency, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
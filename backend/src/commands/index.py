@@ -0,0 +1,123 @@
+"""
+Vector index maintenance commands.
+
+Usage:
+    python -m src.commands.index rebuild [--target {products,reviews}] [--max-neighbors N] [--l-value-ib N] [--pq-chunks N]
+    python -m src.commands.index progress [--target {products,reviews}]
+"""
+
+import argparse
+import asyncio
+import json
+
+from src.config.config import settings
+from src.config.vector_store import VectorStoreManager
+from src.logging import logger
+
+TABLE_NAMES = {
+    "products": settings.DB_EMBEDDING_TABLE_FOR_PRODUCTS,
+    "reviews": settings.DB_EMBEDDING_TABLE_FOR_REVIEWS,
+}
+
+
+async def rebuild(
+    target: str,
+    max_neighbors: int | None,
+    l_value_ib: int | None,
+    pq_chunks: int | None,
+    sample_size: int,
+    top_k: int,
+    min_recall: float,
+) -> None:
+    vector_store = await VectorStoreManager.get_vector_store(
+        db_embedding_table_name=TABLE_NAMES[target],
+    )
+    pgdiskann_kwargs = {
+        key: value
+        for key, value in {
+            "diskann_max_neighbors": max_neighbors,
+            "diskann_l_value_ib": l_value_ib,
+            "pq_param_num_chunks": pq_chunks,
+        }.items()
+        if value is not None
+    }
+    try:
+        result = await asyncio.to_thread(
+            vector_store.rebuild_pgdiskann_index,
+            pgdiskann_kwargs,
+            sample_size=sample_size,
+            top_k=top_k,
+            min_recall=min_recall,
+        )
+        print(json.dumps(result, indent=2))
+    finally:
+        await vector_store.close()
+
+
+async def progress(target: str) -> None:
+    vector_store = await VectorStoreManager.get_vector_store(
+        db_embedding_table_name=TABLE_NAMES[target],
+    )
+    try:
+        builds = vector_store.get_index_build_progress()
+        if not builds:
+            logger.info(f"No index build is running on {target}")
+        print(json.dumps(builds, indent=2))
+    finally:
+        await vector_store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.commands.index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser(
+        "rebuild",
+        help="Build a new index concurrently, validate its recall and swap it in.",
+    )
+    rebuild_parser.add_argument(
+        "--target",
+        choices=list(TABLE_NAMES),
+        default="products",
+    )
+    rebuild_parser.add_argument("--max-neighbors", type=int)
+    rebuild_parser.add_argument("--l-value-ib", type=int)
+    rebuild_parser.add_argument("--pq-chunks", type=int)
+    rebuild_parser.add_argument("--sample-size", type=int, default=100)
+    rebuild_parser.add_argument("--top-k", type=int, default=10)
+    rebuild_parser.add_argument(
+        "--min-recall",
+        type=float,
+        default=0.9,
+        help="Minimum recall@k against an exact scan required to swap in the new index.",
+    )
+
+    progress_parser = subparsers.add_parser(
+        "progress",
+        help="Show the progress of index builds running on the embedding table.",
+    )
+    progress_parser.add_argument(
+        "--target",
+        choices=list(TABLE_NAMES),
+        default="products",
+    )
+
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        asyncio.run(
+            rebuild(
+                args.target,
+                args.max_neighbors,
+                args.l_value_ib,
+                args.pq_chunks,
+                args.sample_size,
+                args.top_k,
+                args.min_recall,
+            ),
+        )
+    elif args.command == "progress":
+        asyncio.run(progress(args.target))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Personalization prewarming commands.
+
+Usage:
+    python -m src.commands.prewarm run [--token-budget N] [--products-per-user N] [--concurrency N] [--now]
+    python -m src.commands.prewarm stats
+"""
+
+import argparse
+import asyncio
+import json
+from datetime import datetime
+
+from src.config.config import settings
+from src.database import Session
+from src.logging import logger
+from src.services.prewarm import (
+    get_prewarm_stats,
+    in_off_peak_window,
+    prewarm_personalizations,
+)
+
+
+async def run(
+    token_budget: int,
+    products_per_user: int,
+    concurrency: int,
+    now: bool,
+) -> None:
+    if not now and not in_off_peak_window(datetime.now().hour):
+        logger.info(
+            f"Outside the off-peak window {settings.PREWARM_START_HOUR}:00-"
+            f"{settings.PREWARM_END_HOUR}:00, not prewarming. Pass --now to run anyway.",
+        )
+        return
+
+    result = await prewarm_personalizations(
+        token_budget=token_budget,
+        products_per_user=products_per_user,
+        concurrency=concurrency,
+        off_peak_only=not now,
+    )
+    print(json.dumps(result, indent=2))
+
+
+async def stats() -> None:
+    async with Session() as db:
+        print(json.dumps(await get_prewarm_stats(db), indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.commands.prewarm")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser(
+        "run",
+        help="Pre-generate personalized sections for the products users are likely to open next.",
+    )
+    run_parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=settings.PREWARM_TOKEN_BUDGET,
+    )
+    run_parser.add_argument(
+        "--products-per-user",
+        type=int,
+        default=settings.PREWARM_PRODUCTS_PER_USER,
+    )
+    run_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.PREWARM_CONCURRENCY,
+    )
+    run_parser.add_argument(
+        "--now",
+        action="store_true",
+        help="Run outside of the off-peak window.",
+    )
+
+    subparsers.add_parser(
+        "stats",
+        help="Show how often first openings of personalized sections were served warm.",
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        asyncio.run(
+            run(
+                args.token_budget,
+                args.products_per_user,
+                args.concurrency,
+                args.now,
+            ),
+        )
+    elif args.command == "stats":
+        asyncio.run(stats())
+
+
+if __name__ == "__main__":
+    main()
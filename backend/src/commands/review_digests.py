@@ -0,0 +1,42 @@
+"""
+Review digest maintenance commands.
+
+Usage:
+    python -m src.commands.review_digests refresh [--product-id ID ...]
+"""
+
+import argparse
+import asyncio
+import json
+
+from src.services.review_digests import refresh_review_digests
+
+
+async def refresh(product_ids: list[int] | None) -> None:
+    result = await refresh_review_digests(product_ids)
+    print(json.dumps(result, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.commands.review_digests")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = subparsers.add_parser(
+        "refresh",
+        help="Rebuild the review digests of products whose reviews changed.",
+    )
+    refresh_parser.add_argument(
+        "--product-id",
+        type=int,
+        nargs="+",
+        dest="product_ids",
+        help="Only check these products. Defaults to every product.",
+    )
+
+    args = parser.parse_args()
+    if args.command == "refresh":
+        asyncio.run(refresh(args.product_ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Optional
+
 from mem0.configs.base import MemoryConfig
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -14,6 +16,9 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: str = "5432"
     DB_PASSWORD: str
+    DB_READ_HOST: Optional[str] = None
+    DB_READ_YOUR_WRITES_SECONDS: int = 10
+    DB_READ_RETRY_SECONDS: int = 30
     LLM_MODEL: str
     EMBEDDING_MODEL: str
     AZURE_OPENAI_API_KEY: str
@@ -25,6 +30,26 @@ class Settings(BaseSettings):
     USE_AZURE_AI_FOR_REVIEWS: bool = False
     MIGRATION_BATCH_SIZE: int = 100
     MIGRATION_SLEEP_SECONDS: int = 5
+    EMBEDDING_DIMENSIONS: int = 1536
+    USE_FAKE_EMBEDDINGS: bool = False
+    EMBEDDING_INGESTION_CONCURRENCY: int = 4
+    EMBEDDING_REQUESTS_PER_MINUTE: int = 0
+    EMBEDDING_TOKENS_PER_MINUTE: int = 0
+    EMBEDDING_MAX_CONCURRENCY: int = 0
+    LLM_REQUESTS_PER_MINUTE: int = 0
+    LLM_TOKENS_PER_MINUTE: int = 0
+    LLM_MAX_CONCURRENCY: int = 0
+    # Enforce the Azure OpenAI budgets across workers through Postgres
+    RATE_LIMIT_SHARED: bool = False
+    # Deployment on the same resource that slow chat completions are hedged to
+    LLM_HEDGE_MODEL: Optional[str] = None
+    LLM_HEDGE_PERCENTILE: float = 0.95
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    # Smaller, faster deployment the agents in LLM_FALLBACK_AGENTS fall back to. They get
+    # LLM_FALLBACK_TIMEOUT seconds of their timeout for it.
+    LLM_FALLBACK_MODEL: Optional[str] = None
+    LLM_FALLBACK_AGENTS: list[str] = ["product_personalization", "reviews", "inventory"]
+    LLM_FALLBACK_TIMEOUT: int = 20
 
     MEM0_LLM_PROVIDER: str
     MEM0_MEMORY_PROVIDER: str
@@ -33,15 +58,50 @@ class Settings(BaseSettings):
     MEM0_EMBEDDING_MODEL_DIMS: int = 1536
     MEM0_AZURE_OPENAI_MAX_TOKENS: int = 2000
     MEM0_AZURE_OPENAI_TEMPERATURE: float = 0.1
+    MEM0_PREFERENCES_CACHE_SIZE: int = 4096
+    # Attempts of a queued memory write, retried after 2, 4, ... times this many seconds
+    MEM0_WRITE_ATTEMPTS: int = 4
+    MEM0_WRITE_RETRY_SECONDS: float = 2.0
 
     PAGE_SIZE: int = 10
+    CATALOG_CACHE_SIZE: int = 1024
+    CATALOG_CACHE_SHARED: bool = True
+    REVIEW_STREAM_FETCH_SIZE: int = 1000
+    # Product page views are counted in memory and added to product_views this often
+    PRODUCT_VIEWS_FLUSH_SECONDS: float = 30.0
+    PREWARM_TOKEN_BUDGET: int = 2_000_000
+    PREWARM_PRODUCTS_PER_USER: int = 3
+    PREWARM_CONCURRENCY: int = 2
+    PREWARM_START_HOUR: int = 1
+    PREWARM_END_HOUR: int = 6
     TOP_K: int = 20
     PRODUCT_SEARCH_RESPONSE_SIZE: int = 8
     INVENTORY_AGENT_TIMEOUT: int = 60
     REVIEW_AGENT_TIMEOUT: int = 60
     PRODUCT_PERSONALIZATION_AGENT_TIMEOUT: int = 60
     PRESENTATION_AGENT_TIMEOUT: int = 60
+    # Stream cards of each agent's output as it completes, before the merged section
+    PROGRESSIVE_PERSONALIZATION: bool = True
+    # Start the agents the planner picked in at least AGENT_SPECULATION_MIN_PLAN_RATE of
+    # its recent plans while it runs
+    AGENT_SPECULATION: bool = True
+    AGENT_SPECULATION_MIN_PLAN_RATE: float = 0.6
+    # Token budgets of the agents' messages, their system prompts aside
+    PLANNING_AGENT_INPUT_TOKENS: int = 2000
+    INVENTORY_AGENT_INPUT_TOKENS: int = 2000
+    # The reviews agent also gets the review digest
+    REVIEW_AGENT_INPUT_TOKENS: int = 4000
+    PRODUCT_PERSONALIZATION_AGENT_INPUT_TOKENS: int = 3000
+    PRESENTATION_AGENT_INPUT_TOKENS: int = 3000
     SQLALCHEMY_CONNECTION_POOL_SIZE: int = 20
+    # When set, pools are sized from the server's connection limit instead of
+    # SQLALCHEMY_CONNECTION_POOL_SIZE, split across the WEB_CONCURRENCY workers.
+    DB_MAX_CONNECTIONS: int = 0
+    DB_RESERVED_CONNECTIONS: int = 20
+    WEB_CONCURRENCY: int = 1
+    DB_GRAPH_POOL_SIZE: int = 2
+    # Connections of the shared rate limit buckets, with RATE_LIMIT_SHARED
+    DB_RATE_LIMIT_POOL_SIZE: int = 2
 
     APP_VERSION: str = "0.1.0"
     DEBUG: bool = False
@@ -53,12 +113,39 @@ class Settings(BaseSettings):
 
     VERBOSE: bool = False
 
-    def get_database_url(self, is_async: bool = False) -> str:
+    def get_database_url(
+        self,
+        is_async: bool = False,
+        host: Optional[str] = None,
+    ) -> str:
         """
         Get Azure token for database authentication and return the database URL.
+
+        `host` overrides DB_HOST, e.g. to connect to a read replica.
         """
         pg_client = "postgresql+asyncpg" if is_async else "postgresql"
-        return f"{pg_client}://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        return f"{pg_client}://{self.DB_USER}:{self.DB_PASSWORD}@{host or self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
+    def get_pool_kwargs(self, share: float = 1.0) -> dict:
+        """
+        Get the pool sizing of an engine that gets `share` of a worker's connections.
+
+        With DB_MAX_CONNECTIONS set, the connections left after DB_RESERVED_CONNECTIONS
+        (migrations, mem0, admin sessions) are split evenly between the workers, and pools
+        may not overflow, so that all workers together stay below the server limit. The
+        graph pool's DB_GRAPH_POOL_SIZE connections, and with RATE_LIMIT_SHARED the rate
+        limit pool's DB_RATE_LIMIT_POOL_SIZE, are taken from each worker's share first.
+        """
+        if not self.DB_MAX_CONNECTIONS:
+            return {"pool_size": self.SQLALCHEMY_CONNECTION_POOL_SIZE}
+
+        dedicated = self.DB_GRAPH_POOL_SIZE + (
+            self.DB_RATE_LIMIT_POOL_SIZE if self.RATE_LIMIT_SHARED else 0
+        )
+        per_worker = (
+            self.DB_MAX_CONNECTIONS - self.DB_RESERVED_CONNECTIONS
+        ) // self.WEB_CONCURRENCY - dedicated
+        return {"pool_size": max(1, int(per_worker * share)), "max_overflow": 0}
 
     def get_mem0_memory_config(self):
         return MemoryConfig(
@@ -1,11 +1,70 @@
+import asyncio
+import hashlib
+import math
+import random
+from typing import Any, List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
 from src.config.config import settings
+from src.utils.rate_governor import get_governed_http_clients
+
+
+class DeterministicFakeEmbedding(BaseEmbedding):
+    """Offline embedding model that derives a unit vector from a hash of the text.
+
+    The same text always maps to the same vector, so ingestion and search can be exercised
+    without Azure OpenAI. An optional latency simulates the round trip of a batch request.
+
+    Args:
+        embed_dim (int): Embedding dimension.
+        latency_seconds (float): Simulated latency per batch request.
+    """
+
+    embed_dim: int
+    latency_seconds: float = 0.0
+
+    def __init__(self, embed_dim: int, latency_seconds: float = 0.0, **kwargs: Any):
+        super().__init__(
+            embed_dim=embed_dim,
+            latency_seconds=latency_seconds,
+            model_name="deterministic-fake",
+            **kwargs,
+        )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "DeterministicFakeEmbedding"
+
+    def _get_vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.embed_dim)]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._get_vector(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_vector(text)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._aget_text_embeddings([query]))[0]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return [self._get_vector(text) for text in texts]
 
 
 class EmbedModelManager:
 
     @classmethod
-    async def get_embed_model(cls) -> AzureOpenAIEmbedding:
+    async def get_embed_model(cls) -> BaseEmbedding:
+
+        if settings.USE_FAKE_EMBEDDINGS:
+            return DeterministicFakeEmbedding(embed_dim=settings.EMBEDDING_DIMENSIONS)
 
         return AzureOpenAIEmbedding(
             model=settings.EMBEDDING_MODEL,
@@ -13,4 +72,5 @@ class EmbedModelManager:
             api_key=settings.AZURE_OPENAI_API_KEY,
             azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
             api_version=settings.AZURE_API_VERSION_EMBEDDING_MODEL,
+            **get_governed_http_clients("embeddings"),
         )
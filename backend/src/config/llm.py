@@ -1,16 +1,81 @@
+from typing import Optional
+
+import httpx
 from llama_index.llms.azure_openai import AzureOpenAI
 from src.config.config import settings
+from src.utils.hedging import HedgedAsyncTransport
+from src.utils.prompt_cache import PromptCacheStats, UsageRecordingAsyncTransport
+from src.utils.rate_governor import (
+    GovernedAsyncTransport,
+    GovernedTransport,
+    get_rate_governor,
+)
+
+_hedged_transports: dict[str, HedgedAsyncTransport] = {}
+_prompt_cache_stats: dict[str, PromptCacheStats] = {}
 
 
 class LLMManager:
+    _fallback_llm: Optional[AzureOpenAI] = None
 
     @classmethod
     async def get_llm(cls) -> AzureOpenAI:
+        return cls._build("llm", settings.LLM_MODEL, settings.LLM_HEDGE_MODEL)
+
+    @classmethod
+    def get_fallback_llm(cls) -> Optional[AzureOpenAI]:
+        """Returns the LLM of the smaller, faster fallback deployment, if one is configured."""
+        if settings.LLM_FALLBACK_MODEL and cls._fallback_llm is None:
+            cls._fallback_llm = cls._build(
+                settings.LLM_FALLBACK_MODEL,
+                settings.LLM_FALLBACK_MODEL,
+            )
+        return cls._fallback_llm
+
+    @staticmethod
+    def _build(
+        governor: str,
+        deployment: str,
+        hedge_deployment: Optional[str] = None,
+    ) -> AzureOpenAI:
+        transport = GovernedAsyncTransport(get_rate_governor(governor))
+        if hedge_deployment:
+            transport = HedgedAsyncTransport(
+                primary=transport,
+                alternate=GovernedAsyncTransport(get_rate_governor(hedge_deployment)),
+                deployment=deployment,
+                alternate_deployment=hedge_deployment,
+                percentile=settings.LLM_HEDGE_PERCENTILE,
+                min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+            )
+            _hedged_transports[deployment] = transport
+        stats = _prompt_cache_stats.setdefault(deployment, PromptCacheStats())
 
         return AzureOpenAI(
-            model=settings.LLM_MODEL,
-            deployment_name=settings.LLM_MODEL,
+            model=deployment,
+            deployment_name=deployment,
             api_key=settings.AZURE_OPENAI_API_KEY,
             azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
             api_version=settings.AZURE_API_VERSION_LLM,
+            http_client=httpx.Client(
+                transport=GovernedTransport(get_rate_governor(governor)),
+            ),
+            async_http_client=httpx.AsyncClient(
+                transport=UsageRecordingAsyncTransport(transport, stats),
+            ),
+            # Streamed completions only report their usage, and cached tokens, when asked
+            additional_kwargs={"stream_options": {"include_usage": True}},
         )
+
+
+def get_hedging_stats() -> dict:
+    return {
+        deployment: transport.get_stats()
+        for deployment, transport in _hedged_transports.items()
+    }
+
+
+def get_prompt_cache_stats() -> dict:
+    return {
+        deployment: stats.to_dict() for deployment, stats in _prompt_cache_stats.items()
+    }
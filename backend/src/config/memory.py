@@ -1,6 +1,21 @@
+import httpx
 from mem0 import AsyncMemory
 from src.config.config import settings
+from src.utils.rate_governor import GovernedTransport, get_rate_governor
 
 
 def get_mem0_memory() -> AsyncMemory:
-    return AsyncMemory(config=settings.get_mem0_memory_config())
+    memory = AsyncMemory(config=settings.get_mem0_memory_config())
+    # Send mem0's OpenAI calls through the same rate governors as the app's own
+    for component, governor in (
+        (memory.llm, "llm"),
+        (memory.embedding_model, "embeddings"),
+    ):
+        client = getattr(component, "client", None)
+        if hasattr(client, "with_options"):
+            component.client = client.with_options(
+                http_client=httpx.Client(
+                    transport=GovernedTransport(get_rate_governor(governor)),
+                ),
+            )
+    return memory
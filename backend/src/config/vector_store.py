@@ -1,11 +1,39 @@
+from typing import Optional
+
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 from src.config.config import settings
 from src.llama_index.vector_stores.pgdiskann import PGDiskAnnVectorStore
 
+PGDISKANN_KWARGS = {
+    "diskann_max_neighbors": 32,
+    "diskann_l_value_ib": 128,
+    "pq_param_num_chunks": 128,
+    "product_quantized": True,
+    "diskann_dist_method": "vector_cosine_ops",
+    "diskann_l_value_is": 64.0,
+    "quantized_fetch_limit": 50,
+    # Filtered searches that return fewer than top_k rows are retried with a candidate pool
+    # and search list widened by this factor, and fall back to an exact scan when the
+    # planner expects the filter to keep no more rows than the widest candidate pool, or
+    # less than this fraction of the rows.
+    "widening_factor": 2,
+    "widening_max_rounds": 4,
+    "widening_max_fetch_limit": 800,
+    "exact_scan_selectivity": 0.001,
+}
+
 
 class VectorStoreManager:
 
     @classmethod
-    async def get_vector_store(cls, db_embedding_table_name) -> PGDiskAnnVectorStore:
+    async def get_vector_store(
+        cls,
+        db_embedding_table_name,
+        pgdiskann_kwargs=PGDISKANN_KWARGS,
+        engine: Optional[Engine] = None,
+        async_engine: Optional[AsyncEngine] = None,
+    ) -> PGDiskAnnVectorStore:
         return PGDiskAnnVectorStore.from_params(
             database=settings.DB_NAME,
             host=settings.DB_HOST,
@@ -13,16 +41,10 @@ class VectorStoreManager:
             port=settings.DB_PORT,
             user=settings.DB_USER,
             table_name=db_embedding_table_name,
-            embed_dim=1536,
+            embed_dim=settings.EMBEDDING_DIMENSIONS,
             use_reranking=True,
-            pgdiskann_kwargs={
-                "diskann_max_neighbors": 32,
-                "diskann_l_value_ib": 128,
-                "pq_param_num_chunks": 128,
-                "product_quantized": True,
-                "diskann_dist_method": "vector_cosine_ops",
-                "diskann_l_value_is": 64.0,
-                "quantized_fetch_limit": 50,
-            },
+            pgdiskann_kwargs=pgdiskann_kwargs,
             debug=settings.DEBUG,
+            engine=engine,
+            async_engine=async_engine,
         )
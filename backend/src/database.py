@@ -1,44 +1,182 @@
+import asyncio
+import time
 import traceback
-from typing import Annotated, AsyncGenerator
+from contextlib import asynccontextmanager
+from contextvars import Context, ContextVar
+from dataclasses import dataclass
+from typing import Annotated, AsyncGenerator, AsyncIterator, Optional
 
 from fastapi import Depends
 from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session as SyncSession
 from src.config.config import settings
 from src.logging import logger
 
+# Set server-side at connection startup, so new connections need no extra round trip.
+SEARCH_PATH = 'ag_catalog,"$user",public'
+GRAPH_NAME = "product_review_graph"
+
+# The sync engine only serves the vector stores' sync paths and setup, so it gets
+# a small share of the worker's connections.
 sync_engine = create_engine(
     settings.get_database_url(is_async=False),
-    pool_size=settings.SQLALCHEMY_CONNECTION_POOL_SIZE,
+    **settings.get_pool_kwargs(share=0.2),
     echo=False,
 )
 
 # Create asynchronous engine and session
 engine = create_async_engine(
     settings.get_database_url(is_async=True),
-    pool_size=settings.SQLALCHEMY_CONNECTION_POOL_SIZE,
+    **settings.get_pool_kwargs(share=0.8),
+    connect_args={"server_settings": {"search_path": SEARCH_PATH}},
     echo=False,
 )
 
+
+class PrimarySession(SyncSession):
+    """Session class of the primary engine, whose commits mark the current client as a writer."""
+
+
 Session = async_sessionmaker(
     bind=engine,
     expire_on_commit=False,
+    sync_session_class=PrimarySession,
 )
 
+# Replica of the primary for reads that tolerate a few seconds of lag. Without
+# DB_READ_HOST, reads go to the primary.
+read_engine = (
+    create_async_engine(
+        settings.get_database_url(is_async=True, host=settings.DB_READ_HOST),
+        **settings.get_pool_kwargs(share=0.8),
+        connect_args={"server_settings": {"search_path": SEARCH_PATH}},
+        echo=False,
+    )
+    if settings.DB_READ_HOST
+    else None
+)
 
-@event.listens_for(engine.sync_engine, "connect")
-def set_search_path(dbapi_connection, connection_record):
-    cursor = dbapi_connection.cursor()
+ReadSession = (
+    async_sessionmaker(bind=read_engine, expire_on_commit=False)
+    if read_engine
+    else None
+)
+
+
+@dataclass
+class WriteMarker:
+    """When the client of a request last committed on the primary, in seconds since the epoch.
+
+    The time travels with the client, in the X-Last-Write-At header, so that every worker
+    routes its reads the same way. Commits of the request itself update it. Commits made
+    once the response is sent, by a streamed chat or by the tasks the request spawned, can
+    no longer reach the header; they are published to every worker instead, through the
+    catalog cache versions of the user.
+    """
+
+    written_at: Optional[float] = None
+    wrote: bool = False
+    user_id: Optional[int] = None
+    # Set once the response is sent
+    detached: bool = False
+
+
+# Set per request by the user middleware and shared with the tasks it spawns.
+current_write_marker: ContextVar[Optional[WriteMarker]] = ContextVar(
+    "current_write_marker",
+    default=None,
+)
+
+# Per worker state: until when the replica is skipped after a failed connection attempt.
+_replica_unavailable_until = 0.0
+
+# Tasks publishing commits made after their response was sent, which the event loop only
+# holds weakly.
+_publish_tasks: set[asyncio.Task] = set()
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def mark_user_write(session):
+    marker = current_write_marker.get()
+    if marker is None:
+        return
+    marker.written_at = time.time()
+    marker.wrote = True
+    if marker.detached and marker.user_id is not None:
+        # Runs without the marker, so that the publishing commit is not published in turn
+        task = asyncio.get_running_loop().create_task(
+            _publish_user_write(marker.user_id),
+            context=Context(),
+        )
+        _publish_tasks.add(task)
+        task.add_done_callback(_publish_tasks.discard)
+
+
+async def _publish_user_write(user_id: int) -> None:
+    from src.services.catalog_cache import CatalogCache
 
     try:
-        # Start a new transaction
-        cursor.execute('SET search_path = ag_catalog, "$user", public;')
-        dbapi_connection.commit()
+        async with Session() as db:
+            await CatalogCache.bump_versions(
+                [CatalogCache.user_writes_key(user_id)],
+                db,
+            )
+    except Exception as exc:
+        logger.warning(f"Failed to publish a write of user_id={user_id}: {exc}")
+
+
+def has_recent_write(marker: Optional[WriteMarker]) -> bool:
+    """Whether the client committed recently enough that the replica may not show it yet."""
+    if marker is None or marker.written_at is None:
+        return False
+    return time.time() - marker.written_at < settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+# Small pool reserved for Apache AGE graph queries, whose connections load the graph once.
+graph_engine = create_async_engine(
+    settings.get_database_url(is_async=True),
+    pool_size=settings.DB_GRAPH_POOL_SIZE,
+    max_overflow=0,
+    connect_args={"server_settings": {"search_path": SEARCH_PATH}},
+    echo=False,
+)
+
+GraphSession = async_sessionmaker(
+    bind=graph_engine,
+    expire_on_commit=False,
+)
+
+
+# Small pool of the rate governors' shared token buckets, so that taking tokens neither
+# waits for nor holds a connection of the application's pools.
+rate_limit_engine = (
+    create_async_engine(
+        settings.get_database_url(is_async=True),
+        pool_size=settings.DB_RATE_LIMIT_POOL_SIZE,
+        max_overflow=0,
+        echo=False,
+    )
+    if settings.RATE_LIMIT_SHARED
+    else None
+)
+
+RateLimitSession = (
+    async_sessionmaker(bind=rate_limit_engine, expire_on_commit=False)
+    if rate_limit_engine
+    else None
+)
+
+
+@event.listens_for(graph_engine.sync_engine, "connect")
+def load_graph(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
 
-        # Another query for the Cypher query
+    try:
         # This is expected to fail but it will load the graph for this connection
         cursor.execute(
-            "SELECT * FROM ag_catalog.cypher('product_review_graph', $$ RETURN 1 $$) AS (n agtype);",
+            f"SELECT * FROM ag_catalog.cypher('{GRAPH_NAME}', $$ RETURN 1 $$) AS (n agtype);",
         )
         dbapi_connection.commit()
 
@@ -49,6 +187,25 @@ def set_search_path(dbapi_connection, connection_record):
         cursor.close()
 
 
+def get_pool_stats() -> dict:
+    """Returns the usage of this worker's connection pools."""
+    return {
+        name: {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+        for name, pool in (
+            ("async", engine.pool),
+            ("sync", sync_engine.pool),
+            ("graph", graph_engine.pool),
+            *((("read", read_engine.pool),) if read_engine else ()),
+            *((("rate_limit", rate_limit_engine.pool),) if rate_limit_engine else ()),
+        )
+    }
+
+
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     async with Session() as session:
         try:
@@ -60,4 +217,61 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
             raise
 
 
+def get_read_session_factory() -> async_sessionmaker[AsyncSession]:
+    """
+    Returns the session factory of the read replica.
+
+    Returns the primary's instead when no replica is configured, when the current client
+    wrote within DB_READ_YOUR_WRITES_SECONDS, or while the replica is skipped after a failed
+    connection attempt.
+    """
+    if (
+        ReadSession
+        and time.monotonic() >= _replica_unavailable_until
+        and not has_recent_write(current_write_marker.get())
+    ):
+        return ReadSession
+    return Session
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """
+    Opens a session on the read replica, see `get_read_session_factory`.
+
+    Falls back to the primary when the replica cannot be reached. Sessions are meant for
+    reads only; writes through them would fail on the replica.
+    """
+    global _replica_unavailable_until
+
+    session_factory = get_read_session_factory()
+    session = session_factory()
+    if session_factory is ReadSession:
+        try:
+            await session.connection()
+        except (DBAPIError, OSError) as exc:
+            logger.warning(f"Read replica unavailable, reading from primary: {exc}")
+            _replica_unavailable_until = (
+                time.monotonic() + settings.DB_READ_RETRY_SECONDS
+            )
+            await session.close()
+            session = Session()
+
+    async with session:
+        yield session
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Yields a session on the read replica, see `read_session`."""
+    async with read_session() as session:
+        try:
+            yield session
+        except Exception as exc:
+            logger.error(exc)
+            logger.error(traceback.format_exc())
+            await session.rollback()
+            raise
+
+
 DBSession = Annotated[AsyncSession, Depends(get_async_db)]
+DBReadSession = Annotated[AsyncSession, Depends(get_async_read_db)]
@@ -1,6 +1,18 @@
 import logging
 import re
-from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Type, Union
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
 import sqlalchemy
 from llama_index.core.bridge.pydantic import PrivateAttr
@@ -20,6 +32,8 @@ from llama_index.core.vector_stores.utils import (
 )
 
 if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.ext.asyncio import AsyncEngine
     from sqlalchemy.sql.selectable import Select
 
 
@@ -30,6 +44,39 @@ class DBEmbeddingRow(NamedTuple):
     similarity: float
 
 
+@dataclass
+class SearchMetrics:
+    """Counters describing how many rounds filtered searches needed to fill `top_k`."""
+
+    searches: int = 0
+    filtered_searches: int = 0
+    exact_scans: int = 0
+    starved_searches: int = 0
+    rounds: Dict[int, int] = field(default_factory=dict)
+
+    def record(
+        self,
+        filtered: bool,
+        rounds: int,
+        exact_scan: bool = False,
+        starved: bool = False,
+    ) -> None:
+        self.searches += 1
+        self.filtered_searches += filtered
+        self.exact_scans += exact_scan
+        self.starved_searches += starved
+        self.rounds[rounds] = self.rounds.get(rounds, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "searches": self.searches,
+            "filtered_searches": self.filtered_searches,
+            "exact_scans": self.exact_scans,
+            "starved_searches": self.starved_searches,
+            "rounds": dict(sorted(self.rounds.items())),
+        }
+
+
 _logger = logging.getLogger(__name__)
 
 
@@ -59,6 +106,7 @@ def get_data_model(
         text = Column(VARCHAR, nullable=False)
         metadata_ = Column(metadata_dtype)
         node_id = Column(VARCHAR)
+        content_hash = Column(VARCHAR)
         embedding = embedding_col
 
     model = type(
@@ -111,6 +159,12 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
     stores_text: bool = True
 
     PRODUCT_QUANTIZED_DEFAULT: bool = True
+    WIDENING_FACTOR_DEFAULT: int = 2
+    WIDENING_MAX_ROUNDS_DEFAULT: int = 4
+    WIDENING_MAX_FETCH_LIMIT_DEFAULT: int = 1000
+    EXACT_SCAN_SELECTIVITY_DEFAULT: float = 0.001
+    # reltuples only changes on VACUUM and ANALYZE, so it is read at most this often
+    TOTAL_ROWS_TTL_SECONDS: float = 300.0
 
     _base: Any = PrivateAttr()
     _table_class: Any = PrivateAttr()
@@ -119,6 +173,9 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
     _async_engine: Any = PrivateAttr()
     _async_session: Any = PrivateAttr()
     _is_initialized: bool = PrivateAttr(default=False)
+    _owns_engines: bool = PrivateAttr(default=True)
+    _search_metrics: SearchMetrics = PrivateAttr(default_factory=SearchMetrics)
+    _total_rows: Optional[Tuple[Optional[float], float]] = PrivateAttr(default=None)
 
     def __init__(
         self,
@@ -134,6 +191,8 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
         pgdiskann_kwargs: Optional[Dict[str, Any]] = None,
         create_engine_kwargs: Optional[Dict[str, Any]] = None,
         initialization_fail_on_error: bool = False,
+        engine: Optional["Engine"] = None,
+        async_engine: Optional["AsyncEngine"] = None,
     ) -> None:
         """Constructor.
 
@@ -151,7 +210,19 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
                 contains "diskann_l_value_ib", "diskann_l_value_is", "diskann_max_neighbors", and optionally "diskann_dist_method".
             create_engine_kwargs (Optional[Dict[str, Any]], optional): Engine parameters to pass to create_engine. Defaults to None
             stores_text (bool, optional): Whether the store contains text. Defaults to True.
+            engine (Optional[Engine], optional): Existing engine to share instead of creating one
+                from `connection_string`. Defaults to None.
+            async_engine (Optional[AsyncEngine], optional): Existing async engine to share instead
+                of creating one from `async_connection_string`. Defaults to None.
+
+        Raises:
+            ValueError: If only one of `engine` and `async_engine` is given.
         """
+        if (engine is None) != (async_engine is None):
+            raise ValueError(
+                "Pass both engine and async_engine to share them, or neither to create them.",
+            )
+
         table_name = table_name.lower()
         schema_name = schema_name.lower()
 
@@ -182,6 +253,11 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
             use_jsonb=use_jsonb,
         )
 
+        if engine is not None and async_engine is not None:
+            self._engine = engine
+            self._async_engine = async_engine
+            self._owns_engines = False
+
         self._initialize()
 
     async def close(self) -> None:
@@ -189,8 +265,11 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
             return
 
         self._session.close_all()
-        self._engine.dispose()
+        if not self._owns_engines:
+            # Shared engines are disposed by their owner.
+            return
 
+        self._engine.dispose()
         await self._async_engine.dispose()
 
     @classmethod
@@ -216,6 +295,8 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
         use_jsonb: bool = False,
         pgdiskann_kwargs: Optional[Dict[str, Any]] = None,
         create_engine_kwargs: Optional[Dict[str, Any]] = None,
+        engine: Optional["Engine"] = None,
+        async_engine: Optional["AsyncEngine"] = None,
     ) -> "PGDiskAnnVectorStore":
         """Construct from params.
 
@@ -236,6 +317,8 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
             pgdiskann_kwargs (Optional[Dict[str, Any]], optional): PGDiskAnn kwargs, a dict that
                 contains "diskann_l_value_ib", "diskann_l_value_is", "diskann_max_neighbors".
             create_engine_kwargs (Optional[Dict[str, Any]], optional): Engine parameters to pass to create_engine. Defaults to None
+            engine (Optional[Engine], optional): Existing engine to share. Defaults to None.
+            async_engine (Optional[AsyncEngine], optional): Existing async engine to share. Defaults to None.
 
         Returns:
             PGDiskAnnVectorStore: Instance of PGDiskAnnVectorStore constructed from params.
@@ -259,6 +342,8 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
             use_jsonb=use_jsonb,
             pgdiskann_kwargs=pgdiskann_kwargs,
             create_engine_kwargs=create_engine_kwargs,
+            engine=engine,
+            async_engine=async_engine,
         )
 
     @property
@@ -272,17 +357,18 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
         from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
         from sqlalchemy.orm import sessionmaker
 
-        self._engine = create_engine(
-            self.connection_string,
-            echo=self.debug,
-            **self.create_engine_kwargs,
-        )
-        self._session = sessionmaker(self._engine)
+        if self._owns_engines:
+            self._engine = create_engine(
+                self.connection_string,
+                echo=self.debug,
+                **self.create_engine_kwargs,
+            )
+            self._async_engine = create_async_engine(
+                self.async_connection_string,
+                **self.create_engine_kwargs,
+            )
 
-        self._async_engine = create_async_engine(
-            self.async_connection_string,
-            **self.create_engine_kwargs,
-        )
+        self._session = sessionmaker(self._engine)
         self._async_session = sessionmaker(self._async_engine, class_=AsyncSession)  # type: ignore
 
     def _create_schema_if_not_exists(self) -> bool:
@@ -326,27 +412,37 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
             session.execute(statement)
             session.commit()
 
-    def _create_pgdiskann_index(self) -> None:
+    @property
+    def index_name(self) -> str:
+        """Name of the active pgdiskann index."""
+        return f"{self._table_class.__tablename__}_embedding_idx"
+
+    def _get_pgdiskann_index_statement(
+        self,
+        index_name: str,
+        pgdiskann_kwargs: Dict[str, Any],
+        concurrently: bool = False,
+    ) -> Any:
         import sqlalchemy
 
         if (
-            "diskann_l_value_ib" not in self.pgdiskann_kwargs
-            or "diskann_max_neighbors" not in self.pgdiskann_kwargs
+            "diskann_l_value_ib" not in pgdiskann_kwargs
+            or "diskann_max_neighbors" not in pgdiskann_kwargs
         ):
             raise ValueError(
                 "Make sure diskann_l_value_is, diskann_l_value_ib, and diskann_max_neighbors are in pgdiskann_kwargs.",
             )
 
-        diskann_l_value_ib = self.pgdiskann_kwargs.get("diskann_l_value_ib")
-        diskann_max_neighbors = self.pgdiskann_kwargs.get("diskann_max_neighbors")
+        diskann_l_value_ib = pgdiskann_kwargs.get("diskann_l_value_ib")
+        diskann_max_neighbors = pgdiskann_kwargs.get("diskann_max_neighbors")
 
         # If user didn’t specify an operator, pick a default based on whether halfvec is used
-        if "diskann_dist_method" in self.pgdiskann_kwargs:
-            diskann_dist_method = self.pgdiskann_kwargs.get("diskann_dist_method")
+        if "diskann_dist_method" in pgdiskann_kwargs:
+            diskann_dist_method = pgdiskann_kwargs.get("diskann_dist_method")
         else:
             diskann_dist_method = "vector_cosine_ops"
 
-        product_quantized = self.pgdiskann_kwargs.get(
+        product_quantized = pgdiskann_kwargs.get(
             "product_quantized",
             self.PRODUCT_QUANTIZED_DEFAULT,
         )
@@ -356,20 +452,29 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
             product_quantized_query += f", product_quantized = '{product_quantized}'"
 
             # If pq_param_num_chunks is not provided, it will default to the values determined by pgdiskann.
-            pq_param_num_chunks = self.pgdiskann_kwargs.get("pq_param_num_chunks", None)
+            pq_param_num_chunks = pgdiskann_kwargs.get("pq_param_num_chunks", None)
             if pq_param_num_chunks is not None:
                 product_quantized_query += (
                     f", pq_param_num_chunks = '{pq_param_num_chunks}'"
                 )
 
-        index_name = f"{self._table_class.__tablename__}_embedding_idx"
+        create_clause = (
+            f"CREATE INDEX CONCURRENTLY {index_name} "
+            if concurrently
+            else f"CREATE INDEX IF NOT EXISTS {index_name} "
+        )
+        return sqlalchemy.text(
+            create_clause + f"ON {self.schema_name}.{self._table_class.__tablename__} "
+            f"USING diskann (embedding {diskann_dist_method}) "
+            f"WITH (max_neighbors = {diskann_max_neighbors}, l_value_ib = {diskann_l_value_ib}{product_quantized_query})",
+        )
+
+    def _create_pgdiskann_index(self) -> None:
+        statement = self._get_pgdiskann_index_statement(
+            self.index_name,
+            self.pgdiskann_kwargs,
+        )
         with self._session() as session, session.begin():
-            statement = sqlalchemy.text(
-                f"CREATE INDEX IF NOT EXISTS {index_name} "
-                f"ON {self.schema_name}.{self._table_class.__tablename__} "
-                f"USING diskann (embedding {diskann_dist_method}) "
-                f"WITH (max_neighbors = {diskann_max_neighbors}, l_value_ib = {diskann_l_value_ib}{product_quantized_query})",
-            )
             from sqlalchemy.dialects import postgresql
 
             # TODO: Remove these logs.
@@ -383,6 +488,280 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
             session.execute(statement)
             session.commit()
 
+    def get_index_build_progress(self) -> List[Dict[str, Any]]:
+        """Returns the progress of index builds running on this store's table.
+
+        Reads `pg_stat_progress_create_index`, so it also reports builds started by
+        other sessions, such as a concurrent rebuild.
+        """
+        from sqlalchemy import text
+
+        statement = text(
+            """
+            SELECT
+                p.pid,
+                index_class.relname AS index_name,
+                p.phase,
+                p.blocks_total,
+                p.blocks_done,
+                p.tuples_total,
+                p.tuples_done
+            FROM pg_stat_progress_create_index p
+            LEFT JOIN pg_class index_class ON index_class.oid = p.index_relid
+            WHERE p.relid = to_regclass(:table_name)
+            """,
+        ).bindparams(
+            table_name=f"{self.schema_name}.{self._table_class.__tablename__}",
+        )
+        with self._engine.connect() as connection:
+            rows = connection.execute(statement).mappings().all()
+
+        progress = []
+        for row in rows:
+            item = dict(row)
+            total = item["blocks_total"] or item["tuples_total"]
+            done = item["blocks_done"] if item["blocks_total"] else item["tuples_done"]
+            item["percent_done"] = round(100 * done / total, 1) if total else None
+            progress.append(item)
+        return progress
+
+    def get_exact_neighbors(
+        self,
+        embeddings: List[List[float]],
+        top_k: int = 10,
+    ) -> List[List[str]]:
+        """Returns the exact nearest node ids of each embedding.
+
+        Index scans are disabled for the transaction, so the neighbors come from a
+        sequential scan and can serve as ground truth for approximate searches.
+        """
+        from sqlalchemy import select, text
+
+        neighbors = []
+        with self._session() as session, session.begin():
+            session.execute(text("SET LOCAL enable_indexscan = off"))
+            session.execute(text("SET LOCAL enable_bitmapscan = off"))
+            for embedding in embeddings:
+                stmt = (
+                    select(self._table_class.node_id)
+                    .order_by(self._table_class.embedding.cosine_distance(embedding))
+                    .limit(top_k)
+                )
+                neighbors.append(list(session.execute(stmt).scalars().all()))
+        return neighbors
+
+    def measure_recall(
+        self,
+        sample_size: int = 100,
+        top_k: int = 10,
+        pgdiskann_kwargs: Optional[Dict[str, Any]] = None,
+        index_name: Optional[str] = None,
+    ) -> float:
+        """Measures recall@k of index searches against an exact scan for sampled vectors.
+
+        Args:
+            sample_size (int): Number of stored vectors used as queries.
+            top_k (int): Number of neighbors compared per query.
+            pgdiskann_kwargs (Optional[Dict[str, Any]]): Search parameters to use instead
+                of the store's own ("diskann_l_value_is", "quantized_fetch_limit").
+            index_name (Optional[str]): Index the searches are forced to scan, such as a
+                rebuilt index not swapped in yet, instead of the one the planner picks.
+                Forcing an index requires the pg_hint_plan extension.
+
+        Returns:
+            float: The fraction of exact neighbors returned by the index searches.
+        """
+        from sqlalchemy import event, func, select, text
+
+        search_kwargs = {**(self.pgdiskann_kwargs or {}), **(pgdiskann_kwargs or {})}
+
+        with self._session() as session:
+            sample = (
+                session.execute(
+                    select(self._table_class.embedding)
+                    .order_by(func.random())
+                    .limit(sample_size),
+                )
+                .scalars()
+                .all()
+            )
+
+        if not sample:
+            return 0.0
+
+        exact_neighbors = [
+            set(node_ids) for node_ids in self.get_exact_neighbors(sample, top_k)
+        ]
+
+        found = 0
+        with self._session() as session, session.begin():
+            if index_name:
+                hint = (
+                    f"/*+ IndexScan({self._table_class.__tablename__} {index_name}) */ "
+                )
+
+                @event.listens_for(
+                    session.connection(),
+                    "before_cursor_execute",
+                    retval=True,
+                )
+                def add_hint(conn, cursor, statement, parameters, context, executemany):
+                    return hint + statement, parameters
+
+            if "diskann_l_value_is" in search_kwargs:
+                session.execute(
+                    self._l_value_is_statement(search_kwargs["diskann_l_value_is"]),
+                )
+            for embedding, expected in zip(sample, exact_neighbors):
+                stmt = self._build_query(
+                    embedding,
+                    top_k,
+                    quantized_fetch_limit=search_kwargs.get("quantized_fetch_limit"),
+                )
+                found += len(
+                    expected & {row.node_id for row in session.execute(stmt)},
+                )
+
+            if index_name:
+                # Without pg_hint_plan the hint is silently ignored, and the searches may
+                # have scanned another index.
+                scans = session.execute(
+                    text(
+                        "SELECT pg_stat_get_xact_numscans(to_regclass(:index_name))",
+                    ).bindparams(index_name=f"{self.schema_name}.{index_name}"),
+                ).scalar()
+                if not scans or scans < len(sample):
+                    raise ValueError(
+                        f"Searches did not scan {index_name}, make sure pg_hint_plan is loaded.",
+                    )
+
+        expected_total = sum(len(expected) for expected in exact_neighbors)
+        return found / expected_total if expected_total else 0.0
+
+    def rebuild_pgdiskann_index(
+        self,
+        pgdiskann_kwargs: Dict[str, Any],
+        sample_size: int = 100,
+        top_k: int = 10,
+        min_recall: float = 0.9,
+        progress_interval: float = 10.0,
+    ) -> Dict[str, Any]:
+        """Rebuilds the pgdiskann index with new parameters without blocking searches.
+
+        A new index is built `CONCURRENTLY` under a versioned name while the active index
+        keeps serving queries. Its recall is then measured by forcing validation searches
+        onto it, see `measure_recall`, and it is dropped if it misses `min_recall`.
+        Otherwise the indexes are swapped by renaming them in a single transaction, so the
+        new index takes over the active name, and the old one is dropped `CONCURRENTLY`.
+
+        Args:
+            pgdiskann_kwargs (Dict[str, Any]): Index parameters overriding the current ones,
+                e.g. "diskann_max_neighbors", "diskann_l_value_ib", "pq_param_num_chunks".
+            sample_size (int): Number of stored vectors used to validate recall.
+            top_k (int): Number of neighbors compared per validation query.
+            min_recall (float): Minimum recall@k required to swap in the new index. Recall
+                is not validated when 0.
+            progress_interval (float): Seconds between build progress log lines.
+
+        Returns:
+            Dict[str, Any]: The new index parameters, measured recall and build duration.
+        """
+        import threading
+        import time
+
+        from sqlalchemy import text
+
+        new_kwargs = {**(self.pgdiskann_kwargs or {}), **pgdiskann_kwargs}
+        new_index_name = f"{self.index_name}_v{int(time.time())}"
+        retired_index_name = f"{self.index_name}_retired"
+        autocommit_engine = self._engine.execution_options(
+            isolation_level="AUTOCOMMIT",
+        )
+
+        def drop_concurrently(index_name: str) -> None:
+            with autocommit_engine.connect() as connection:
+                connection.execute(
+                    text(
+                        f"DROP INDEX CONCURRENTLY IF EXISTS {self.schema_name}.{index_name}",
+                    ),
+                )
+
+        # Left behind by an earlier rebuild that failed to drop it, it would fail the swap
+        drop_concurrently(retired_index_name)
+
+        build_finished = threading.Event()
+
+        def log_progress() -> None:
+            while not build_finished.wait(progress_interval):
+                for item in self.get_index_build_progress():
+                    _logger.info(f"Index build progress: {item}")
+
+        _logger.info(f"Building index {new_index_name} with {new_kwargs}")
+        started_at = time.monotonic()
+        progress_thread = threading.Thread(target=log_progress, daemon=True)
+        progress_thread.start()
+        try:
+            with autocommit_engine.connect() as connection:
+                connection.execute(
+                    self._get_pgdiskann_index_statement(
+                        new_index_name,
+                        new_kwargs,
+                        concurrently=True,
+                    ),
+                )
+        except Exception:
+            # A failed concurrent build leaves an invalid index behind.
+            drop_concurrently(new_index_name)
+            raise
+        finally:
+            build_finished.set()
+            progress_thread.join()
+        build_seconds = time.monotonic() - started_at
+
+        recall = None
+        try:
+            if min_recall > 0:
+                recall = self.measure_recall(
+                    sample_size=sample_size,
+                    top_k=top_k,
+                    pgdiskann_kwargs=new_kwargs,
+                    index_name=new_index_name,
+                )
+                _logger.info(
+                    f"Index parameters {new_kwargs} recall@{top_k}: {recall:.3f}",
+                )
+                if recall < min_recall:
+                    raise ValueError(
+                        f"Recall {recall:.3f} of the rebuilt index is below {min_recall}, keeping the active index.",
+                    )
+
+            with self._session() as session, session.begin():
+                session.execute(
+                    text(
+                        f"ALTER INDEX IF EXISTS {self.schema_name}.{self.index_name} "
+                        f"RENAME TO {retired_index_name}",
+                    ),
+                )
+                session.execute(
+                    text(
+                        f"ALTER INDEX {self.schema_name}.{new_index_name} "
+                        f"RENAME TO {self.index_name}",
+                    ),
+                )
+        except Exception:
+            drop_concurrently(new_index_name)
+            raise
+        drop_concurrently(retired_index_name)
+
+        self.pgdiskann_kwargs = new_kwargs
+        _logger.info(f"Index {self.index_name} now uses {new_kwargs}")
+        return {
+            "index_name": self.index_name,
+            "pgdiskann_kwargs": new_kwargs,
+            f"recall@{top_k}": recall,
+            "build_seconds": round(build_seconds, 1),
+        }
+
     def _initialize(self) -> None:
         fail_on_error = self.initialization_fail_on_error
         if not self._is_initialized:
@@ -421,6 +800,7 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
     def _node_to_table_row(self, node: BaseNode) -> Any:
         return self._table_class(
             node_id=node.node_id,
+            content_hash=node.hash,
             embedding=node.get_embedding(),
             text=node.get_content(metadata_mode=MetadataMode.NONE),
             metadata_=node_to_metadata_dict(
@@ -450,6 +830,91 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
             await session.commit()
         return ids
 
+    async def async_copy_add(self, nodes: List[BaseNode], **kwargs: Any) -> List[str]:
+        """Inserts nodes with a single binary COPY instead of one INSERT per node.
+
+        Vectors are sent in pgvector's binary format. The codec is registered on the
+        pooled connection only for the duration of the COPY, so ORM statements that bind
+        vectors as text keep working on that connection afterwards.
+
+        Args:
+            nodes (List[BaseNode]): Nodes with embeddings to insert.
+
+        Returns:
+            List[str]: IDs of the inserted nodes.
+        """
+        import json
+
+        from pgvector.asyncpg import register_vector
+
+        records = [
+            (
+                node.node_id,
+                node.hash,
+                node.get_content(metadata_mode=MetadataMode.NONE),
+                json.dumps(
+                    node_to_metadata_dict(
+                        node,
+                        remove_text=True,
+                        flat_metadata=self.flat_metadata,
+                    ),
+                ),
+                node.get_embedding(),
+            )
+            for node in nodes
+        ]
+
+        async with self._async_engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            asyncpg_connection = raw_connection.driver_connection
+            await register_vector(asyncpg_connection)
+            try:
+                await asyncpg_connection.copy_records_to_table(
+                    self._table_class.__tablename__,
+                    schema_name=self.schema_name,
+                    columns=[
+                        "node_id",
+                        "content_hash",
+                        "text",
+                        "metadata_",
+                        "embedding",
+                    ],
+                    records=records,
+                )
+            finally:
+                await asyncpg_connection.reset_type_codec("vector", schema="public")
+
+        return [node.node_id for node in nodes]
+
+    async def async_upsert(self, nodes: List[BaseNode], **kwargs: Any) -> List[str]:
+        """Replaces the rows of nodes with the same node ids, or inserts them if absent.
+
+        Args:
+            nodes (List[BaseNode]): Nodes with embeddings to upsert.
+
+        Returns:
+            List[str]: IDs of the upserted nodes.
+        """
+        from sqlalchemy import delete
+
+        ids = [node.node_id for node in nodes]
+        async with self._async_session() as session, session.begin():
+            await session.execute(
+                delete(self._table_class).where(self._table_class.node_id.in_(ids)),
+            )
+            session.add_all([self._node_to_table_row(node) for node in nodes])
+            await session.commit()
+        return ids
+
+    async def aget_content_hashes(self) -> Dict[str, Optional[str]]:
+        """Returns the stored content hash of every node, keyed by node id."""
+        from sqlalchemy import select
+
+        stmt = select(self._table_class.node_id, self._table_class.content_hash)
+        async with self._async_session() as async_session:
+            res = await async_session.execute(stmt)
+            return {item.node_id: item.content_hash for item in res.all()}
+
     def _to_postgres_operator(self, operator: FilterOperator) -> str:
         if operator == FilterOperator.EQ:
             return "="
@@ -614,6 +1079,171 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
 
         return self._apply_filters_and_limit(stmt, limit)
 
+    @property
+    def search_metrics(self) -> SearchMetrics:
+        """Rounds and exact-scan fallbacks of the searches run by this store."""
+        return self._search_metrics
+
+    @staticmethod
+    def _l_value_is_statement(l_value_is: Any) -> Any:
+        """Returns the statement setting the search list size for the transaction.
+
+        Unlike `SET`, `set_config` takes the value as a bound parameter with every driver.
+        """
+        from sqlalchemy import text
+
+        return text(
+            "SELECT set_config('diskann.l_value_is', :l_value_is, true)",
+        ).bindparams(l_value_is=str(int(l_value_is)))
+
+    def _search_kwarg(self, key: str, default: Any, **kwargs: Any) -> Any:
+        value = kwargs.get(key)
+        if value is None:
+            value = (self.pgdiskann_kwargs or {}).get(key)
+        return default if value is None else value
+
+    def _widening_schedule(
+        self,
+        filtered: bool,
+        **kwargs: Any,
+    ) -> Iterator[Tuple[Optional[int], Optional[float]]]:
+        """Yields the `(quantized_fetch_limit, l_value_is)` pair of each search round.
+
+        Unfiltered searches run a single round. Filtered searches discard candidates after
+        the index scan, so every further round widens both the candidate pool and the
+        search list by `widening_factor`, until `widening_max_rounds` or
+        `widening_max_fetch_limit` is reached.
+        """
+        fetch_limit = self._search_kwarg("quantized_fetch_limit", None, **kwargs)
+        l_value_is = self._search_kwarg("diskann_l_value_is", None, **kwargs)
+        yield fetch_limit, l_value_is
+        if not filtered or (fetch_limit is None and l_value_is is None):
+            return
+
+        factor = self._search_kwarg(
+            "widening_factor",
+            self.WIDENING_FACTOR_DEFAULT,
+            **kwargs,
+        )
+        max_rounds = self._search_kwarg(
+            "widening_max_rounds",
+            self.WIDENING_MAX_ROUNDS_DEFAULT,
+            **kwargs,
+        )
+        max_fetch_limit = self._search_kwarg(
+            "widening_max_fetch_limit",
+            self.WIDENING_MAX_FETCH_LIMIT_DEFAULT,
+            **kwargs,
+        )
+        for _ in range(max_rounds - 1):
+            widest = max(fetch_limit or 0, l_value_is or 0)
+            if widest >= max_fetch_limit:
+                return
+            if fetch_limit is not None:
+                fetch_limit = min(fetch_limit * factor, max_fetch_limit)
+            if l_value_is is not None:
+                l_value_is = min(l_value_is * factor, max_fetch_limit)
+            yield fetch_limit, l_value_is
+
+    def _selectivity_statement(self, metadata_filters: MetadataFilters) -> Any:
+        """Returns the statement estimating the filtered row count."""
+        from sqlalchemy import select, text
+        from sqlalchemy.dialects import postgresql
+
+        filtered = select(self._table_class.id).where(
+            self._recursively_apply_filters(metadata_filters),
+        )
+        compiled = filtered.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True},
+        )
+        return text(f"EXPLAIN (FORMAT JSON) {compiled}")
+
+    def _total_rows_statement(self) -> Any:
+        """Returns the statement reading the planner's estimate of the total row count."""
+        from sqlalchemy import text
+
+        return text(
+            "SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table_name)",
+        ).bindparams(
+            table_name=f"{self.schema_name}.{self._table_class.__tablename__}",
+        )
+
+    def _get_cached_total_rows(self) -> Tuple[bool, Optional[float]]:
+        """Returns whether the cached total row count is fresh, and the count."""
+        import time
+
+        if self._total_rows is None:
+            return False, None
+        total_rows, read_at = self._total_rows
+        return time.monotonic() - read_at < self.TOTAL_ROWS_TTL_SECONDS, total_rows
+
+    def _cache_total_rows(self, total_rows: Optional[float]) -> Optional[float]:
+        import time
+
+        self._total_rows = (total_rows, time.monotonic())
+        return total_rows
+
+    def _is_selective(
+        self,
+        plan: Any,
+        total_rows: Optional[float],
+        **kwargs: Any,
+    ) -> bool:
+        """Whether the planner expects the filter to keep too few rows for an index search.
+
+        A filter is selective when it keeps less than `exact_scan_selectivity` of the
+        rows, or no more rows than the widest candidate pool of an index search, which
+        would compare at least as many distances as the exact scan.
+        """
+        import json
+
+        if not total_rows or total_rows <= 0:
+            # The table has never been analyzed.
+            return False
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plan_rows = plan[0]["Plan"]["Plan Rows"]
+        max_fetch_limit = self._search_kwarg(
+            "widening_max_fetch_limit",
+            self.WIDENING_MAX_FETCH_LIMIT_DEFAULT,
+            **kwargs,
+        )
+        min_selectivity = self._search_kwarg(
+            "exact_scan_selectivity",
+            self.EXACT_SCAN_SELECTIVITY_DEFAULT,
+            **kwargs,
+        )
+        return plan_rows <= max_fetch_limit or plan_rows / total_rows < min_selectivity
+
+    def _build_exact_query(
+        self,
+        embedding: Optional[List[float]],
+        limit: int = 10,
+        metadata_filters: Optional[MetadataFilters] = None,
+    ) -> Any:
+        from sqlalchemy import select, text
+
+        stmt = select(  # type: ignore
+            self._table_class.id,
+            self._table_class.node_id,
+            self._table_class.text,
+            self._table_class.metadata_,
+            self._table_class.embedding.cosine_distance(embedding).label("distance"),
+        ).order_by(text("distance asc"))
+        return self._apply_filters_and_limit(stmt, limit, metadata_filters)
+
+    def _to_db_embedding_rows(self, rows: Any) -> List[DBEmbeddingRow]:
+        return [
+            DBEmbeddingRow(
+                node_id=item.node_id,
+                text=item.text,
+                metadata=item.metadata_,
+                similarity=(1 - item.distance) if item.distance is not None else 0,
+            )
+            for item in rows
+        ]
+
     def _query_with_score(
         self,
         embedding: Optional[List[float]],
@@ -621,31 +1251,48 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
         metadata_filters: Optional[MetadataFilters] = None,
         **kwargs: Any,
     ) -> List[DBEmbeddingRow]:
-        stmt = self._build_query(embedding, limit, metadata_filters, **kwargs)
-        with self._session() as session, session.begin():
-            from sqlalchemy import text
-
-            diskann_l_value_is = (
-                kwargs.get("diskann_l_value_is")
-                or self.pgdiskann_kwargs["diskann_l_value_is"]
-            )
-            session.execute(
-                text("SET diskann.l_value_is = :l_value_is"),
-                {"l_value_is": diskann_l_value_is},
-            )
+        from sqlalchemy import text
 
-            res = session.execute(
-                stmt,
-            )
-            return [
-                DBEmbeddingRow(
-                    node_id=item.node_id,
-                    text=item.text,
-                    metadata=item.metadata_,
-                    similarity=(1 - item.distance) if item.distance is not None else 0,
+        filtered = bool(metadata_filters and metadata_filters.filters)
+        with self._session() as session, session.begin():
+            if filtered:
+                fresh, total_rows = self._get_cached_total_rows()
+                if not fresh:
+                    total_rows = self._cache_total_rows(
+                        session.execute(self._total_rows_statement()).scalar(),
+                    )
+                if self._is_selective(
+                    session.execute(
+                        self._selectivity_statement(metadata_filters),
+                    ).scalar(),
+                    total_rows,
+                    **kwargs,
+                ):
+                    session.execute(text("SET LOCAL enable_indexscan = off"))
+                    res = session.execute(
+                        self._build_exact_query(embedding, limit, metadata_filters),
+                    )
+                    self._search_metrics.record(filtered, 0, exact_scan=True)
+                    return self._to_db_embedding_rows(res.all())
+
+            rows: List[Any] = []
+            rounds = 0
+            for fetch_limit, l_value_is in self._widening_schedule(filtered, **kwargs):
+                rounds += 1
+                if l_value_is is not None:
+                    session.execute(self._l_value_is_statement(l_value_is))
+                stmt = self._build_query(
+                    embedding,
+                    limit,
+                    metadata_filters,
+                    **{**kwargs, "quantized_fetch_limit": fetch_limit},
                 )
-                for item in res.all()
-            ]
+                rows = session.execute(stmt).all()
+                if len(rows) >= limit:
+                    break
+
+            self._search_metrics.record(filtered, rounds, starved=len(rows) < limit)
+            return self._to_db_embedding_rows(rows)
 
     async def _aquery_with_score(
         self,
@@ -654,29 +1301,56 @@ class PGDiskAnnVectorStore(BasePydanticVectorStore):
         metadata_filters: Optional[MetadataFilters] = None,
         **kwargs: Any,
     ) -> List[DBEmbeddingRow]:
-        stmt = self._build_query(embedding, limit, metadata_filters)
-        async with self._async_session() as async_session, async_session.begin():
-            from sqlalchemy import text
+        from sqlalchemy import text
 
-            if self.pgdiskann_kwargs:
-                diskann_l_value_is = (
-                    kwargs.get("diskann_l_value_is")
-                    or self.pgdiskann_kwargs["diskann_l_value_is"]
-                )
-                await async_session.execute(
-                    text(f"SET diskann.l_value_is = {diskann_l_value_is}"),
+        filtered = bool(metadata_filters and metadata_filters.filters)
+        async with self._async_session() as async_session, async_session.begin():
+            if filtered:
+                fresh, total_rows = self._get_cached_total_rows()
+                if not fresh:
+                    total_rows = self._cache_total_rows(
+                        (
+                            await async_session.execute(self._total_rows_statement())
+                        ).scalar(),
+                    )
+                if self._is_selective(
+                    (
+                        await async_session.execute(
+                            self._selectivity_statement(metadata_filters),
+                        )
+                    ).scalar(),
+                    total_rows,
+                    **kwargs,
+                ):
+                    await async_session.execute(
+                        text("SET LOCAL enable_indexscan = off"),
+                    )
+                    res = await async_session.execute(
+                        self._build_exact_query(embedding, limit, metadata_filters),
+                    )
+                    self._search_metrics.record(filtered, 0, exact_scan=True)
+                    return self._to_db_embedding_rows(res.all())
+
+            rows: List[Any] = []
+            rounds = 0
+            for fetch_limit, l_value_is in self._widening_schedule(filtered, **kwargs):
+                rounds += 1
+                if l_value_is is not None:
+                    await async_session.execute(
+                        self._l_value_is_statement(l_value_is),
+                    )
+                stmt = self._build_query(
+                    embedding,
+                    limit,
+                    metadata_filters,
+                    **{**kwargs, "quantized_fetch_limit": fetch_limit},
                 )
+                rows = (await async_session.execute(stmt)).all()
+                if len(rows) >= limit:
+                    break
 
-            res = await async_session.execute(stmt)
-            return [
-                DBEmbeddingRow(
-                    node_id=item.node_id,
-                    text=item.text,
-                    metadata=item.metadata_,
-                    similarity=(1 - item.distance) if item.distance is not None else 0,
-                )
-                for item in res.all()
-            ]
+            self._search_metrics.record(filtered, rounds, starved=len(rows) < limit)
+            return self._to_db_embedding_rows(rows)
 
     def _db_rows_to_query_result(
         self,
@@ -12,10 +12,19 @@ from src.config.config import settings
 from src.config.embed_model import EmbedModelManager
 from src.config.llm import LLMManager
 from src.config.vector_store import VectorStoreManager
-from src.database import engine, sync_engine
+from src.database import (
+    engine,
+    graph_engine,
+    rate_limit_engine,
+    read_engine,
+    sync_engine,
+)
 from src.logging import logger
-from src.middleware.user_middleware import add_user_id_to_request
-from src.routes import agents, products, reset, reviews, users
+from src.middleware.user_middleware import WRITE_MARKER_HEADER, add_user_id_to_request
+from src.routes import agents, metrics, products, reset, reviews, users
+from src.services.catalog_cache import CatalogCache
+from src.services.memory import MemoryService
+from src.services.view_counter import ViewCounter
 from starlette.responses import FileResponse
 
 
@@ -49,19 +58,29 @@ async def lifespan(app: FastAPI):
         await register_vector(asyncpg_conn)
         logger.info("pgvector extension registered successfully")
 
-    # Create global instances
+    # Create global instances. The vector stores share the app's engines, so each
+    # worker holds a single pool of connections.
     app.state.vector_store_products_embeddings = (
         await VectorStoreManager.get_vector_store(
             db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_PRODUCTS,
+            engine=sync_engine,
+            async_engine=engine,
         )
     )
     app.state.vector_store_reviews_embeddings = (
         await VectorStoreManager.get_vector_store(
             db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_REVIEWS,
+            engine=sync_engine,
+            async_engine=engine,
         )
     )
     app.state.llm = await LLMManager.get_llm()
     app.state.embed_model = await EmbedModelManager.get_embed_model()
+    app.state.catalog_cache = CatalogCache()
+    await app.state.catalog_cache.start()
+    app.state.memory = MemoryService(app.state.catalog_cache)
+    app.state.view_counter = ViewCounter()
+    await app.state.view_counter.start()
 
     tracer_provider = register(
         project_name=settings.PHOENIX_PROJECT_NAME,
@@ -79,12 +98,24 @@ async def lifespan(app: FastAPI):
 
     yield  # App runs
 
+    await app.state.memory.drain()
+    await app.state.view_counter.stop()
+    await app.state.catalog_cache.stop()
+
     app.state.vector_store_products_embeddings = None
     app.state.vector_store_reviews_embeddings = None
     app.state.llm = None
     app.state.embed_model = None
+    app.state.catalog_cache = None
+    app.state.memory = None
+    app.state.view_counter = None
     sync_engine.dispose()
     await engine.dispose()
+    await graph_engine.dispose()
+    if read_engine:
+        await read_engine.dispose()
+    if rate_limit_engine:
+        await rate_limit_engine.dispose()
 
 
 def custom_openapi():
@@ -136,6 +167,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[WRITE_MARKER_HEADER],
 )
 
 app.openapi = custom_openapi
@@ -145,6 +177,7 @@ app.include_router(reviews.router, prefix="/api/v1")
 app.include_router(agents.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(reset.router, prefix="/api/v1")
+app.include_router(metrics.router, prefix="/api/v1")
 
 
 app.mount("/data", CachedStaticFiles(directory="data/"), name="data")
@@ -1,9 +1,29 @@
 from fastapi import Request
+from src.database import WriteMarker, current_write_marker
+
+# Carries when the client last committed on the primary, see WriteMarker
+WRITE_MARKER_HEADER = "X-Last-Write-At"
 
 
 async def add_user_id_to_request(request: Request, call_next):
     user_id = request.headers.get("X-User-ID")
     if user_id:
         request.state.user_id = int(user_id)
+
+    marker = WriteMarker(user_id=int(user_id) if user_id else None)
+    try:
+        marker.written_at = float(request.headers.get(WRITE_MARKER_HEADER, ""))
+    except ValueError:
+        pass
+    catalog_cache = getattr(request.app.state, "catalog_cache", None)
+    if marker.user_id is not None and catalog_cache is not None:
+        published_at = catalog_cache.get_user_write(marker.user_id)
+        if published_at is not None:
+            marker.written_at = max(marker.written_at or 0.0, published_at)
+    current_write_marker.set(marker)
+
     response = await call_next(request)
+    marker.detached = True
+    if marker.wrote:
+        response.headers[WRITE_MARKER_HEADER] = f"{marker.written_at:.3f}"
     return response
@@ -1,6 +1,7 @@
 from .features import Feature
 from .product_features import ProductFeature
-from .products import PersonalizedProductSection, Product, ProductImage
+from .products import PersonalizedProductSection, Product, ProductImage, ProductView
+from .review_digests import ReviewDigest
 from .reviews import Review
 from .users import User
 from .variant_attributes import VariantAttribute
@@ -10,7 +11,9 @@ __all__ = [
     "User",
     "Product",
     "ProductImage",
+    "ProductView",
     "Review",
+    "ReviewDigest",
     "PersonalizedProductSection",
     "Variant",
     "VariantAttribute",
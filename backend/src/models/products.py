@@ -1,6 +1,8 @@
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import (
     DECIMAL,
+    BigInteger,
+    Boolean,
     Column,
     DateTime,
     Enum,
@@ -13,7 +15,7 @@ from sqlalchemy import (
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.schema import PrimaryKeyConstraint
-from src.schemas.enums import StatusEnum
+from src.schemas.enums import PersonalizationSource, StatusEnum
 
 from .base import Base
 
@@ -80,6 +82,17 @@ class PersonalizedProductSection(Base):
         nullable=False,
     )
     phoenix_trace_id = Column(String(128), nullable=True)
+    source = Column(
+        String(16),
+        server_default=PersonalizationSource.ON_DEMAND.value,
+        nullable=False,
+    )
+    first_viewed_at = Column(DateTime(timezone=True), nullable=True)
+    served_warm = Column(Boolean, nullable=True)
+    # Versions of the inputs the section was generated from, see `get_input_versions`
+    input_versions = Column(JSONB, nullable=True)
+    # Agents the planner chose for the section
+    agents = Column(JSONB, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     product = relationship("Product", back_populates="personalization")
@@ -89,3 +102,18 @@ class PersonalizedProductSection(Base):
 
     def to_dict(self):
         return jsonable_encoder(self)
+
+
+class ProductView(Base):
+    __tablename__ = "product_views"
+
+    product_id = Column(
+        Integer,
+        ForeignKey("products.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    view_count = Column(BigInteger, nullable=False, default=0)
+    last_viewed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def to_dict(self):
+        return jsonable_encoder(self)
@@ -0,0 +1,26 @@
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from .base import Base
+
+
+class ReviewDigest(Base):
+    __tablename__ = "product_review_digests"
+
+    product_id = Column(
+        Integer,
+        ForeignKey("products.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    digest = Column(JSONB, nullable=False)
+    source_hash = Column(Text, nullable=False)
+    source_version = Column(BigInteger, nullable=True)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    def to_dict(self):
+        return jsonable_encoder(self)
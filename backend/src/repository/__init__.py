@@ -1,5 +1,6 @@
 from .personalized_product_section import PersonalizedProductRepository
 from .products import ProductRepository
+from .review_digests import ReviewDigestRepository
 from .reviews import ReviewRepository
 from .users import UserRepository
 from .variants import VariantRepository
@@ -8,6 +9,7 @@ __all__ = [
     "ProductRepository",
     "UserRepository",
     "ReviewRepository",
+    "ReviewDigestRepository",
     "PersonalizedProductRepository",
     "VariantRepository",
 ]
@@ -1,8 +1,9 @@
 from typing import List, Optional
 
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import Row, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
 from src.models import PersonalizedProductSection
 from src.repository.base import BaseRepository
 
@@ -104,3 +105,45 @@ class PersonalizedProductRepository(
         if await self.exists(id):
             return await self.update(id, entity)
         return await self.add(entity)
+
+    async def record_first_open(
+        self,
+        id: tuple[int, int],
+        served_warm: bool,
+    ) -> bool:
+        """
+        Records the user's first opening of the section.
+
+        Returns:
+            bool: Whether this was the first opening.
+        """
+        product_id, user_id = id
+        query = (
+            update(PersonalizedProductSection)
+            .filter(
+                PersonalizedProductSection.product_id == product_id,
+                PersonalizedProductSection.user_id == user_id,
+                PersonalizedProductSection.first_viewed_at.is_(None),
+            )
+            .values(first_viewed_at=func.now(), served_warm=served_warm)
+        )
+        result = await self.db.execute(query)
+        await self.db.commit()
+        return result.rowcount > 0
+
+    async def get_first_open_stats(self) -> List[Row]:
+        """Counts generated, opened and warm-served sections per source."""
+        query = text(
+            """
+            SELECT
+                source,
+                count(*) AS generated,
+                count(first_viewed_at) AS opened,
+                count(*) FILTER (WHERE served_warm) AS served_warm
+            FROM personalized_product_sections
+            GROUP BY source
+            ORDER BY source
+            """,
+        )
+        result = await self.db.execute(query)
+        return list(result.all())
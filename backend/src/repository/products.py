@@ -1,7 +1,7 @@
 from typing import List, Optional
 
 from fastapi import HTTPException
-from sqlalchemy import func, select
+from sqlalchemy import Row, func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from src.models import Product, Review, Variant
@@ -39,6 +39,94 @@ class ProductRepository(BaseRepository[Product, int]):
         product.average_rating = round(average_rating, 2)
         return product
 
+    async def get_detail_json(self, id: int) -> Optional[bytes]:
+        """
+        Build the product detail document in the database.
+
+        Returns the JSON of `ProductDetailsResponseSchema` from a single statement, with
+        variants, attributes, images, reviews and the average rating assembled by
+        correlated `json_agg` subqueries, instead of five queries and Python-side nesting.
+        """
+        query = text(
+            """
+            SELECT json_build_object(
+                'id', p.id,
+                'name', p.name,
+                'category', p.category,
+                'price', p.price::float8,
+                'average_rating', COALESCE(
+                    (SELECT round(avg(r.rating), 2) FROM product_reviews r WHERE r.product_id = p.id),
+                    0
+                )::float8,
+                'brand', p.brand,
+                'description', p.description,
+                'specifications', p.specifications,
+                'created_at', p.created_at,
+                'reviews', COALESCE(
+                    (
+                        SELECT json_agg(
+                            json_build_object(
+                                'id', r.id,
+                                'user_name', r.user_name,
+                                'review', r.review,
+                                'rating', r.rating::float8,
+                                'created_at', r.created_at
+                            )
+                            ORDER BY r.id
+                        )
+                        FROM product_reviews r
+                        WHERE r.product_id = p.id
+                    ),
+                    '[]'::json
+                ),
+                'images', COALESCE(
+                    (
+                        SELECT json_agg(
+                            json_build_object('id', i.id, 'image_url', i.image_url)
+                            ORDER BY i.id
+                        )
+                        FROM product_images i
+                        WHERE i.product_id = p.id
+                    ),
+                    '[]'::json
+                ),
+                'variants', COALESCE(
+                    (
+                        SELECT json_agg(
+                            json_build_object(
+                                'id', v.id,
+                                'price', v.price::float8,
+                                'in_stock', v.in_stock,
+                                'attributes', COALESCE(
+                                    (
+                                        SELECT json_agg(
+                                            json_build_object(
+                                                'attribute_name', a.attribute_name,
+                                                'attribute_value', a.attribute_value
+                                            )
+                                            ORDER BY a.id
+                                        )
+                                        FROM variant_attributes a
+                                        WHERE a.variant_id = v.id
+                                    ),
+                                    '[]'::json
+                                )
+                            )
+                            ORDER BY v.id
+                        )
+                        FROM variants v
+                        WHERE v.product_id = p.id
+                    ),
+                    '[]'::json
+                )
+            )::text
+            FROM products p
+            WHERE p.id = :product_id
+            """,
+        )
+        document = await self.db.scalar(query, {"product_id": id})
+        return document.encode() if document is not None else None
+
     async def get_all(self, page: int, page_size: int) -> tuple[int, List[Product]]:
         query = (
             select(
@@ -103,6 +191,122 @@ class ProductRepository(BaseRepository[Product, int]):
         result = await self.db.execute(query)
         return result.scalar_one_or_none() is not None
 
+    async def add_views(self, counts: dict[int, int]) -> None:
+        """Adds openings of product pages, counted per product id."""
+        product_ids = sorted(counts)
+        await self.db.execute(
+            text(
+                """
+                INSERT INTO product_views (product_id, view_count)
+                SELECT v.product_id, v.view_count
+                FROM unnest(CAST(:product_ids AS INTEGER[]), CAST(:view_counts AS BIGINT[]))
+                    AS v(product_id, view_count)
+                JOIN products p ON p.id = v.product_id
+                ORDER BY v.product_id
+                ON CONFLICT (product_id) DO UPDATE
+                SET view_count = product_views.view_count + EXCLUDED.view_count,
+                    last_viewed_at = now()
+                """,
+            ),
+            {
+                "product_ids": product_ids,
+                "view_counts": [counts[product_id] for product_id in product_ids],
+            },
+        )
+        await self.db.commit()
+
+    async def get_popularity(self) -> List[Row]:
+        """Returns the view count, review count and average rating of every product."""
+        query = text(
+            """
+            SELECT
+                p.id AS product_id,
+                COALESCE(v.view_count, 0) AS view_count,
+                count(r.id) AS review_count,
+                COALESCE(avg(r.rating), 0)::float8 AS average_rating
+            FROM products p
+            LEFT JOIN product_views v ON v.product_id = p.id
+            LEFT JOIN product_reviews r ON r.product_id = p.id
+            GROUP BY p.id, v.view_count
+            """,
+        )
+        result = await self.db.execute(query)
+        return list(result.all())
+
+    async def get_input_fingerprints(
+        self,
+        product_id: int,
+        low_stock_threshold: int,
+    ) -> Optional[Row]:
+        """
+        Fingerprints the product, its variants and their stock separately.
+
+        `variants` covers the prices and attributes of the variants but not their stock, and
+        `stock` only covers whether each variant is out of, low in or in stock, so a sale
+        that leaves a variant in stock changes neither.
+        """
+        query = text(
+            """
+            SELECT
+                md5(
+                    concat_ws(
+                        ':', p.name, p.category, p.price, p.brand, p.description,
+                        p.specifications::text
+                    )
+                ) AS product,
+                (
+                    SELECT md5(
+                        COALESCE(
+                            string_agg(
+                                concat_ws(
+                                    ':', v.id, v.price,
+                                    (
+                                        SELECT string_agg(
+                                            a.attribute_name || '=' || a.attribute_value,
+                                            ',' ORDER BY a.id
+                                        )
+                                        FROM variant_attributes a
+                                        WHERE a.variant_id = v.id
+                                    )
+                                ),
+                                ',' ORDER BY v.id
+                            ),
+                            ''
+                        )
+                    )
+                    FROM variants v
+                    WHERE v.product_id = p.id
+                ) AS variants,
+                (
+                    SELECT md5(
+                        COALESCE(
+                            string_agg(
+                                concat_ws(
+                                    ':', v.id,
+                                    CASE
+                                        WHEN v.in_stock <= 0 THEN 'out'
+                                        WHEN v.in_stock < :low_stock_threshold THEN 'low'
+                                        ELSE 'in'
+                                    END
+                                ),
+                                ',' ORDER BY v.id
+                            ),
+                            ''
+                        )
+                    )
+                    FROM variants v
+                    WHERE v.product_id = p.id
+                ) AS stock
+            FROM products p
+            WHERE p.id = :product_id
+            """,
+        )
+        result = await self.db.execute(
+            query,
+            {"product_id": product_id, "low_stock_threshold": low_stock_threshold},
+        )
+        return result.first()
+
     async def get_paginated(self, page: int, page_size: int):
         query = (
             select(
@@ -0,0 +1,232 @@
+from typing import List, Optional
+
+from sqlalchemy import exists, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models import ReviewDigest
+from src.repository.base import BaseRepository
+
+# Fingerprint of the reviews of the products in :product_ids, or of all products when NULL.
+# It covers every review field a digest is built from, so it only changes when a review is
+# added, removed or edited.
+FINGERPRINTS_QUERY = """
+    SELECT
+        p.id AS product_id,
+        md5(
+            COALESCE(
+                string_agg(
+                    concat_ws(':', r.id, r.feature_id, r.sentiment, r.rating, md5(r.review)),
+                    ',' ORDER BY r.id
+                ),
+                ''
+            )
+        ) AS source_hash
+    FROM products p
+    LEFT JOIN product_reviews r ON r.product_id = p.id
+    WHERE CAST(:product_ids AS INTEGER[]) IS NULL
+        OR p.id = ANY(CAST(:product_ids AS INTEGER[]))
+    GROUP BY p.id
+"""
+
+
+class ReviewDigestRepository(BaseRepository[ReviewDigest, int]):
+    """Repository for managing per-product review digests."""
+
+    def __init__(self, db: AsyncSession):
+        self.db: AsyncSession = db
+
+    async def get_by_id(self, id: int) -> Optional[ReviewDigest]:
+        """Retrieve the digest of a product by the product ID."""
+        query = select(ReviewDigest).filter(ReviewDigest.product_id == id)
+        result = await self.db.execute(query)
+        return result.scalar_one_or_none()
+
+    async def get_all(self) -> List[ReviewDigest]:
+        """Retrieve all digests."""
+        query = select(ReviewDigest)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def add(self, entity: ReviewDigest) -> ReviewDigest:
+        """Add a new digest."""
+        self.db.add(entity)
+        await self.db.commit()
+        await self.db.refresh(entity)
+        return entity
+
+    async def update(self, id: int, entity: ReviewDigest) -> Optional[ReviewDigest]:
+        """Replace the digest of a product, inserting it when missing."""
+        query = (
+            insert(ReviewDigest)
+            .values(
+                product_id=id,
+                digest=entity.digest,
+                source_hash=entity.source_hash,
+                source_version=entity.source_version,
+            )
+            .on_conflict_do_update(
+                index_elements=[ReviewDigest.product_id],
+                set_={
+                    "digest": entity.digest,
+                    "source_hash": entity.source_hash,
+                    "source_version": entity.source_version,
+                    "updated_at": text("now()"),
+                },
+            )
+            .returning(ReviewDigest)
+        )
+        result = await self.db.execute(
+            query,
+            execution_options={"populate_existing": True},
+        )
+        digest = result.scalar_one()
+        await self.db.commit()
+        return digest
+
+    async def delete(self, id: int) -> bool:
+        """Delete the digest of a product."""
+        digest = await self.get_by_id(id)
+        if not digest:
+            return False
+
+        await self.db.delete(digest)
+        await self.db.commit()
+        return True
+
+    async def exists(self, id: int) -> bool:
+        """Check if a product has a digest."""
+        query = select(exists().where(ReviewDigest.product_id == id))
+        result = await self.db.execute(query)
+        return result.scalar()
+
+    async def get_stale(
+        self,
+        product_ids: Optional[List[int]] = None,
+    ) -> dict[int, int]:
+        """
+        Find products whose digest is missing or was built before their reviews changed.
+
+        The catalog cache triggers bump a product's version whenever its reviews change, so
+        comparing versions spares aggregating the reviews of every product.
+
+        Returns:
+            dict[int, int]: The current catalog cache version of every stale product.
+        """
+        query = text(
+            """
+            SELECT p.id AS product_id, COALESCE(v.version, 0) AS version
+            FROM products p
+            LEFT JOIN catalog_cache_versions v ON v.key = 'product:' || p.id
+            LEFT JOIN product_review_digests d ON d.product_id = p.id
+            WHERE (
+                CAST(:product_ids AS INTEGER[]) IS NULL
+                OR p.id = ANY(CAST(:product_ids AS INTEGER[]))
+            )
+            AND d.source_version IS DISTINCT FROM COALESCE(v.version, 0)
+            """,
+        )
+        result = await self.db.execute(query, {"product_ids": product_ids})
+        return {row.product_id: row.version for row in result}
+
+    async def get_source_hash(self, product_id: int) -> Optional[str]:
+        """Returns the fingerprint of the reviews the product's stored digest was built from."""
+        result = await self.db.execute(
+            select(ReviewDigest.source_hash).filter(
+                ReviewDigest.product_id == product_id,
+            ),
+        )
+        return result.scalar_one_or_none()
+
+    async def get_fingerprint(self, product_id: int) -> Optional[str]:
+        """Returns the current fingerprint of the product's reviews."""
+        result = await self.db.execute(
+            text(FINGERPRINTS_QUERY),
+            {"product_ids": [product_id]},
+        )
+        row = result.first()
+        return row.source_hash if row else None
+
+    async def build(
+        self,
+        product_id: int,
+        quotes_per_sentiment: int = 2,
+        quote_length: int = 200,
+    ) -> dict:
+        """
+        Aggregate the reviews of a product into a digest.
+
+        Reviews are grouped by the feature they discuss, with sentiment counts, the average
+        rating and the most clear-cut reviews of each sentiment as quotes: those with the
+        most extreme rating, then the longest.
+        """
+        query = text(
+            """
+            WITH ranked AS (
+                SELECT
+                    r.feature_id,
+                    lower(r.sentiment) AS sentiment,
+                    r.rating,
+                    r.review,
+                    row_number() OVER (
+                        PARTITION BY r.feature_id, lower(r.sentiment)
+                        ORDER BY abs(r.rating - 3) DESC, length(r.review) DESC, r.id
+                    ) AS quote_rank
+                FROM product_reviews r
+                WHERE r.product_id = :product_id
+            ),
+            feature_digests AS (
+                SELECT
+                    COALESCE(f.feature_name, 'general') AS feature,
+                    count(*) AS review_count,
+                    count(*) FILTER (WHERE ranked.sentiment = 'positive') AS positive,
+                    count(*) FILTER (WHERE ranked.sentiment = 'negative') AS negative,
+                    count(*) FILTER (WHERE ranked.sentiment = 'neutral') AS neutral,
+                    round(avg(ranked.rating), 2)::float8 AS average_rating,
+                    COALESCE(
+                        json_agg(
+                            json_build_object(
+                                'sentiment', ranked.sentiment,
+                                'rating', ranked.rating::float8,
+                                'quote', left(ranked.review, :quote_length)
+                            )
+                            ORDER BY ranked.quote_rank, ranked.sentiment
+                        ) FILTER (WHERE ranked.quote_rank <= :quotes_per_sentiment),
+                        '[]'::json
+                    ) AS quotes
+                FROM ranked
+                LEFT JOIN features f ON f.id = ranked.feature_id
+                GROUP BY f.feature_name
+            )
+            SELECT json_build_object(
+                'review_count', COALESCE(sum(review_count), 0),
+                'average_rating', COALESCE(
+                    (SELECT round(avg(r.rating), 2) FROM product_reviews r WHERE r.product_id = :product_id),
+                    0
+                )::float8,
+                'features', COALESCE(
+                    json_agg(
+                        json_build_object(
+                            'feature', feature,
+                            'review_count', review_count,
+                            'positive', positive,
+                            'negative', negative,
+                            'neutral', neutral,
+                            'average_rating', average_rating,
+                            'quotes', quotes
+                        )
+                        ORDER BY review_count DESC, feature
+                    ),
+                    '[]'::json
+                )
+            )
+            FROM feature_digests
+            """,
+        )
+        return await self.db.scalar(
+            query,
+            {
+                "product_id": product_id,
+                "quotes_per_sentiment": quotes_per_sentiment,
+                "quote_length": quote_length,
+            },
+        )
@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
-from sqlalchemy import exists, func, select
+from sqlalchemy import Row, exists, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.models import Review
 from src.repository.base import BaseRepository
@@ -98,3 +98,30 @@ class ReviewRepository(BaseRepository[Review, int]):
         query = select(Review).offset((page - 1) * page_size).limit(page_size)
         result = await self.db.execute(query)
         return total, list(result.scalars().all())
+
+    async def stream(
+        self,
+        product_id: Optional[int] = None,
+        fetch_size: int = 1000,
+    ) -> AsyncIterator[Row]:
+        """
+        Stream review rows, optionally of a single product, through a server-side cursor.
+
+        Rows are fetched `fetch_size` at a time and hold only the columns of
+        `ReviewResponseSchema`, so memory stays constant however many reviews there are.
+        """
+        query = select(
+            Review.id,
+            Review.user_name,
+            Review.review,
+            Review.rating,
+            Review.created_at,
+        ).order_by(Review.id)
+        if product_id is not None:
+            query = query.filter(Review.product_id == product_id)
+
+        result = await self.db.stream(
+            query.execution_options(yield_per=fetch_size),
+        )
+        async for row in result:
+            yield row
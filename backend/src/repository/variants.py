@@ -38,7 +38,8 @@ class VariantRepository(BaseRepository[Variant, int]):
         result = await self.db.execute(
             select(Variant)
             .options(selectinload(Variant.attributes))
-            .filter(Variant.product_id == product_id),
+            .filter(Variant.product_id == product_id)
+            .order_by(Variant.id),
         )
         return result.scalars().all()
 
@@ -5,7 +5,6 @@ from fastapi import APIRouter, BackgroundTasks, Request
 from fastapi.responses import StreamingResponse
 from llama_index.core.agent.workflow import FunctionAgent
 from src.agents.user_query_agent import UserQueryAgent
-from src.config.memory import get_mem0_memory
 from src.logging import logger
 from src.schemas.agents import QueryRequestSchema
 
@@ -46,7 +45,7 @@ async def user_chat(
                 user_query=chat_schema.user_query,
                 user_id=request.state.user_id,
                 product_id=chat_schema.product_id,
-                memory=get_mem0_memory(),
+                memory=request.app.state.memory,
                 llm=request.app.state.llm,
                 embed_model=request.app.state.embed_model,
                 message_queue=message_queue,
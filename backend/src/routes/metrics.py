@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Request
+from src.config.llm import get_hedging_stats, get_prompt_cache_stats
+from src.database import DBReadSession, get_pool_stats
+from src.services.prewarm import get_prewarm_stats
+from src.utils.rate_governor import get_rate_governor_stats
+from src.workflows.compaction import get_compaction_stats
+from src.workflows.speculation import get_speculation_stats
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/vector-search", response_model=dict)
+async def vector_search_metrics(request: Request):
+    """Returns how many search rounds filtered vector searches needed in this worker."""
+    return {
+        "products": request.app.state.vector_store_products_embeddings.search_metrics.to_dict(),
+        "reviews": request.app.state.vector_store_reviews_embeddings.search_metrics.to_dict(),
+    }
+
+
+@router.get("/pools", response_model=dict)
+async def pool_metrics():
+    """Returns the connection pool usage of this worker."""
+    return get_pool_stats()
+
+
+@router.get("/catalog-cache", response_model=dict)
+async def catalog_cache_metrics(request: Request):
+    """Returns the catalog cache hit counts of this worker."""
+    return request.app.state.catalog_cache.stats
+
+
+@router.get("/memory", response_model=dict)
+async def memory_metrics(request: Request):
+    """Returns the memory preference cache hit counts of this worker."""
+    return request.app.state.memory.stats
+
+
+@router.get("/prewarm", response_model=dict)
+async def prewarm_metrics(db: DBReadSession):
+    """Returns how often users' first openings of personalized sections were served warm."""
+    return await get_prewarm_stats(db)
+
+
+@router.get("/rate-governor", response_model=dict)
+async def rate_governor_metrics():
+    """Returns the queue waits per priority and throttling of this worker's Azure OpenAI calls."""
+    return get_rate_governor_stats()
+
+
+@router.get("/llm-hedging", response_model=dict)
+async def llm_hedging_metrics():
+    """Returns how many chat completions of this worker were hedged, and won by the hedge."""
+    return get_hedging_stats()
+
+
+@router.get("/prompt-cache", response_model=dict)
+async def prompt_cache_metrics():
+    """Returns how many prompt tokens of this worker's chat completions were cached."""
+    return get_prompt_cache_stats()
+
+
+@router.get("/context-compaction", response_model=dict)
+async def context_compaction_metrics():
+    """Returns the tokens of this worker's agent messages before and after compaction."""
+    return get_compaction_stats()
+
+
+@router.get("/agent-speculation", response_model=dict)
+async def agent_speculation_metrics():
+    """Returns how many agents this worker started before planning finished, and their time saved and wasted."""
+    return get_speculation_stats()
@@ -1,8 +1,9 @@
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from src.config.config import settings
-from src.database import DBSession
+from src.database import DBReadSession, DBSession
 from src.models.products import StatusEnum
 from src.repository import (
     PersonalizedProductRepository,
@@ -10,8 +11,12 @@ from src.repository import (
     ReviewRepository,
 )
 from src.routes.utils import (
+    cached_catalog_response,
     get_trace_dataframe,
+    refresh_stale_personalization,
     run_personalization_workflow,
+    serialize,
+    stream_reviews_ndjson,
     wait_for_personalization_ready,
 )
 from src.schemas.personalization import (
@@ -35,50 +40,97 @@ router = APIRouter(
 
 @router.get("/{product_id}", response_model=ProductDetailsResponseSchema)
 async def get_product_details(
+    request: Request,
     product_id: int,
-    db: DBSession,
+    db: DBReadSession,
 ):
-    product = await ProductRepository(db).get_by_id(product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return ProductDetailsResponseSchema.model_validate(product)
+    async def load() -> bytes:
+        document = await ProductRepository(db).get_detail_json(product_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return document
+
+    return await cached_catalog_response(
+        request,
+        db,
+        key=f"product:{product_id}",
+        version_key=f"product:{product_id}",
+        load=load,
+    )
 
 
 @router.get("/", response_model=PaginatedProductsResponseSchema)
 async def get_products(
-    db: DBSession,
+    request: Request,
+    db: DBReadSession,
     page: int = Query(1, ge=1),
     page_size: int = Query(settings.PAGE_SIZE, ge=1),
 ):
-    total, products = await ProductRepository(db).get_paginated(page, page_size)
-    return PaginatedProductsResponseSchema(
-        page=page,
-        page_size=page_size,
-        total=total,
-        products=[
-            ProductResponseSchema.model_validate(product) for product in products
-        ],
+    async def load() -> bytes:
+        total, products = await ProductRepository(db).get_paginated(page, page_size)
+        return serialize(
+            PaginatedProductsResponseSchema(
+                page=page,
+                page_size=page_size,
+                total=total,
+                products=[
+                    ProductResponseSchema.model_validate(product)
+                    for product in products
+                ],
+            ),
+        )
+
+    return await cached_catalog_response(
+        request,
+        db,
+        key=f"products:page={page}:page_size={page_size}",
+        version_key="catalog",
+        load=load,
     )
 
 
-@router.get("/{product_id}/reviews")
+@router.get("/{product_id}/reviews", response_model=PaginatedReviewResponseSchema)
 async def get_product_reviews(
+    request: Request,
     product_id: int,
-    db: DBSession,
+    db: DBReadSession,
     page: int = Query(1, ge=1),
     page_size: int = Query(settings.PAGE_SIZE, ge=1),
 ):
     page_size = 500  # Set to 500 for demo purpose.
-    total, reviews = await ReviewRepository(db).get_paginated_by_product(
-        product_id,
-        page,
-        page_size,
+
+    async def load() -> bytes:
+        total, reviews = await ReviewRepository(db).get_paginated_by_product(
+            product_id,
+            page,
+            page_size,
+        )
+        return serialize(
+            PaginatedReviewResponseSchema(
+                page=page,
+                page_size=page_size,
+                total=total,
+                reviews=[
+                    ReviewResponseSchema.model_validate(review) for review in reviews
+                ],
+            ),
+        )
+
+    return await cached_catalog_response(
+        request,
+        db,
+        key=f"product:{product_id}:reviews:page={page}:page_size={page_size}",
+        version_key=f"product:{product_id}",
+        load=load,
     )
-    return PaginatedReviewResponseSchema(
-        page=page,
-        page_size=page_size,
-        total=total,
-        reviews=[ReviewResponseSchema.model_validate(review) for review in reviews],
+
+
+@router.get("/{product_id}/reviews/stream")
+async def stream_product_reviews(product_id: int):
+    """Streams the reviews of a product as newline-delimited JSON."""
+    return StreamingResponse(
+        stream_reviews_ndjson(product_id),
+        media_type="application/x-ndjson",
     )
 
 
@@ -100,6 +152,7 @@ async def generate_personalized_content(
 ):
     personalized_section = None
     fault_correction = personalization_request.fault_correction
+    request.app.state.view_counter.record(product_id)
 
     try:
         personalized_section = await PersonalizedProductRepository(db).get_by_id(
@@ -116,10 +169,15 @@ async def generate_personalized_content(
     if fault_correction:
         personalized_section = None
 
+    served_warm = bool(
+        personalized_section and personalized_section.status is StatusEnum.done,
+    )
     personalized_section = await wait_for_personalization_ready(
         personalized_section,
         db,
     )
+    if personalized_section and personalized_section.status is StatusEnum.done:
+        await refresh_stale_personalization(request, personalized_section, db)
     if not personalized_section:
         personalized_section = await run_personalization_workflow(
             request,
@@ -127,6 +185,11 @@ async def generate_personalized_content(
             db,
             fault_correction,
         )
+    if personalized_section:
+        await PersonalizedProductRepository(db).record_first_open(
+            (product_id, request.state.user_id),
+            served_warm,
+        )
     return personalized_section
 
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from src.database import DBSession
 from src.services.reset import reset_user_preferences
 
@@ -10,9 +10,12 @@ router = APIRouter(
 
 
 @router.post("", response_model=dict)
-async def reset(db: DBSession):
+async def reset(request: Request, db: DBSession):
 
-    reset_status = await reset_user_preferences(db=db)
+    reset_status = await reset_user_preferences(
+        db=db,
+        memory=request.app.state.memory,
+    )
 
     if reset_status is True:
         return {
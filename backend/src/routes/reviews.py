@@ -1,7 +1,14 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from src.config.config import settings
-from src.database import DBSession
+from src.database import DBReadSession
 from src.repository import ReviewRepository
+from src.routes.utils import (
+    cached_catalog_response,
+    json_bytes_response,
+    serialize,
+    stream_reviews_ndjson,
+)
 from src.schemas.reviews import PaginatedReviewResponseSchema, ReviewResponseSchema
 
 router = APIRouter(
@@ -11,25 +18,49 @@ router = APIRouter(
 )
 
 
+@router.get("/stream")
+async def stream_reviews():
+    """Streams all reviews as newline-delimited JSON."""
+    return StreamingResponse(
+        stream_reviews_ndjson(),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.get("/{review_id}", response_model=ReviewResponseSchema)
-async def get_review(review_id: int, db: DBSession):
+async def get_review(review_id: int, db: DBReadSession):
     review = await ReviewRepository(db).get_by_id(review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
-    return ReviewResponseSchema.model_validate(review)
+    return json_bytes_response(serialize(ReviewResponseSchema.model_validate(review)))
 
 
 @router.get("/", response_model=PaginatedReviewResponseSchema)
 async def get_reviews(
-    db: DBSession,
+    request: Request,
+    db: DBReadSession,
     page: int = Query(1, ge=1),
     page_size: int = Query(settings.PAGE_SIZE, ge=1),
 ):
     page_size = 500  # Set to 500 for demo purpose.
-    total, reviews = await ReviewRepository(db).get_paginated(page, page_size)
-    return PaginatedReviewResponseSchema(
-        page=page,
-        page_size=page_size,
-        total=total,
-        reviews=[ReviewResponseSchema.model_validate(review) for review in reviews],
+
+    async def load() -> bytes:
+        total, reviews = await ReviewRepository(db).get_paginated(page, page_size)
+        return serialize(
+            PaginatedReviewResponseSchema(
+                page=page,
+                page_size=page_size,
+                total=total,
+                reviews=[
+                    ReviewResponseSchema.model_validate(review) for review in reviews
+                ],
+            ),
+        )
+
+    return await cached_catalog_response(
+        request,
+        db,
+        key=f"reviews:page={page}:page_size={page_size}",
+        version_key="reviews",
+        load=load,
     )
@@ -1,7 +1,7 @@
 from typing import List
 
 from fastapi import APIRouter, HTTPException, Request
-from src.database import DBSession
+from src.database import DBReadSession
 from src.repository import UserRepository
 from src.schemas.users import UserResponseSchema
 
@@ -13,13 +13,13 @@ router = APIRouter(
 
 
 @router.get("/", response_model=List[UserResponseSchema])
-async def get_all_users(db: DBSession):
+async def get_all_users(db: DBReadSession):
     users = await UserRepository(db).get_all()
     return users
 
 
 @router.get("/me", response_model=UserResponseSchema)
-async def get_user(request: Request, db: DBSession):
+async def get_user(request: Request, db: DBReadSession):
     user = await UserRepository(db).get_by_id(request.state.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
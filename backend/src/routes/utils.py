@@ -1,14 +1,30 @@
 import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Optional
 
 import phoenix as px
-from fastapi import HTTPException
+from fastapi import HTTPException, Request, Response
 from llama_index.core.vector_stores.types import MetadataFilter, MetadataFilters
 from pandas import DataFrame
 from phoenix.trace.dsl import SpanQuery
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.config.config import settings
-from src.config.memory import get_mem0_memory
-from src.models.products import StatusEnum
+from src.database import read_session
+from src.logging import logger
+from src.models.products import PersonalizedProductSection, StatusEnum
+from src.repository import PersonalizedProductRepository, ReviewRepository
+from src.schemas.enums import PersonalizationSource
+from src.schemas.reviews import ReviewResponseSchema
 from src.services.agent_workflow import MultiAgentWorkflowService
+from src.services.catalog_cache import CatalogCache
+from src.services.personalization_versions import (
+    get_agents_to_rerun,
+    get_input_versions,
+    get_stale_inputs,
+)
+from src.utils.rate_governor import Priority, request_priority
 from src.utils.utils import set_personalization_status
 
 
@@ -53,6 +69,68 @@ def get_trace_dataframe(trace_id: str):
     return filter_trace_data(df)
 
 
+def serialize(model: BaseModel) -> bytes:
+    """Serializes a response schema straight to JSON bytes with pydantic-core."""
+    return to_json(model)
+
+
+def json_bytes_response(body: bytes, headers: Optional[dict] = None) -> Response:
+    """
+    Returns already serialized JSON as is.
+
+    Routes returning it skip FastAPI's `response_model` validation and stdlib JSON encoding,
+    so `response_model` only documents the body.
+    """
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def stream_reviews_ndjson(
+    product_id: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yields reviews as NDJSON lines while they are fetched.
+
+    The generator opens its own read session, since the request's session is closed
+    before a streaming body is sent. Closing the generator, such as when the client
+    disconnects, closes the session and its server-side cursor.
+    """
+    async with read_session() as db, aclosing(
+        ReviewRepository(db).stream(
+            product_id,
+            fetch_size=settings.REVIEW_STREAM_FETCH_SIZE,
+        ),
+    ) as rows:
+        async for row in rows:
+            yield serialize(ReviewResponseSchema.model_validate(row)) + b"\n"
+
+
+async def cached_catalog_response(
+    request: Request,
+    db: AsyncSession,
+    key: str,
+    version_key: str,
+    load: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """
+    Serves a serialized catalog response from the catalog cache.
+
+    Answers `If-None-Match` with 304 while `version_key` is unchanged, and otherwise
+    returns the cached body, calling `load` to build it on a miss.
+    """
+    cache: CatalogCache = request.app.state.catalog_cache
+    version = await cache.get_version(version_key, db)
+    etag = cache.etag(key, version)
+    if request.headers.get("if-none-match") == etag:
+        cache.stats["not_modified"] += 1
+        return Response(status_code=304, headers={"ETag": etag})
+
+    version, body = await cache.get_or_load(key, version_key, version, db, load)
+    return json_bytes_response(
+        body,
+        headers={"ETag": cache.etag(key, version), "Cache-Control": "no-cache"},
+    )
+
+
 def build_metadata_filters(product_id: int):
     return MetadataFilters(filters=[MetadataFilter(key="product_id", value=product_id)])
 
@@ -67,24 +145,134 @@ async def wait_for_personalization_ready(personalized_section, db, timeout=60):
     return personalized_section
 
 
-async def run_personalization_workflow(request, product_id, db, fault_correction):
-    filters = build_metadata_filters(product_id)
-    workflow_service = MultiAgentWorkflowService(
+def create_workflow_service(
+    request: Request,
+    product_id: int,
+    fault_correction: bool,
+) -> MultiAgentWorkflowService:
+    return MultiAgentWorkflowService(
         user_id=request.state.user_id,
         product_id=product_id,
         llm=request.app.state.llm,
         embed_model=request.app.state.embed_model,
         vector_store_products_embeddings=request.app.state.vector_store_products_embeddings,
         vector_store_reviews_embeddings=request.app.state.vector_store_reviews_embeddings,
-        filters=filters,
-        memory=get_mem0_memory(),
+        filters=build_metadata_filters(product_id),
+        memory=request.app.state.memory,
         fault_correction=fault_correction,
     )
+
+
+async def run_personalization_workflow(request, product_id, db, fault_correction):
+    workflow_service = create_workflow_service(request, product_id, fault_correction)
     await set_personalization_status(
         db,
         request.state.user_id,
         product_id,
         StatusEnum.running,
+        source=PersonalizationSource.ON_DEMAND,
     )
     response, trace_id = await workflow_service.run_workflow()
     return await workflow_service.save_workflow_response(response, trace_id)
+
+
+# Sections this worker is refreshing, so that reopening one does not start another run,
+# and the tasks refreshing them, which the event loop only holds weakly.
+_refreshing: set[tuple[int, int]] = set()
+_refresh_tasks: set[asyncio.Task] = set()
+
+
+async def refresh_stale_personalization(
+    request: Request,
+    personalized_section: PersonalizedProductSection,
+    db: AsyncSession,
+) -> bool:
+    """
+    Regenerates, in the background, the parts of a done section whose inputs changed.
+
+    The stored section is served as it is meanwhile, and the refreshed one from the next
+    opening on. Only the agents reading a changed input run again, and the presentation
+    merges their results into the section, so a stock change only re-runs the inventory
+    agent. A section whose changed inputs none of its agents read is only stamped with the
+    new versions. Sections generated before their inputs were versioned are stamped as they
+    are.
+
+    Returns:
+        bool: Whether a refresh was started.
+    """
+    product_id = personalized_section.product_id
+    user_id = personalized_section.user_id
+    current_versions = await get_input_versions(
+        db,
+        product_id,
+        user_id,
+        request.app.state.memory,
+    )
+    if personalized_section.input_versions is None:
+        agents = []
+    else:
+        stale_inputs = get_stale_inputs(
+            personalized_section.input_versions,
+            current_versions,
+        )
+        if not stale_inputs:
+            return False
+        agents = get_agents_to_rerun(personalized_section.agents, stale_inputs)
+
+    if agents == []:
+        await PersonalizedProductRepository(db).add_or_update(
+            PersonalizedProductSection(
+                product_id=product_id,
+                user_id=user_id,
+                input_versions=current_versions,
+            ),
+        )
+        return False
+
+    key = (product_id, user_id)
+    if key in _refreshing:
+        return False
+    logger.info(
+        "Refreshing personalization of user_id=%s, product_id=%s: stale=%s, agents=%s",
+        user_id,
+        product_id,
+        stale_inputs,
+        agents or "all",
+    )
+    _refreshing.add(key)
+    # Nobody waits for the refresh, so it yields the LLM to interactive requests
+    with request_priority(Priority.BACKGROUND):
+        task = asyncio.create_task(
+            _refresh_personalization(
+                create_workflow_service(request, product_id, fault_correction=False),
+                agents=agents,
+                planned_agents=personalized_section.agents if agents else None,
+            ),
+        )
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+    task.add_done_callback(lambda _: _refreshing.discard(key))
+    return True
+
+
+async def _refresh_personalization(
+    workflow_service: MultiAgentWorkflowService,
+    agents: Optional[list[str]],
+    planned_agents: Optional[list[str]],
+) -> None:
+    """Re-runs a section's agents, keeping the stored section if they fail."""
+    try:
+        response, trace_id = await workflow_service.run_workflow(
+            agents=agents,
+            planned_agents=planned_agents,
+            mark_failed=False,
+        )
+        await workflow_service.save_workflow_response(response, trace_id)
+    except Exception as exc:
+        logger.error(
+            "Failed to refresh personalization of user_id=%s, product_id=%s, "
+            "keeping the stored section: %r",
+            workflow_service.user_id,
+            workflow_service.product_id,
+            exc,
+        )
@@ -33,9 +33,16 @@ class EventType(enum.Enum):
     PERSONALIZATION_WORKFLOW = "personalization_workflow"
     PRODUCT_SEARCH = "product_search"
     MEMORY = "memory"
+    PROVISIONAL_CARDS = "provisional_cards"
     ERROR = "error"
 
 
+class PersonalizationSource(enum.Enum):
+    ON_DEMAND = "on_demand"
+    BACKGROUND = "background"
+    PREWARM = "prewarm"
+
+
 class StatusEnum(enum.Enum):
     pending = "pending"
     running = "in-progress"
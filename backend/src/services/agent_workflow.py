@@ -2,6 +2,7 @@ import asyncio
 from typing import Optional
 
 from fastapi.exceptions import HTTPException
+from llama_index.core.agent.types import BaseAgent
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.base.llms.base import BaseLLM
 from llama_index.core.memory import BaseMemory
@@ -18,6 +19,7 @@ from src.agents import (
     get_reviews_agent,
 )
 from src.config.config import settings
+from src.config.llm import LLMManager
 from src.database import Session
 from src.logging import logger
 from src.models.products import PersonalizedProductSection, StatusEnum
@@ -63,12 +65,20 @@ class MultiAgentWorkflowService:
             inventory_agent=get_inventory_agent(
                 self.llm,
                 self.embed_model,
+                self.product_id,
             ),
             reviews_agent=get_reviews_agent(
                 self.llm,
                 self.embed_model,
                 self.vector_store_reviews_embeddings,
                 self.filters,
+                with_review_search=False,
+            ),
+            reviews_search_agent=get_reviews_agent(
+                self.llm,
+                self.embed_model,
+                self.vector_store_reviews_embeddings,
+                self.filters,
             ),
             planning_agent=get_planning_agent(self.llm),
             evaluation_agent=get_evaluation_agent(self.llm),
@@ -78,13 +88,63 @@ class MultiAgentWorkflowService:
             timeout=self.timeout,
             verbose=self.verbose,
             fault_correction=self.fault_correction,
+            fallback_agents=self.create_fallback_agents(),
         )
         return workflow
 
+    def create_fallback_agents(self) -> dict[str, BaseAgent]:
+        """Creates the agents of LLM_FALLBACK_AGENTS on the fallback deployment, if any."""
+        fallback_llm = LLMManager.get_fallback_llm()
+        if fallback_llm is None:
+            return {}
+
+        factories = {
+            "product_personalization": lambda: get_product_personalization_agent(
+                fallback_llm,
+            ),
+            "reviews": lambda: get_reviews_agent(
+                fallback_llm,
+                self.embed_model,
+                self.vector_store_reviews_embeddings,
+                self.filters,
+                with_review_search=False,
+            ),
+            "reviews_search": lambda: get_reviews_agent(
+                fallback_llm,
+                self.embed_model,
+                self.vector_store_reviews_embeddings,
+                self.filters,
+            ),
+            "inventory": lambda: get_inventory_agent(
+                fallback_llm,
+                self.embed_model,
+                self.product_id,
+            ),
+        }
+        # Both reviews agents fall back as "reviews"
+        names = set(settings.LLM_FALLBACK_AGENTS)
+        if "reviews" in names:
+            names.add("reviews_search")
+        return {name: factories[name]() for name in names if name in factories}
+
     async def run_workflow(
         self,
         user_query: Optional[str] = None,
+        agents: Optional[list[str]] = None,
+        planned_agents: Optional[list[str]] = None,
+        mark_failed: bool = True,
     ) -> tuple[dict, int]:
+        """
+        Runs the workflow, planning which agents to call unless `agents` is given.
+
+        Args:
+            user_query (Optional[str]): The user's message, if any.
+            agents (Optional[list[str]]): Agents to re-run, merging their results into the
+                saved section instead of planning.
+            planned_agents (Optional[list[str]]): All the agents of the saved section.
+            mark_failed (bool): Whether a failure replaces the saved section with a failed
+                one. Refreshes keep the section they failed to refresh.
+        """
         response = None
         trace_id = None
 
@@ -93,6 +153,8 @@ class MultiAgentWorkflowService:
                 user_id=self.user_id,
                 product_id=self.product_id,
                 user_msg=user_query,
+                agents=agents,
+                planned_agents=planned_agents,
             )
             response = await workflow_handler
             trace_id = response.pop("trace_id")
@@ -108,7 +170,8 @@ class MultiAgentWorkflowService:
                 )
             logger.info("Workflow Completed!")
         except Exception as exc:
-            await self.mark_workflow_as_failed(trace_id)
+            if mark_failed:
+                await self.mark_workflow_as_failed(trace_id)
             raise HTTPException(
                 status_code=500,
                 detail="Workflow timed out or failed",
@@ -127,6 +190,8 @@ class MultiAgentWorkflowService:
             personalization=response.get("personalization"),
             phoenix_trace_id=trace_id,
             status=StatusEnum.done,
+            input_versions=response.get("input_versions"),
+            agents=response.get("agents"),
         )
 
         async with Session() as db:
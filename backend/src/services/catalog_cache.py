@@ -0,0 +1,234 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config.config import settings
+from src.database import Session
+from src.logging import logger
+
+NOTIFY_CHANNEL = "catalog_cache"
+# Versions bumped by the commits of a user made after their response was sent
+USER_WRITES_PREFIX = "writes:"
+LISTENER_RETRY_SECONDS = 5
+
+
+class CatalogCache:
+    """
+    Two-tier cache of serialized catalog responses.
+
+    Entries are stored under the version of the product (`product:{id}`), of the product
+    list pages (`catalog`) or of the review list pages (`reviews`) they were built from. Triggers on the catalog tables bump these
+    versions and NOTIFY every worker, so a changed product simply stops matching its cached
+    entries. The first tier is a per-worker LRU, the second an unlogged Postgres table
+    shared by all workers. Versions double as ETags, so a client revalidating an unchanged
+    response costs neither a query nor serialization.
+
+    The listener also records when each worker heard of a user's `writes:{id}` bump, which
+    publishes commits made after the response to the user was sent, so that reads of the
+    user's next requests go to the primary, see `WriteMarker`.
+
+    Args:
+        max_entries (int): Size of the per-worker LRU.
+        shared (bool): Whether to use the shared Postgres tier.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.CATALOG_CACHE_SIZE,
+        shared: bool = settings.CATALOG_CACHE_SHARED,
+    ):
+        self.max_entries = max_entries
+        self.shared = shared
+        self.stats = {"not_modified": 0, "local_hits": 0, "shared_hits": 0, "misses": 0}
+        self._entries: OrderedDict[str, tuple[int, bytes]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._user_writes: dict[int, float] = {}
+        self._listening = False
+        self._listener_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+        self._listening = False
+
+    async def _listen(self) -> None:
+        """Keeps the known versions in sync with the database, reconnecting when needed."""
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    settings.get_database_url(is_async=False),
+                )
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+
+                # Load after LISTEN, so that no bump falls in between.
+                rows = await connection.fetch(
+                    "SELECT key, version FROM catalog_cache_versions",
+                )
+                self._versions = {row["key"]: row["version"] for row in rows}
+                self._listening = True
+                logger.info(f"Listening for catalog changes on {NOTIFY_CHANNEL}")
+                await closed.wait()
+                logger.warning("Catalog cache listener disconnected")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Catalog cache listener failed: {exc}")
+            finally:
+                self._listening = False
+                if connection and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(LISTENER_RETRY_SECONDS)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        key, version = payload.rsplit("=", 1)
+        self._versions[key] = max(self._versions.get(key, 0), int(version))
+        if key.startswith(USER_WRITES_PREFIX):
+            self._user_writes[int(key.removeprefix(USER_WRITES_PREFIX))] = time.time()
+
+    @staticmethod
+    def user_writes_key(user_id: int) -> str:
+        return f"{USER_WRITES_PREFIX}{user_id}"
+
+    def get_user_write(self, user_id: int) -> Optional[float]:
+        """Returns when the user's last published commit was heard of, if it is recent."""
+        written_at = self._user_writes.get(user_id)
+        if written_at is None:
+            return None
+        if time.time() - written_at >= settings.DB_READ_YOUR_WRITES_SECONDS:
+            del self._user_writes[user_id]
+            return None
+        return written_at
+
+    @staticmethod
+    async def read_version(version_key: str, db: AsyncSession) -> int:
+        version = await db.scalar(
+            text("SELECT version FROM catalog_cache_versions WHERE key = :key"),
+            {"key": version_key},
+        )
+        return version or 0
+
+    @staticmethod
+    async def bump_versions(version_keys: list[str], db: AsyncSession) -> None:
+        """
+        Bumps the versions of `version_keys` and notifies every worker.
+
+        Version keys are not limited to catalog data; any per-worker cache can tag its
+        entries with a version and bump it when the underlying data changes.
+        """
+        await db.execute(
+            text(
+                """
+                WITH bumped AS (
+                    INSERT INTO catalog_cache_versions (key, version)
+                    SELECT unnest(CAST(:keys AS TEXT[])), 1
+                    ON CONFLICT (key) DO UPDATE
+                    SET version = catalog_cache_versions.version + 1, updated_at = now()
+                    RETURNING key, version
+                )
+                SELECT pg_notify(:channel, key || '=' || version) FROM bumped
+                """,
+            ),
+            {"keys": version_keys, "channel": NOTIFY_CHANNEL},
+        )
+        await db.commit()
+
+    async def get_version(self, version_key: str, db: AsyncSession) -> int:
+        """Returns the current version, from memory while the listener is connected."""
+        if self._listening:
+            return self._versions.get(version_key, 0)
+        return await self.read_version(version_key, db)
+
+    @staticmethod
+    def etag(key: str, version: int) -> str:
+        return f'"{key}-v{version}"'
+
+    async def get(self, key: str, version: int) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.stats["local_hits"] += 1
+            return entry[1]
+
+        if self.shared:
+            async with Session() as db:
+                body = await db.scalar(
+                    text(
+                        "SELECT body FROM catalog_cache_entries "
+                        "WHERE key = :key AND version = :version",
+                    ),
+                    {"key": key, "version": version},
+                )
+            if body is not None:
+                self._store_local(key, version, body)
+                self.stats["shared_hits"] += 1
+                return body
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, version: int, body: bytes) -> None:
+        self._store_local(key, version, body)
+        if not self.shared:
+            return
+
+        async with Session() as db:
+            await db.execute(
+                text(
+                    """
+                    INSERT INTO catalog_cache_entries (key, version, body)
+                    VALUES (:key, :version, :body)
+                    ON CONFLICT (key) DO UPDATE
+                    SET version = EXCLUDED.version, body = EXCLUDED.body, created_at = now()
+                    WHERE catalog_cache_entries.version < EXCLUDED.version
+                    """,
+                ),
+                {"key": key, "version": version, "body": body},
+            )
+            await db.commit()
+
+    def _store_local(self, key: str, version: int, body: bytes) -> None:
+        self._entries[key] = (version, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(
+        self,
+        key: str,
+        version_key: str,
+        version: int,
+        db: AsyncSession,
+        load: Callable[[], Awaitable[bytes]],
+    ) -> tuple[int, bytes]:
+        """
+        Returns the cached body for `version`, or loads and caches it.
+
+        A loaded body is cached under the version read from `db` before loading, which
+        may be older than `version` on a lagging replica. The body is then never labeled
+        newer than the data it was built from.
+
+        Returns:
+            tuple[int, bytes]: The version the body belongs to, and the body.
+        """
+        body = await self.get(key, version)
+        if body is not None:
+            return version, body
+
+        version = await self.read_version(version_key, db)
+        body = await load()
+        await self.set(key, version, body)
+        return version, body
@@ -0,0 +1,204 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from mem0 import AsyncMemory
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config.config import settings
+from src.config.memory import get_mem0_memory
+from src.database import Session
+from src.logging import logger
+from src.services.catalog_cache import CatalogCache
+from src.utils.rate_governor import Priority, request_priority
+
+PREFERENCES_QUERY = "User's specific preferences, likes, dislikes, past interactions, and shopping behavior patterns?"
+PREFERENCES_LIMIT = 100
+
+
+class MemoryService:
+    """
+    Process-wide wrapper around a single mem0 `AsyncMemory`.
+
+    Building `AsyncMemory` creates an LLM client, an embedder and a vector store connection,
+    so one instance is created at startup and shared by every request and workflow.
+
+    User preferences are cached per user under the version `memory:{user_id}`, which is
+    bumped whenever a user's memories change. The bump is broadcast through the catalog
+    cache's NOTIFY channel, so a change made on one worker invalidates every worker's copy.
+    The preference query never changes, so it is embedded once.
+
+    Writes can be queued with `enqueue` instead of awaited: each user's messages are added
+    in order by a writer task of that user, and until a message is persisted it is returned
+    as one of the user's preferences, so callers see their own writes immediately. Failed
+    writes are retried with exponential backoff, and logged with their messages once every
+    attempt failed.
+
+    Args:
+        catalog_cache (CatalogCache): Tracks the memory versions.
+        memory (Optional[AsyncMemory]): The mem0 memory. Defaults to one built from settings.
+        max_users (int): Number of users whose preferences are cached.
+    """
+
+    def __init__(
+        self,
+        catalog_cache: CatalogCache,
+        memory: Optional[AsyncMemory] = None,
+        max_users: int = settings.MEM0_PREFERENCES_CACHE_SIZE,
+    ):
+        self.catalog_cache = catalog_cache
+        self.memory = memory or get_mem0_memory()
+        self.max_users = max_users
+        self.stats = {"hits": 0, "misses": 0, "failed_writes": 0}
+        self._preferences: OrderedDict[str, tuple[int, list[str]]] = OrderedDict()
+        self._preferences_embedding: Optional[list[float]] = None
+        self._pending: dict[str, list[tuple]] = {}
+        self._writers: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def version_key(user_id) -> str:
+        return f"memory:{user_id}"
+
+    async def _get_preferences_embedding(self) -> list[float]:
+        if self._preferences_embedding is None:
+            self._preferences_embedding = await asyncio.to_thread(
+                self.memory.embedding_model.embed,
+                PREFERENCES_QUERY,
+                "search",
+            )
+        return self._preferences_embedding
+
+    async def _search_preferences(self, user_id: str) -> list[str]:
+        results = await asyncio.to_thread(
+            self.memory.vector_store.search,
+            query=PREFERENCES_QUERY,
+            vectors=await self._get_preferences_embedding(),
+            limit=PREFERENCES_LIMIT,
+            filters={"user_id": user_id},
+        )
+        return [result.payload.get("data") for result in results]
+
+    async def get_user_preferences(self, user_id) -> list[str]:
+        """Returns the memories describing the user's preferences, then their queued messages."""
+        pending = self.get_pending_messages(user_id)
+        return await self._get_persisted_preferences(str(user_id)) + pending
+
+    def get_pending_messages(self, user_id) -> list:
+        """Returns the user's messages queued to be added to their memory, oldest first."""
+        return [messages for messages, _ in self._pending.get(str(user_id), [])]
+
+    async def get_version(self, user_id, db: AsyncSession) -> int:
+        """Returns the version of the user's memories, bumped whenever they change."""
+        return await self.catalog_cache.get_version(self.version_key(user_id), db)
+
+    async def _get_persisted_preferences(self, user_id: str) -> list[str]:
+        async with Session() as db:
+            version = await self.get_version(user_id, db)
+
+        cached = self._preferences.get(user_id)
+        if cached and cached[0] == version:
+            self._preferences.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return cached[1]
+
+        self.stats["misses"] += 1
+        preferences = await self._search_preferences(user_id)
+        self._preferences[user_id] = (version, preferences)
+        self._preferences.move_to_end(user_id)
+        while len(self._preferences) > self.max_users:
+            self._preferences.popitem(last=False)
+        return preferences
+
+    async def add(self, messages, user_id) -> dict:
+        """Adds messages to the user's memory, invalidating their preferences if it changed."""
+        results = await self.memory.add(messages=messages, user_id=str(user_id))
+        if results.get("results"):
+            await self.invalidate([user_id])
+        return results
+
+    def enqueue(
+        self,
+        messages,
+        user_id,
+        on_update: Optional[Callable[[dict], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Queues messages to be added to the user's memory in the background.
+
+        Args:
+            messages: Messages to add, as accepted by `AsyncMemory.add`.
+            user_id: The user the messages belong to.
+            on_update: Awaited with the results of `add` when the memory changed.
+        """
+        user_id = str(user_id)
+        self._pending.setdefault(user_id, []).append((messages, on_update))
+        if user_id not in self._writers:
+            # Nobody waits for the write, so it yields the LLM to interactive requests
+            with request_priority(Priority.BACKGROUND):
+                self._writers[user_id] = asyncio.create_task(self._write(user_id))
+
+    async def _write(self, user_id: str) -> None:
+        """Adds the user's queued messages one at a time, in the order they were queued."""
+        pending = self._pending[user_id]
+        try:
+            while pending:
+                messages, on_update = pending[0]
+                results = await self._add_with_retries(messages, user_id)
+                # Reads see the message until it is persisted or given up on
+                pending.pop(0)
+                if results and results.get("results") and on_update:
+                    try:
+                        await on_update(results)
+                    except Exception as exc:
+                        logger.error(
+                            f"Failed to handle memory update of user_id={user_id}: {exc}",
+                        )
+        finally:
+            # A discarded writer may have been replaced by a newer one
+            if self._pending.get(user_id) is pending:
+                del self._pending[user_id]
+            if self._writers.get(user_id) is asyncio.current_task():
+                del self._writers[user_id]
+
+    async def _add_with_retries(self, messages, user_id: str) -> Optional[dict]:
+        """Adds messages, backing off between attempts. Returns None if every attempt failed."""
+        for attempt in range(settings.MEM0_WRITE_ATTEMPTS):
+            try:
+                return await self.add(messages, user_id)
+            except Exception as exc:
+                if attempt + 1 == settings.MEM0_WRITE_ATTEMPTS:
+                    self.stats["failed_writes"] += 1
+                    logger.error(
+                        f"Failed to update memory of user_id={user_id}, dropping messages={messages}: {exc}",
+                    )
+                    return None
+                delay = settings.MEM0_WRITE_RETRY_SECONDS * 2**attempt
+                logger.warning(
+                    f"Failed to update memory of user_id={user_id}, retrying in {delay}s: {exc}",
+                )
+                await asyncio.sleep(delay)
+        return None
+
+    async def discard_pending(self) -> None:
+        """Drops every queued memory write and stops the writers, e.g. before a reset."""
+        writers = list(self._writers.values())
+        self._pending.clear()
+        self._writers.clear()
+        for writer in writers:
+            writer.cancel()
+        await asyncio.gather(*writers, return_exceptions=True)
+
+    async def drain(self) -> None:
+        """Waits for every queued memory write to finish."""
+        while self._writers:
+            await asyncio.gather(*self._writers.values(), return_exceptions=True)
+
+    async def invalidate(self, user_ids: list) -> None:
+        """Invalidates the cached preferences of `user_ids` on every worker."""
+        for user_id in user_ids:
+            self._preferences.pop(str(user_id), None)
+        async with Session() as db:
+            await CatalogCache.bump_versions(
+                [self.version_key(user_id) for user_id in user_ids],
+                db,
+            )
+        logger.info(f"Invalidated memory preferences of {len(user_ids)} users")
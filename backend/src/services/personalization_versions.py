@@ -0,0 +1,92 @@
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.repository import ProductRepository, ReviewDigestRepository
+from src.services.memory import MemoryService
+from src.services.variant_index import LOW_STOCK_THRESHOLD
+
+# Inputs each agent of the personalization workflow reads
+AGENT_INPUTS = {
+    "product_personalization": ("product", "variants", "memory"),
+    "reviews": ("reviews", "memory"),
+    "inventory": ("variants", "stock", "memory"),
+}
+
+
+async def get_catalog_versions(db: AsyncSession, product_id: int) -> dict:
+    """
+    Returns the versions of the catalog inputs of a product's personalized sections.
+
+    Each input is a fingerprint of the rows it covers, and `reviews` the fingerprint of the
+    reviews the product's stored review digest was built from, so that it only changes once
+    the digest is refreshed.
+    """
+    fingerprints = await ProductRepository(db).get_input_fingerprints(
+        product_id,
+        LOW_STOCK_THRESHOLD,
+    )
+    return {
+        "product": fingerprints.product if fingerprints else None,
+        "variants": fingerprints.variants if fingerprints else None,
+        "stock": fingerprints.stock if fingerprints else None,
+        "reviews": await ReviewDigestRepository(db).get_source_hash(product_id),
+    }
+
+
+async def get_input_versions(
+    db: AsyncSession,
+    product_id: int,
+    user_id: int,
+    memory: MemoryService,
+) -> dict:
+    """Returns the versions of every input of a user's personalized section of a product."""
+    return {
+        **await get_catalog_versions(db, product_id),
+        "memory": await memory.get_version(user_id, db),
+    }
+
+
+def get_stale_inputs(stored: dict, current: dict) -> list[str]:
+    """
+    Returns the inputs whose current version differs from the stored one.
+
+    The memory version may be ahead of the stored one by up to `memory_pending`, the
+    messages still queued for the user's memory when the section was generated: the section
+    already took them into account, and each bumps the version once if it changes the memory.
+    """
+    return [
+        name
+        for name, version in current.items()
+        if not _is_current(name, stored, version)
+    ]
+
+
+def _is_current(name: str, stored: dict, version) -> bool:
+    if name == "memory" and stored.get("memory") is not None and version is not None:
+        pending = stored.get("memory_pending", 0)
+        return stored["memory"] <= version <= stored["memory"] + pending
+    return stored.get(name) == version
+
+
+def get_agents_to_rerun(
+    agents: Optional[list[str]],
+    stale_inputs: list[str],
+) -> Optional[list[str]]:
+    """
+    Picks the agents of a section to re-run after some of its inputs changed.
+
+    A change of the user's memory may change which agents the planner picks, and a section
+    that does not record its agents cannot be refreshed partially, so both need the whole
+    workflow to run again.
+
+    Returns:
+        Optional[list[str]]: The agents reading a stale input, which may be none, or None
+            when the whole workflow has to run again.
+    """
+    if "memory" in stale_inputs or agents is None:
+        return None
+    return [
+        agent
+        for agent in agents
+        if any(name in stale_inputs for name in AGENT_INPUTS.get(agent, ()))
+    ]
@@ -0,0 +1,278 @@
+import asyncio
+import math
+from dataclasses import dataclass
+from datetime import datetime
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config.config import settings
+from src.config.embed_model import EmbedModelManager
+from src.config.llm import LLMManager
+from src.config.vector_store import VectorStoreManager
+from src.database import Session
+from src.logging import logger
+from src.models import PersonalizedProductSection, User
+from src.repository import PersonalizedProductRepository, ProductRepository
+from src.schemas.enums import PersonalizationSource, StatusEnum
+from src.services.agent_workflow import MultiAgentWorkflowService
+from src.services.catalog_cache import CatalogCache
+from src.services.memory import MemoryService
+from src.utils.rate_governor import Priority, request_priority
+from src.utils.token_usage import instrument_token_usage, track_token_usage
+from src.utils.utils import set_personalization_status
+
+# Weight of the similarity to the user's recent searches against catalog popularity
+SEARCH_WEIGHT = 0.7
+POPULARITY_WEIGHT = 0.3
+# Searches of a user combined into the query for their likely next views
+RECENT_SEARCHES = 3
+
+
+@dataclass
+class PrewarmCandidate:
+    user_id: int
+    product_id: int
+    score: float
+
+
+def in_off_peak_window(
+    hour: int,
+    start_hour: int = settings.PREWARM_START_HOUR,
+    end_hour: int = settings.PREWARM_END_HOUR,
+) -> bool:
+    """Whether `hour` falls in [start_hour, end_hour), which may wrap around midnight."""
+    if start_hour <= end_hour:
+        return start_hour <= hour < end_hour
+    return hour >= start_hour or hour < end_hour
+
+
+async def get_popularity_scores(db: AsyncSession) -> dict[int, float]:
+    """
+    Scores every product between 0 and 1, mostly by page views, then by rating.
+
+    Views are log-scaled, so a handful of very popular products does not flatten the rest.
+    """
+    rows = await ProductRepository(db).get_popularity()
+    max_views = max((row.view_count for row in rows), default=0)
+    scores = {}
+    for row in rows:
+        views = math.log1p(row.view_count) / math.log1p(max_views) if max_views else 0.0
+        rating = row.average_rating / 5 if row.review_count else 0.0
+        scores[row.product_id] = 0.8 * views + 0.2 * rating
+    return scores
+
+
+async def get_search_matches(
+    users: list,
+    vector_store: BasePydanticVectorStore,
+    embed_model: BaseEmbedding,
+    top_k: int,
+) -> dict[int, dict[int, float]]:
+    """Finds the products most similar to each user's recent searches."""
+    users = [user for user in users if user.search_history]
+    if not users:
+        return {}
+
+    queries = [" ".join(user.search_history[:RECENT_SEARCHES]) for user in users]
+    embeddings = await embed_model.aget_text_embedding_batch(queries)
+
+    matches = {}
+    for user, embedding in zip(users, embeddings):
+        result = await vector_store.aquery(
+            VectorStoreQuery(query_embedding=embedding, similarity_top_k=top_k),
+        )
+        products = {}
+        for node, similarity in zip(result.nodes or [], result.similarities or []):
+            product_id = int(node.metadata["product_id"])
+            products[product_id] = max(products.get(product_id, 0.0), similarity)
+        matches[user.id] = products
+    return matches
+
+
+async def get_prewarm_candidates(
+    vector_store: BasePydanticVectorStore,
+    embed_model: BaseEmbedding,
+    products_per_user: int = settings.PREWARM_PRODUCTS_PER_USER,
+) -> list[PrewarmCandidate]:
+    """
+    Ranks the products each user is likely to open next and has no section for yet.
+
+    A product scores by its similarity to the user's recent searches and by its popularity,
+    so users without a search history get the most popular products.
+
+    Returns:
+        list[PrewarmCandidate]: The best products of every user, best scores first.
+    """
+    async with Session() as db:
+        users = (await db.execute(select(User.id, User.search_history))).all()
+        popularity = await get_popularity_scores(db)
+        existing = set(
+            (
+                await db.execute(
+                    select(
+                        PersonalizedProductSection.user_id,
+                        PersonalizedProductSection.product_id,
+                    ),
+                )
+            ).all(),
+        )
+
+    matches = await get_search_matches(
+        users,
+        vector_store,
+        embed_model,
+        top_k=products_per_user * 3,
+    )
+    popular = sorted(popularity, key=popularity.get, reverse=True)
+
+    candidates = []
+    for user in users:
+        similarities = matches.get(user.id, {})
+        product_ids = set(similarities) | set(popular[: products_per_user * 3])
+        scored = sorted(
+            (
+                PrewarmCandidate(
+                    user_id=user.id,
+                    product_id=product_id,
+                    score=SEARCH_WEIGHT * similarities.get(product_id, 0.0)
+                    + POPULARITY_WEIGHT * popularity.get(product_id, 0.0),
+                )
+                for product_id in product_ids
+                if (user.id, product_id) not in existing
+            ),
+            key=lambda candidate: candidate.score,
+            reverse=True,
+        )
+        candidates.extend(scored[:products_per_user])
+
+    return sorted(candidates, key=lambda candidate: candidate.score, reverse=True)
+
+
+async def prewarm_personalizations(
+    token_budget: int = settings.PREWARM_TOKEN_BUDGET,
+    products_per_user: int = settings.PREWARM_PRODUCTS_PER_USER,
+    concurrency: int = settings.PREWARM_CONCURRENCY,
+    off_peak_only: bool = True,
+) -> dict:
+    """
+    Pre-generates personalized sections for the best candidates within a token budget.
+
+    Workflows are started best candidates first, until the LLM tokens they used reach
+    `token_budget`, or, with `off_peak_only`, the off-peak window ends. Workflows already
+    running when the budget runs out still finish, so it may be exceeded by up to
+    `concurrency` workflows.
+
+    Returns:
+        dict: Candidates found, sections generated and failed, and tokens used.
+    """
+    instrument_token_usage()
+    llm = await LLMManager.get_llm()
+    embed_model = await EmbedModelManager.get_embed_model()
+    vector_store_products_embeddings = await VectorStoreManager.get_vector_store(
+        db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_PRODUCTS,
+    )
+    vector_store_reviews_embeddings = await VectorStoreManager.get_vector_store(
+        db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_REVIEWS,
+    )
+    memory = MemoryService(CatalogCache())
+    stats = {"candidates": 0, "generated": 0, "failed": 0, "tokens": 0}
+
+    def can_start() -> bool:
+        if stats["tokens"] >= token_budget:
+            return False
+        return not off_peak_only or in_off_peak_window(datetime.now().hour)
+
+    async def generate(candidate: PrewarmCandidate) -> bool:
+        async with Session() as db:
+            # The user may have opened the product since the candidates were ranked.
+            if await PersonalizedProductRepository(db).exists(
+                (candidate.product_id, candidate.user_id),
+            ):
+                return False
+            await set_personalization_status(
+                db,
+                candidate.user_id,
+                candidate.product_id,
+                StatusEnum.running,
+                PersonalizationSource.PREWARM,
+            )
+
+        workflow_service = MultiAgentWorkflowService(
+            user_id=candidate.user_id,
+            product_id=candidate.product_id,
+            llm=llm,
+            embed_model=embed_model,
+            vector_store_products_embeddings=vector_store_products_embeddings,
+            vector_store_reviews_embeddings=vector_store_reviews_embeddings,
+            filters=MetadataFilters(
+                filters=[MetadataFilter(key="product_id", value=candidate.product_id)],
+            ),
+            memory=memory,
+        )
+        response, trace_id = await workflow_service.run_workflow()
+        await workflow_service.save_workflow_response(response, trace_id)
+        return True
+
+    async def worker(queue: list[PrewarmCandidate]) -> None:
+        while queue and can_start():
+            candidate = queue.pop(0)
+            with track_token_usage() as usage:
+                try:
+                    if await generate(candidate):
+                        stats["generated"] += 1
+                except Exception as exc:
+                    stats["failed"] += 1
+                    logger.error(
+                        f"Prewarming failed for user_id={candidate.user_id}, "
+                        f"product_id={candidate.product_id}: {exc}",
+                    )
+            stats["tokens"] += usage.total_tokens
+
+    try:
+        with request_priority(Priority.BACKGROUND):
+            candidates = await get_prewarm_candidates(
+                vector_store_products_embeddings,
+                embed_model,
+                products_per_user,
+            )
+            stats["candidates"] = len(candidates)
+            await asyncio.gather(*(worker(candidates) for _ in range(concurrency)))
+            await memory.drain()
+    finally:
+        await vector_store_products_embeddings.close()
+        await vector_store_reviews_embeddings.close()
+
+    logger.info(f"Prewarming finished: {stats}")
+    return stats
+
+
+async def get_prewarm_stats(db: AsyncSession) -> dict:
+    """
+    Reports how often a user's first opening of a section was served warm.
+
+    A first opening is served warm when the section was already generated, by prewarming
+    or by a background workflow, instead of being generated while the user waited.
+    """
+    rows = await PersonalizedProductRepository(db).get_first_open_stats()
+    opened = sum(row.opened for row in rows)
+    served_warm = sum(row.served_warm for row in rows)
+    return {
+        "first_opens": opened,
+        "served_warm": served_warm,
+        "hit_rate": round(served_warm / opened, 4) if opened else None,
+        "sources": {
+            row.source: {
+                "generated": row.generated,
+                "opened": row.opened,
+                "served_warm": row.served_warm,
+            }
+            for row in rows
+        },
+    }
@@ -1,8 +1,8 @@
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.config.memory import get_mem0_memory
 from src.config.config import settings
 from src.logging import logger
+from src.services.memory import MemoryService
 from src.utils import load_csv_data
 from src.utils.utils import add_user_preference_to_memory_during_migration
 
@@ -14,9 +14,12 @@ def clean_row_data(row):
     return {key: (None if value == "" else value) for key, value in row.items()}
 
 
-async def reset_user_preferences(db: AsyncSession) -> bool:
+async def reset_user_preferences(db: AsyncSession, memory: MemoryService) -> bool:
 
     try:
+        # Queued messages predate the reset, so they must not be added after it
+        await memory.discard_pending()
+
         async with db.begin():
             logger.info("Deleting from personalized_product_sections table")
             await db.execute(text("DELETE FROM personalized_product_sections;"))
@@ -28,11 +31,16 @@ async def reset_user_preferences(db: AsyncSession) -> bool:
             await db.execute(text("UPDATE users SET search_history = NULL;"))
 
         logger.info("Adding default data to mem0_chatstore table")
-        memory = get_mem0_memory()
-
         data = load_csv_data("data/users.csv")
         cleaned_data = [clean_row_data(row) for row in data]
-        await add_user_preference_to_memory_during_migration(cleaned_data, memory)
+        await add_user_preference_to_memory_during_migration(
+            cleaned_data,
+            memory.memory,
+        )
+
+        # Every user's memories were replaced, including users without default preferences
+        user_ids = (await db.scalars(text("SELECT id FROM users"))).all()
+        await memory.invalidate(list(user_ids))
 
         return True
 
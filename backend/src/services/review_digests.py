@@ -0,0 +1,91 @@
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database import Session
+from src.logging import logger
+from src.models import ReviewDigest
+from src.repository import ReviewDigestRepository
+
+# Features with fewer reviews are kept in the digest but not reported as pros or cons
+MIN_REVIEWS_FOR_HIGHLIGHT = 2
+
+
+def summarize_features(digest: dict) -> dict:
+    """
+    Adds the features reviewers mostly praise (`pros`) and mostly criticize (`cons`).
+
+    Both lists are ordered by how many reviews back them, so the reviews agent can pick
+    the highlights matching a user without reading any review itself.
+    """
+    features = [
+        feature
+        for feature in digest["features"]
+        if feature["feature"] != "general"
+        and feature["review_count"] >= MIN_REVIEWS_FOR_HIGHLIGHT
+    ]
+    pros = sorted(
+        (feature for feature in features if feature["positive"] > feature["negative"]),
+        key=lambda feature: feature["positive"],
+        reverse=True,
+    )
+    cons = sorted(
+        (feature for feature in features if feature["negative"] > feature["positive"]),
+        key=lambda feature: feature["negative"],
+        reverse=True,
+    )
+    return {
+        **digest,
+        "pros": [feature["feature"] for feature in pros],
+        "cons": [feature["feature"] for feature in cons],
+    }
+
+
+async def rebuild_review_digest(
+    db: AsyncSession,
+    product_id: int,
+    source_version: int,
+) -> ReviewDigest:
+    """Rebuilds the digest of a product, whose catalog cache version is `source_version`."""
+    repository = ReviewDigestRepository(db)
+    digest = summarize_features(await repository.build(product_id))
+    return await repository.update(
+        product_id,
+        ReviewDigest(
+            product_id=product_id,
+            digest=digest,
+            source_hash=await repository.get_fingerprint(product_id),
+            source_version=source_version,
+        ),
+    )
+
+
+async def get_review_digest(product_id: int) -> dict:
+    """
+    Returns the stored review digest of a product.
+
+    Digests are rebuilt by `refresh_review_digests` only, so one may lag behind reviews
+    added since its last refresh.
+    """
+    async with Session() as db:
+        digest = await ReviewDigestRepository(db).get_by_id(product_id)
+        return digest.digest if digest else {}
+
+
+async def refresh_review_digests(
+    product_ids: Optional[List[int]] = None,
+) -> dict:
+    """
+    Rebuilds the digests of products whose reviews changed since their last build.
+
+    Args:
+        product_ids (Optional[List[int]]): Products to check, all of them by default.
+
+    Returns:
+        dict: Number of digests refreshed.
+    """
+    async with Session() as db:
+        stale = await ReviewDigestRepository(db).get_stale(product_ids)
+        for product_id, source_version in stale.items():
+            await rebuild_review_digest(db, product_id, source_version)
+    logger.info(f"Refreshed {len(stale)} review digests")
+    return {"refreshed": len(stale)}
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.database import Session
+from src.models import Variant
+from src.repository import VariantRepository
+from src.services.catalog_cache import CatalogCache
+
+# A variant is low in stock below this many units
+LOW_STOCK_THRESHOLD = 10
+MAX_CACHED_PRODUCTS = 1024
+
+
+def normalize(value: str) -> str:
+    return value.strip().lower()
+
+
+class VariantIndex:
+    """
+    In-memory index of the variants of one product.
+
+    Maps each attribute to its values and each value to the ids of the variants having it,
+    so matching a set of preferences is a few set operations instead of an LLM-generated
+    SQL query. Attribute names and values are matched case-insensitively.
+
+    Args:
+        variants (List[Variant]): Variants of the product, with their attributes loaded.
+    """
+
+    def __init__(self, variants: List[Variant]):
+        self.variants: Dict[int, dict] = {}
+        self.attributes: Dict[str, Dict[str, set[int]]] = {}
+        self._names: Dict[str, str] = {}
+        self._values: Dict[tuple[str, str], str] = {}
+
+        for variant in variants:
+            attributes = {}
+            for attribute in variant.attributes:
+                name = normalize(attribute.attribute_name)
+                value = normalize(attribute.attribute_value)
+                self._names.setdefault(name, attribute.attribute_name)
+                self._values.setdefault((name, value), attribute.attribute_value)
+                self.attributes.setdefault(name, {}).setdefault(value, set()).add(
+                    variant.id,
+                )
+                attributes[attribute.attribute_name] = attribute.attribute_value
+
+            self.variants[variant.id] = {
+                "attributes": attributes,
+                "price": float(variant.price),
+                "in_stock": variant.in_stock,
+                "stock_level": self.stock_level(variant.in_stock),
+            }
+
+    @staticmethod
+    def stock_level(in_stock: int) -> str:
+        if in_stock <= 0:
+            return "out of stock"
+        if in_stock < LOW_STOCK_THRESHOLD:
+            return "low in stock"
+        return "in stock"
+
+    def describe(self) -> Dict[str, List[str]]:
+        """Returns every attribute of the product with its distinct values."""
+        return {
+            self._names[name]: sorted(self._values[(name, value)] for value in values)
+            for name, values in self.attributes.items()
+        }
+
+    def match(self, preferences: Dict[str, List[str]]) -> dict:
+        """
+        Finds the variants having one of the preferred values of every preferred attribute.
+
+        Attributes the product does not have are ignored. An attribute the product has is
+        always applied, even when none of its preferred values exist, in which case
+        nothing matches.
+
+        Returns:
+            dict: Matching variants, and the attributes that were applied and ignored.
+        """
+        matching = set(self.variants)
+        applied = {}
+        ignored = []
+        for name, values in preferences.items():
+            attribute = self.attributes.get(normalize(name))
+            if attribute is None:
+                ignored.append(name)
+                continue
+
+            if isinstance(values, str):
+                values = [values]
+            variant_ids = set()
+            for value in values:
+                variant_ids |= attribute.get(normalize(value), set())
+            matching &= variant_ids
+            applied[self._names[normalize(name)]] = values
+
+        return {
+            "applied_preferences": applied,
+            "ignored_preferences": ignored,
+            "matching_variants": [
+                self.variants[variant_id] for variant_id in sorted(matching)
+            ],
+        }
+
+
+_indexes: OrderedDict[int, tuple[int, VariantIndex]] = OrderedDict()
+
+
+async def get_variant_index(product_id: int) -> VariantIndex:
+    """
+    Returns the variant index of a product, built once per catalog version of the product.
+
+    The catalog version is bumped by triggers whenever a variant or attribute of the
+    product changes, so checking it is a primary key lookup and an index is rebuilt only
+    after its variants actually changed.
+    """
+    async with Session() as db:
+        version = await CatalogCache.read_version(f"product:{product_id}", db)
+        cached = _indexes.get(product_id)
+        if cached and cached[0] == version:
+            _indexes.move_to_end(product_id)
+            return cached[1]
+
+        variants = await VariantRepository(db).get_variants_by_product_id(product_id)
+
+    index = VariantIndex(variants)
+    _indexes[product_id] = (version, index)
+    _indexes.move_to_end(product_id)
+    while len(_indexes) > MAX_CACHED_PRODUCTS:
+        _indexes.popitem(last=False)
+    return index
+
+
+async def describe_product_variants(product_id: int) -> Dict[str, List[str]]:
+    return (await get_variant_index(product_id)).describe()
+
+
+async def match_product_variants(
+    product_id: int,
+    preferences: Optional[Dict[str, List[str]]],
+) -> dict:
+    return (await get_variant_index(product_id)).match(preferences or {})
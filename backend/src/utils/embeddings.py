@@ -1,25 +1,163 @@
+from collections import defaultdict
+from itertools import batched
+from typing import Iterable, Iterator, NamedTuple, Optional
+
 from bs4 import BeautifulSoup
-from llama_index.core import Settings, StorageContext, VectorStoreIndex
-from llama_index.core.schema import TextNode
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, TextNode
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
+from sqlalchemy import text
 from src.config.config import settings
 from src.config.embed_model import EmbedModelManager
 from src.config.vector_store import VectorStoreManager
 from src.logging import logger
 from src.utils import load_csv_data
+from src.utils.ingestion import EmbeddingIngestionEngine, IngestionStats
+from src.utils.rate_limiter import RateLimiter
+
+
+class EmbeddingSyncResult(NamedTuple):
+    embedded: int
+    deleted: int
+    unchanged: int
+
+
+def load_source_data(table_name: str, source: str = "csv") -> list:
+    """
+    Loads the rows embeddings are generated from, either from the seed CSV files or from
+    the application tables.
+
+    Args:
+        table_name (str): Name of the source table, which is also the CSV file name in 'data/'.
+        source (str): "csv" to read the seed files, "db" to read the database table.
+
+    Returns:
+        list: The rows as dictionaries.
+    """
+    if source == "csv":
+        return load_csv_data(f"data/{table_name}.csv")
+    if source != "db":
+        raise ValueError(f"Invalid source: {source}. Must be one of ['csv', 'db']")
+
+    from src.database import sync_engine
+
+    with sync_engine.connect() as connection:
+        result = connection.execute(text(f"SELECT * FROM {table_name} ORDER BY id"))
+        return [dict(row) for row in result.mappings()]
+
+
+def build_product_nodes(
+    products: Iterable[dict],
+    variants: Iterable[dict],
+    variant_attributes: Iterable[dict],
+) -> Iterator[TextNode]:
+    """
+    Lazily yields one text node per product, combining its specifications, description,
+    category and the attributes of each of its variants.
+
+    Variants are grouped by product id and attributes by variant id in a single pass,
+    so building the documents is linear in the number of input rows.
+
+    Args:
+        products (Iterable[dict]): Product rows.
+        variants (Iterable[dict]): Variant rows, referencing products by `product_id`.
+        variant_attributes (Iterable[dict]): Attribute rows, referencing variants by `variant_id`.
+
+    Yields:
+        TextNode: The node to embed for each product.
+    """
+    variants_by_product = defaultdict(list)
+    for variant in variants:
+        variants_by_product[variant["product_id"]].append(variant["id"])
+
+    attributes_by_variant = defaultdict(list)
+    for attr in variant_attributes:
+        attributes_by_variant[attr["variant_id"]].append(
+            f"{attr['attribute_name']}: {attr['attribute_value']}",
+        )
+
+    for product in products:
+        # Extract product specifications
+        product_specifications = {}
+        product_specifications["specifications"] = product["specifications"]
+        product_specifications["description"] = BeautifulSoup(
+            product["description"],
+            "html.parser",
+        ).get_text()
+        product_specifications["category"] = product["category"]
+        product_specifications["variants"] = [
+            {"attributes": ", ".join(attributes_by_variant[variant_id])}
+            for variant_id in variants_by_product[product["id"]]
+        ]
+
+        yield TextNode(
+            id_=f"product_{product['id']}",
+            text=",".join(
+                f"{key} : {value}" for key, value in product_specifications.items()
+            ),
+            metadata={"product_id": product["id"], "category": product["category"]},
+        )
+
+
+def build_review_nodes(reviews: Iterable[dict]) -> Iterator[TextNode]:
+    """
+    Lazily yields one text node per review.
+
+    Args:
+        reviews (Iterable[dict]): Review rows.
+
+    Yields:
+        TextNode: The node to embed for each review.
+    """
+    for review in reviews:
+        yield TextNode(
+            id_=f"review_{review['id']}",
+            text=review["review"],
+            metadata={"review_id": review["id"], "product_id": review["product_id"]},
+        )
+
+
+def get_ingestion_engine(
+    vector_store: BasePydanticVectorStore,
+    embed_model: BaseEmbedding,
+    batch_size: int = 100,
+    upsert: bool = False,
+) -> EmbeddingIngestionEngine:
+    """
+    Returns an ingestion engine limited by the configured embedding RPM/TPM budget.
+    """
+    return EmbeddingIngestionEngine(
+        vector_store,
+        embed_model,
+        batch_size=batch_size,
+        concurrency=settings.EMBEDDING_INGESTION_CONCURRENCY,
+        rate_limiter=RateLimiter(
+            requests_per_minute=settings.EMBEDDING_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.EMBEDDING_TOKENS_PER_MINUTE,
+        ),
+        upsert=upsert,
+    )
 
 
-async def create_and_push_embeddings_for_products() -> None:
+async def create_and_push_embeddings_for_products(
+    batch_size: int = 100,
+) -> Optional[IngestionStats]:
     """
     Reads product data from a CSV file, generates vector embeddings for product technical specifications
     and features, and stores them in a vector store.
 
     The function performs the following steps:
-        1. Reads product data from the 'data/product.csv' file.
-        2. Formats the data for embeddings by extracting and combining product specifications, brand, category, and colors.
-        3. Creates text nodes for each product's technical specifications and features.
-        4. Retrieves singleton instances of the vector store and embedding model.
-        5. Generates vector embeddings using the llama_index library.
-        6. Stores the generated embeddings in the vector store.
+        1. Reads product, variant and variant attribute data from the 'data/' CSV files.
+        2. Lazily builds a text node per product from its specifications, description, category and variants.
+        3. Retrieves singleton instances of the vector store and embedding model.
+        4. Generates vector embeddings in concurrent, rate-limited batches.
+        5. Writes each batch of embeddings to the vector store with a binary COPY.
+
+    Args:
+        batch_size (int): The number of products embedded and inserted per batch.
+
+    Returns:
+        Optional[IngestionStats]: Throughput of the run, or None if it failed.
 
     Raises:
         Exception: If an error occurs during the embedding generation process, it is caught and logged.
@@ -31,81 +169,42 @@ async def create_and_push_embeddings_for_products() -> None:
         variants = load_csv_data("data/variants.csv")
         variant_attributes = load_csv_data("data/variant_attributes.csv")
 
-        # format data for embeddings
-        data_for_embeddings = []
-        product_ids = []
-        product_categories = []
-
-        for product in products:
-
-            product_ids.append(product["id"])
-            product_categories.append(product["category"])
-
-            # Extract product specifications
-            product_specifications = {}
-            product_specifications["specifications"] = product["specifications"]
-            product_specifications["description"] = BeautifulSoup(
-                product["description"],
-                "html.parser",
-            ).get_text()
-            product_specifications["category"] = product["category"]
-            product_specifications["variants"] = [
-                {
-                    "attributes": ", ".join(
-                        f"{attr['attribute_name']}: {attr['attribute_value']}"
-                        for attr in variant_attributes
-                        if attr["variant_id"] == variant["id"]
-                    ),
-                }
-                for variant in variants
-                if variant["product_id"] == product["id"]
-            ]
-
-            data_for_embeddings.append(
-                ",".join(
-                    f"{key} : {value}" for key, value in product_specifications.items()
-                ),
-            )
-
-        nodes = [
-            TextNode(text=t, metadata={"product_id": id, "category": category})
-            for t, id, category in zip(
-                data_for_embeddings,
-                product_ids,
-                product_categories,
-            )
-        ]
-
-        # retrieve and set vector store and embed model instances
-        Settings.embed_model = await EmbedModelManager.get_embed_model()
-        storage_context = StorageContext.from_defaults(
-            vector_store=await VectorStoreManager.get_vector_store(
-                db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_PRODUCTS,
-            ),
+        vector_store = await VectorStoreManager.get_vector_store(
+            db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_PRODUCTS,
         )
+        embed_model = await EmbedModelManager.get_embed_model()
 
         # create and push embeddings to vector store
-        VectorStoreIndex(nodes, storage_context=storage_context, show_progress=True)
+        return await get_ingestion_engine(
+            vector_store,
+            embed_model,
+            batch_size=batch_size,
+        ).ingest(build_product_nodes(products, variants, variant_attributes))
 
     except Exception as e:
         logger.error(f"Error: {e}", exc_info=True)
 
 
-async def create_and_push_embeddings_for_reviews(batch_size: int = 200) -> None:
+async def create_and_push_embeddings_for_reviews(
+    batch_size: int = 200,
+) -> Optional[IngestionStats]:
     """
     Reads review data from a CSV file in batches, generates vector embeddings for review text, and stores them in a vector store.
 
     The function performs the following steps:
         1. Reads review data from the 'data/reviews.csv' file.
         2. Formats the data for embeddings by extracting review text and product ID.
-        3. Creates text nodes for each review text.
+        3. Creates text nodes for each review text, identified by review ID.
         4. Retrieves singleton instances of the vector store and embedding model.
-        5. Generates vector embeddings using the llama_index library for each batch.
-        6. Stores the generated embeddings in the vector store in batches.
+        5. Generates vector embeddings in concurrent, rate-limited batches.
+        6. Writes each batch of embeddings to the vector store with a binary COPY.
 
     Args:
         batch_size (int): The number of reviews to process in each batch.
 
+    Returns:
+        Optional[IngestionStats]: Throughput of the run, or None if it failed.
+
     Raises:
         Exception: If an error occurs during the embedding generation process, it is caught and logged.
     """
@@ -114,46 +213,128 @@ async def create_and_push_embeddings_for_reviews(batch_size: int = 200) -> None:
         # Fetch data from CSV file
         reviews = load_csv_data("data/product_reviews.csv")
 
-        # Retrieve and set vector store and embed model instances
-        Settings.embed_model = await EmbedModelManager.get_embed_model()
-        storage_context = StorageContext.from_defaults(
-            vector_store=await VectorStoreManager.get_vector_store(
-                db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_REVIEWS,
-            ),
+        # Retrieve vector store and embed model instances
+        vector_store = await VectorStoreManager.get_vector_store(
+            db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_REVIEWS,
         )
+        embed_model = await EmbedModelManager.get_embed_model()
 
-        data_for_embeddings = []
-        review_ids = []
-        product_ids = []
-
-        for review in reviews:
-            review_ids.append(review["id"])
-            product_ids.append(review["product_id"])
-            data_for_embeddings.append(review["review"])
-
-        # Create nodes for the current batch
-        nodes = [
-            TextNode(
-                text=text,
-                metadata={"review_id": review_id, "product_id": product_id},
-            )
-            for text, review_id, product_id in zip(
-                data_for_embeddings,
-                review_ids,
-                product_ids,
-            )
-        ]
-
-        # Push embeddings for the current batch
-        VectorStoreIndex(
-            nodes,
-            insert_batch_size=batch_size,
-            storage_context=storage_context,
-            show_progress=True,
-        )
+        # Push embeddings in concurrent batches
+        return await get_ingestion_engine(
+            vector_store,
+            embed_model,
+            batch_size=batch_size,
+        ).ingest(build_review_nodes(reviews))
 
     except Exception as e:
         logger.error(
             f"Error in create_and_push_embeddings_for_reviews: {e}",
             exc_info=True,
         )
+
+
+async def sync_embeddings(
+    nodes: Iterable[BaseNode],
+    vector_store: BasePydanticVectorStore,
+    embed_model: BaseEmbedding,
+    batch_size: int = 100,
+) -> EmbeddingSyncResult:
+    """
+    Brings the vector store in line with the given source nodes, embedding only what changed.
+
+    Stored content hashes are compared against the hash of each source node. New or changed
+    nodes are embedded and upserted by node id, and stored nodes that no longer have a source
+    row are deleted.
+
+    Args:
+        nodes (Iterable[BaseNode]): Nodes built from the current source rows.
+        vector_store (BasePydanticVectorStore): Vector store to synchronize.
+        embed_model (BaseEmbedding): Model used to generate the embeddings.
+        batch_size (int): The number of nodes embedded and upserted per batch.
+
+    Returns:
+        EmbeddingSyncResult: Counts of embedded, deleted and unchanged nodes.
+    """
+    stored_hashes = await vector_store.aget_content_hashes()
+    source_node_ids = set()
+
+    def changed_nodes() -> Iterator[BaseNode]:
+        for node in nodes:
+            source_node_ids.add(node.node_id)
+            if stored_hashes.get(node.node_id) != node.hash:
+                yield node
+
+    stats = await get_ingestion_engine(
+        vector_store,
+        embed_model,
+        batch_size=batch_size,
+        upsert=True,
+    ).ingest(changed_nodes())
+    embedded = stats.rows
+
+    orphan_node_ids = [
+        node_id for node_id in stored_hashes if node_id not in source_node_ids
+    ]
+    for orphan_batch in batched(orphan_node_ids, batch_size):
+        await vector_store.adelete_nodes(node_ids=list(orphan_batch))
+
+    result = EmbeddingSyncResult(
+        embedded=embedded,
+        deleted=len(orphan_node_ids),
+        unchanged=len(source_node_ids) - embedded,
+    )
+    logger.info(f"Embeddings synchronized: {result._asdict()}")
+    return result
+
+
+async def sync_embeddings_for_products(
+    source: str = "db",
+    batch_size: int = 100,
+) -> EmbeddingSyncResult:
+    """
+    Re-embeds only the products whose documents changed since the last run.
+
+    Args:
+        source (str): "db" to read the application tables, "csv" to read the seed files.
+        batch_size (int): The number of products embedded and upserted per batch.
+
+    Returns:
+        EmbeddingSyncResult: Counts of embedded, deleted and unchanged products.
+    """
+    nodes = build_product_nodes(
+        load_source_data("products", source),
+        load_source_data("variants", source),
+        load_source_data("variant_attributes", source),
+    )
+    return await sync_embeddings(
+        nodes,
+        await VectorStoreManager.get_vector_store(
+            db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_PRODUCTS,
+        ),
+        await EmbedModelManager.get_embed_model(),
+        batch_size=batch_size,
+    )
+
+
+async def sync_embeddings_for_reviews(
+    source: str = "db",
+    batch_size: int = 200,
+) -> EmbeddingSyncResult:
+    """
+    Re-embeds only the reviews whose text changed since the last run.
+
+    Args:
+        source (str): "db" to read the application tables, "csv" to read the seed files.
+        batch_size (int): The number of reviews embedded and upserted per batch.
+
+    Returns:
+        EmbeddingSyncResult: Counts of embedded, deleted and unchanged reviews.
+    """
+    return await sync_embeddings(
+        build_review_nodes(load_source_data("product_reviews", source)),
+        await VectorStoreManager.get_vector_store(
+            db_embedding_table_name=settings.DB_EMBEDDING_TABLE_FOR_REVIEWS,
+        ),
+        await EmbedModelManager.get_embed_model(),
+        batch_size=batch_size,
+    )
@@ -0,0 +1,179 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+import httpx
+from src.logging import logger
+
+# Primary latencies needed before requests are hedged
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 500
+
+
+class LatencyTracker:
+    """Percentiles of the latest `window` latencies."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+def is_usable(task: asyncio.Task) -> bool:
+    """Whether a finished attempt returned a response worth returning over the other's."""
+    if task.cancelled() or task.exception() is not None:
+        return False
+    status_code = task.result().status_code
+    return status_code < 500 and status_code != 429
+
+
+def discard(task: asyncio.Task) -> None:
+    """Cancels an attempt, closing its response if it was already received."""
+
+    def close(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is None:
+            asyncio.ensure_future(task.result().aclose())
+
+    task.cancel()
+    task.add_done_callback(close)
+
+
+class HedgedAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Async httpx transport hedging chat completions to an alternate deployment.
+
+    A chat completion still waiting for its response after the `percentile` latency of the
+    recent primary requests is sent again to `alternate_deployment`. The first usable
+    response is returned and the other request is cancelled. Only the time to the response
+    headers is hedged, so streamed completions are hedged on their first token.
+
+    The alternate deployment must be on the same Azure OpenAI resource, as only the
+    deployment in the request path is replaced.
+
+    Args:
+        primary (httpx.AsyncBaseTransport): Sends requests to the primary deployment.
+        alternate (httpx.AsyncBaseTransport): Sends the hedged requests.
+        deployment (str): The primary deployment.
+        alternate_deployment (str): The deployment hedged requests are sent to.
+        percentile (float): Latency percentile after which a request is hedged.
+        min_delay (float): Minimum seconds before a request is hedged.
+    """
+
+    def __init__(
+        self,
+        primary: httpx.AsyncBaseTransport,
+        alternate: httpx.AsyncBaseTransport,
+        deployment: str,
+        alternate_deployment: str,
+        percentile: float = 0.95,
+        min_delay: float = 0.0,
+    ):
+        self.primary = primary
+        self.alternate = alternate
+        self.deployment = deployment
+        self.alternate_deployment = alternate_deployment
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.latencies = LatencyTracker()
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0}
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "hedge_delay_seconds": self._get_delay(),
+        }
+
+    def _get_delay(self) -> Optional[float]:
+        delay = self.latencies.percentile(self.percentile)
+        return max(delay, self.min_delay) if delay is not None else None
+
+    def _to_alternate(self, request: httpx.Request) -> httpx.Request:
+        path = request.url.path.replace(
+            f"/deployments/{self.deployment}/",
+            f"/deployments/{self.alternate_deployment}/",
+        )
+        return httpx.Request(
+            request.method,
+            request.url.copy_with(path=path),
+            headers=request.headers,
+            content=request.content,
+            extensions=request.extensions,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            return await self.primary.handle_async_request(request)
+
+        self.stats["requests"] += 1
+        delay = self._get_delay()
+        started_at = time.monotonic()
+        primary = asyncio.create_task(self.primary.handle_async_request(request))
+        # Cancelled primaries count with the time they took so far, which keeps the
+        # percentile from dropping as hedges win.
+        primary.add_done_callback(
+            lambda _: self.latencies.record(time.monotonic() - started_at),
+        )
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            discard(primary)
+            raise
+        if done:
+            return primary.result()
+
+        self.stats["hedged"] += 1
+        hedge = asyncio.create_task(
+            self.alternate.handle_async_request(self._to_alternate(request)),
+        )
+        try:
+            winner = await self._first_usable(primary, hedge)
+        except asyncio.CancelledError:
+            discard(primary)
+            discard(hedge)
+            raise
+
+        if winner is hedge:
+            self.stats["hedge_wins"] += 1
+            logger.info(
+                f"Hedged request to {self.alternate_deployment} answered after "
+                f"{time.monotonic() - started_at:.2f}s",
+            )
+        return winner.result()
+
+    async def _first_usable(
+        self,
+        primary: asyncio.Task,
+        hedge: asyncio.Task,
+    ) -> asyncio.Task:
+        """
+        Waits for the first usable attempt and discards the other.
+
+        When neither is usable, the primary attempt is returned, so its error surfaces.
+        """
+        pending = {primary, hedge}
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            winner = next((task for task in done if is_usable(task)), None)
+
+        winner = winner or primary
+        for task in (primary, hedge):
+            if task is not winner:
+                discard(task)
+        return winner
+
+    async def aclose(self) -> None:
+        await self.primary.aclose()
+        await self.alternate.aclose()
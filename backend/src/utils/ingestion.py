@@ -0,0 +1,134 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from itertools import batched
+from typing import Iterable, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.utils import get_tokenizer
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
+from src.logging import logger
+from src.utils.rate_governor import Priority, request_priority
+from src.utils.rate_limiter import RateLimiter
+
+
+@dataclass
+class IngestionStats:
+    rows: int = 0
+    batches: int = 0
+    rate_limit_wait_seconds: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 2),
+            "rate_limit_wait_seconds": round(self.rate_limit_wait_seconds, 3),
+        }
+
+
+class EmbeddingIngestionEngine:
+    """
+    Embeds nodes in concurrent batches under a requests/tokens per minute budget and writes
+    each batch to a PGDiskAnn vector store.
+
+    Fresh loads are written with a binary COPY; `upsert=True` replaces existing rows by node id
+    instead, for incremental syncs.
+
+    Args:
+        vector_store (BasePydanticVectorStore): Destination vector store.
+        embed_model (BaseEmbedding): Model used to generate the embeddings.
+        batch_size (int): The number of nodes embedded in one request and written together.
+        concurrency (int): The maximum number of batches in flight.
+        rate_limiter (Optional[RateLimiter]): Budget shared by the embedding requests.
+        upsert (bool): Replace rows with the same node id instead of appending with COPY.
+    """
+
+    def __init__(
+        self,
+        vector_store: BasePydanticVectorStore,
+        embed_model: BaseEmbedding,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+        upsert: bool = False,
+    ):
+        self.vector_store = vector_store
+        self.embed_model = embed_model
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.upsert = upsert
+        self._tokenizer = get_tokenizer()
+
+    async def ingest(self, nodes: Iterable[BaseNode]) -> IngestionStats:
+        """
+        Embeds and writes all nodes. Nodes are consumed lazily, holding at most `concurrency`
+        batches in memory.
+
+        Returns:
+            IngestionStats: Row counts and throughput of the run.
+        """
+        stats = IngestionStats()
+        slots = asyncio.Semaphore(self.concurrency)
+
+        # Bulk embedding yields the shared embedding budget to every other caller
+        with request_priority(Priority.MIGRATION):
+            async with asyncio.TaskGroup() as task_group:
+                for batch in batched(nodes, self.batch_size):
+                    await slots.acquire()
+                    task_group.create_task(
+                        self._ingest_batch(list(batch), stats, slots),
+                    )
+
+        stats.finished_at = time.monotonic()
+        logger.info(f"Embedding ingestion finished: {stats.to_dict()}")
+        return stats
+
+    async def _ingest_batch(
+        self,
+        batch: list[BaseNode],
+        stats: IngestionStats,
+        slots: asyncio.Semaphore,
+    ) -> None:
+        try:
+            texts = [
+                node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch
+            ]
+            tokens = sum(len(self._tokenizer(text)) for text in texts)
+            # The embed model splits a batch into requests of `embed_batch_size` texts
+            requests = -(-len(texts) // self.embed_model.embed_batch_size)
+            stats.rate_limit_wait_seconds += await self.rate_limiter.acquire(
+                tokens,
+                requests,
+            )
+
+            embeddings = await self.embed_model.aget_text_embedding_batch(texts)
+            for node, embedding in zip(batch, embeddings):
+                node.embedding = embedding
+
+            if self.upsert:
+                await self.vector_store.async_upsert(batch)
+            else:
+                await self.vector_store.async_copy_add(batch)
+
+            stats.rows += len(batch)
+            stats.batches += 1
+            logger.info(
+                f"Ingested {stats.rows} rows ({stats.rows_per_second:.1f} rows/sec)",
+            )
+        finally:
+            slots.release()
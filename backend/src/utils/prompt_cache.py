@@ -0,0 +1,120 @@
+import json
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Optional
+
+import httpx
+from src.utils.token_usage import current_token_usage
+
+# Bytes of a streamed body kept to find its usage, which comes in the last chunk
+USAGE_TAIL_BYTES = 8192
+
+
+@dataclass
+class PromptCacheStats:
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+
+    def record(self, usage: dict) -> None:
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get(
+            "cached_tokens",
+        ) or 0
+        self.requests += 1
+        self.prompt_tokens += usage.get("prompt_tokens") or 0
+        self.cached_tokens += cached_tokens
+
+        token_usage = current_token_usage.get()
+        if token_usage is not None:
+            token_usage.cached_tokens += cached_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "cached_ratio": (
+                self.cached_tokens / self.prompt_tokens if self.prompt_tokens else None
+            ),
+        }
+
+
+def find_usage(body: bytes, streamed: bool) -> Optional[dict]:
+    """Returns the usage reported in a chat completion body, streamed as events or not."""
+    if not streamed:
+        try:
+            return json.loads(body).get("usage")
+        except ValueError:
+            return None
+
+    # The usage chunk is the last one before `data: [DONE]`
+    for line in reversed(body.splitlines()):
+        line = line.strip()
+        if not line.startswith(b"data: {"):
+            continue
+        try:
+            usage = json.loads(line.removeprefix(b"data: ")).get("usage")
+        except ValueError:
+            continue
+        if usage:
+            return usage
+    return None
+
+
+class UsageRecordingStream(httpx.AsyncByteStream):
+    """Passes a response body through, recording its usage once it was read to the end."""
+
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        stats: PromptCacheStats,
+        streamed: bool,
+    ):
+        self.stream = stream
+        self.stats = stats
+        self.streamed = streamed
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        body = bytearray()
+        async for chunk in self.stream:
+            body += chunk
+            if self.streamed and len(body) > USAGE_TAIL_BYTES:
+                del body[:-USAGE_TAIL_BYTES]
+            yield chunk
+
+        usage = find_usage(bytes(body), self.streamed)
+        if usage:
+            self.stats.record(usage)
+
+    async def aclose(self) -> None:
+        await self.stream.aclose()
+
+
+class UsageRecordingAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Async httpx transport recording how many prompt tokens of chat completions were cached.
+
+    Azure OpenAI reports the prompt tokens served from its prompt cache in the usage of
+    each completion. Streamed completions only report it when requested with
+    `stream_options={"include_usage": True}`, in a last chunk that LlamaIndex skips, so the
+    usage is read from the response body as it passes through.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: PromptCacheStats):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        if (
+            request.url.path.endswith("/chat/completions")
+            and response.status_code == 200
+        ):
+            response.stream = UsageRecordingStream(
+                response.stream,
+                self.stats,
+                streamed=response.headers.get("content-type", "").startswith(
+                    "text/event-stream",
+                ),
+            )
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
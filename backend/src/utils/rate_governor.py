@@ -0,0 +1,464 @@
+import asyncio
+import heapq
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Iterator, Optional
+
+import httpx
+from sqlalchemy import text
+from src.config.config import settings
+from src.database import RateLimitSession
+from src.logging import logger
+from src.utils.rate_limiter import TokenBucket
+from src.utils.token_usage import CHARS_PER_TOKEN
+
+# Completion tokens counted against the budget when a request sets no maximum
+DEFAULT_COMPLETION_TOKENS = 256
+# Seconds to pause when a 429 response does not say how long to wait
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+
+
+class Priority(IntEnum):
+    """Order in which queued requests are let through, lowest first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    MIGRATION = 2
+
+
+current_priority: ContextVar[Priority] = ContextVar(
+    "current_priority",
+    default=Priority.INTERACTIVE,
+)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Sets the priority of the LLM and embedding requests made within the block and its tasks."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """
+    Estimates the tokens a chat or embedding request counts against the TPM budget.
+
+    Like Azure OpenAI, the prompt is estimated from its length and the completion is
+    counted at its maximum.
+    """
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return 0
+    if not isinstance(body, dict) or not ("input" in body or "messages" in body):
+        return 0
+
+    if "input" in body:
+        inputs = body["input"]
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        return sum(len(str(value)) for value in inputs) // CHARS_PER_TOKEN
+
+    prompt_chars = 0
+    for message in body.get("messages", []):
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(str(part.get("text", "")) for part in content)
+        prompt_chars += len(str(content))
+    completion_tokens = (
+        body.get("max_tokens")
+        or body.get("max_completion_tokens")
+        or DEFAULT_COMPLETION_TOKENS
+    )
+    return prompt_chars // CHARS_PER_TOKEN + completion_tokens
+
+
+class SharedTokenBuckets:
+    """
+    Requests and tokens budgets shared by every worker through Postgres.
+
+    Both buckets are refilled and taken from atomically by `take_rate_limit_tokens`, so
+    all workers together stay within the deployment's limits. Tokens are taken through the
+    dedicated `RateLimitSession` pool, counted in the workers' connection budget.
+
+    Args:
+        name (str): Prefix of the bucket rows.
+        requests_per_minute (int): Requests budget, 0 to disable.
+        tokens_per_minute (int): Tokens budget, 0 to disable.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int):
+        self.buckets = [
+            (f"{name}:requests", requests_per_minute),
+            (f"{name}:tokens", tokens_per_minute),
+        ]
+
+    async def take(self, tokens: int) -> float:
+        """
+        Takes a request and `tokens` tokens if both fit.
+
+        Returns:
+            float: 0 if they were taken, otherwise seconds until they fit.
+        """
+        names, capacities, amounts = [], [], []
+        for (name, capacity), amount in zip(self.buckets, (1, tokens)):
+            if capacity:
+                names.append(name)
+                capacities.append(float(capacity))
+                amounts.append(float(amount))
+        if not names:
+            return 0.0
+
+        async with RateLimitSession() as db:
+            wait = await db.scalar(
+                text(
+                    "SELECT take_rate_limit_tokens(:names, :capacities, :amounts, 60.0)",
+                ),
+                {"names": names, "capacities": capacities, "amounts": amounts},
+            )
+            await db.commit()
+        return wait
+
+
+class RateGovernor:
+    """
+    Process-wide governor of the requests sent to one Azure OpenAI deployment.
+
+    Every request waits in a queue ordered by the priority of the context it is made from
+    (see `request_priority`), then by arrival, until it fits the requests-per-minute and
+    tokens-per-minute budgets and the concurrency limit. The budgets adapt to the
+    deployment's responses: limits it reports are learnt when none are configured, its
+    remaining requests and tokens cap the local budgets, and a 429 pauses every request
+    for the time it asks to wait, so the SDK's retries do not pile onto a throttled
+    deployment. With `shared`, the budgets are also enforced across workers in Postgres.
+
+    A limit of 0 disables the corresponding budget.
+
+    Args:
+        name (str): Name of the deployment, used for the shared buckets and logs.
+        requests_per_minute (int): Requests budget.
+        tokens_per_minute (int): Tokens budget.
+        max_concurrency (int): Maximum requests in flight.
+        shared (bool): Whether to enforce the budgets across workers as well.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 0,
+        shared: bool = False,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._shared = (
+            SharedTokenBuckets(name, requests_per_minute, tokens_per_minute)
+            if shared
+            else None
+        )
+        self._queue: list[tuple[int, int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._released: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._warned_unqueued = False
+        self.stats = {
+            "throttled": 0,
+            "unqueued": 0,
+            "priorities": {
+                priority.name.lower(): {
+                    "requests": 0,
+                    "wait_seconds": 0.0,
+                    "max_wait_seconds": 0.0,
+                }
+                for priority in Priority
+            },
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "queued": sum(not waiter[3].done() for waiter in self._queue),
+            "in_flight": self._in_flight,
+            "requests_per_minute": self._requests.capacity if self._requests else 0,
+            "tokens_per_minute": self._tokens.capacity if self._tokens else 0,
+        }
+
+    async def acquire(self, tokens: int, priority: Optional[Priority] = None) -> float:
+        """
+        Waits for the request's turn and takes it from the budgets.
+
+        Every acquired request must be released with `release`.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        priority = current_priority.get() if priority is None else priority
+        started_at = time.monotonic()
+        self._loop = asyncio.get_running_loop()
+        future = self._loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._counter), tokens, future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted before the cancellation reached the waiter
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+        waited = time.monotonic() - started_at
+        stats = self.stats["priorities"][priority.name.lower()]
+        stats["requests"] += 1
+        stats["wait_seconds"] += waited
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+        return waited
+
+    def acquire_threadsafe(self, tokens: int) -> None:
+        """
+        Acquires from a thread other than the event loop's, blocking until it is granted.
+
+        From the loop's own thread, e.g. a sync LLM call made in a coroutine, waiting for
+        the queue would deadlock the loop that dispatches it. Such requests, like those made
+        before the loop first used the governor, are taken from the local budgets without
+        waiting, bypassing the queue, the concurrency limit and the shared budgets. They are
+        counted as `unqueued`, and the first one is logged, as they should be made through
+        the async API instead.
+        """
+        priority = current_priority.get()
+        loop = self._loop
+        if loop is None or not loop.is_running() or _in_loop_thread(loop):
+            self._take(tokens)
+            self._in_flight += 1
+            self.stats["unqueued"] += 1
+            if loop is not None and not self._warned_unqueued:
+                self._warned_unqueued = True
+                logger.warning(
+                    f"Rate governor {self.name}: sync request made from the event loop, "
+                    "sending it without queueing",
+                )
+            return
+        asyncio.run_coroutine_threadsafe(self.acquire(tokens, priority), loop).result()
+
+    def release(self) -> None:
+        loop = self._loop
+        if loop and loop.is_running() and not _in_loop_thread(loop):
+            loop.call_soon_threadsafe(self.release)
+            return
+        self._in_flight -= 1
+        if self._released:
+            self._released.set()
+
+    async def _dispatch(self) -> None:
+        """Grants queued requests one at a time, in priority order, as they fit."""
+        self._released = self._released or asyncio.Event()
+        while self._queue:
+            priority, _, tokens, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+
+            if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                self._released.clear()
+                await self._released.wait()
+                continue
+
+            wait = self._time_until_available(tokens)
+            if wait <= 0 and self._shared:
+                try:
+                    wait = await self._shared.take(tokens)
+                except Exception as exc:
+                    # Fall back to the local budgets rather than stall every request
+                    logger.error(
+                        f"Rate governor {self.name}: shared budget failed: {exc}",
+                    )
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._take(tokens)
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _time_until_available(self, tokens: int) -> float:
+        return max(
+            self._paused_until - time.monotonic(),
+            self._requests.time_until_available(1) if self._requests else 0.0,
+            self._tokens.time_until_available(tokens) if self._tokens else 0.0,
+        )
+
+    def _take(self, tokens: int) -> None:
+        if self._requests:
+            self._requests.consume(1)
+        if self._tokens:
+            self._tokens.consume(tokens)
+
+    def update_from_headers(self, status_code: int, headers: httpx.Headers) -> None:
+        """Adapts the budgets to the rate limit headers of a response."""
+        for header, bucket_name in (
+            ("x-ratelimit-limit-requests", "_requests"),
+            ("x-ratelimit-limit-tokens", "_tokens"),
+        ):
+            limit = _parse_number(headers.get(header))
+            if limit and getattr(self, bucket_name) is None:
+                setattr(self, bucket_name, TokenBucket(limit))
+                logger.info(f"Rate governor {self.name}: learnt {header}={limit:g}")
+
+        for header, bucket in (
+            ("x-ratelimit-remaining-requests", self._requests),
+            ("x-ratelimit-remaining-tokens", self._tokens),
+        ):
+            remaining = _parse_number(headers.get(header))
+            if remaining is not None and bucket:
+                bucket.cap(remaining)
+
+        if status_code == 429:
+            retry_after = _parse_number(headers.get("retry-after-ms"))
+            retry_after = (
+                retry_after / 1000
+                if retry_after is not None
+                else _parse_number(headers.get("retry-after"))
+            )
+            if retry_after is None:
+                retry_after = DEFAULT_RETRY_AFTER_SECONDS
+            self._paused_until = max(
+                self._paused_until,
+                time.monotonic() + retry_after,
+            )
+            self.stats["throttled"] += 1
+            logger.warning(
+                f"Rate governor {self.name}: throttled, pausing for {retry_after:g}s",
+            )
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _in_loop_thread(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+class GovernedAsyncTransport(httpx.AsyncBaseTransport):
+    """Async httpx transport sending every request through a `RateGovernor`."""
+
+    def __init__(
+        self,
+        governor: RateGovernor,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.governor = governor
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.governor.acquire(estimate_request_tokens(request))
+        try:
+            response = await self.transport.handle_async_request(request)
+        finally:
+            self.governor.release()
+        self.governor.update_from_headers(response.status_code, response.headers)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class GovernedTransport(httpx.BaseTransport):
+    """
+    Sync httpx transport sending every request through a `RateGovernor`.
+
+    Requests made from the event loop's thread skip the governor's queue, see
+    `RateGovernor.acquire_threadsafe`.
+    """
+
+    def __init__(
+        self,
+        governor: RateGovernor,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        self.governor = governor
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.governor.acquire_threadsafe(estimate_request_tokens(request))
+        try:
+            response = self.transport.handle_request(request)
+        finally:
+            self.governor.release()
+        self.governor.update_from_headers(response.status_code, response.headers)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+_governors: dict[str, RateGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_rate_governor(name: str) -> RateGovernor:
+    """
+    Returns the process-wide governor of the `llm` or `embeddings` deployment.
+
+    Other deployments, named by their deployment name, only adapt to their responses.
+    """
+    with _governors_lock:
+        if name not in _governors:
+            limits = {
+                "llm": (
+                    settings.LLM_REQUESTS_PER_MINUTE,
+                    settings.LLM_TOKENS_PER_MINUTE,
+                    settings.LLM_MAX_CONCURRENCY,
+                ),
+                "embeddings": (
+                    settings.EMBEDDING_REQUESTS_PER_MINUTE,
+                    settings.EMBEDDING_TOKENS_PER_MINUTE,
+                    settings.EMBEDDING_MAX_CONCURRENCY,
+                ),
+            }.get(name, (0, 0, 0))
+            _governors[name] = RateGovernor(
+                name,
+                *limits,
+                shared=settings.RATE_LIMIT_SHARED,
+            )
+        return _governors[name]
+
+
+def get_rate_governor_stats() -> dict:
+    return {name: governor.get_stats() for name, governor in _governors.items()}
+
+
+def get_governed_http_clients(name: str) -> dict:
+    """Returns sync and async httpx clients for the deployment, as LLM and embedding kwargs."""
+    governor = get_rate_governor(name)
+    return {
+        "http_client": httpx.Client(transport=GovernedTransport(governor)),
+        "async_http_client": httpx.AsyncClient(
+            transport=GovernedAsyncTransport(governor),
+        ),
+    }
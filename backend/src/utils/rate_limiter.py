@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at `capacity` tokens per `period` seconds.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.rate,
+        )
+        self.updated_at = now
+
+    def time_until_available(self, amount: float) -> float:
+        """Seconds to wait until `amount` tokens are available, 0 if they are now."""
+        self._refill()
+        # A request larger than the bucket is let through once the bucket is full.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def cap(self, amount: float) -> None:
+        """Lowers the available tokens to at most `amount`, e.g. what a server reports left."""
+        self._refill()
+        self.tokens = min(self.tokens, amount)
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Async limiter enforcing requests-per-minute and tokens-per-minute budgets.
+
+    A limit of 0 disables the corresponding budget.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self._requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int = 0, requests: int = 1) -> float:
+        """
+        Waits until `requests` requests totalling `tokens` tokens fit in both budgets and
+        consumes them.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        started_at = time.monotonic()
+        async with self._lock:
+            while True:
+                wait = max(
+                    (
+                        self._requests.time_until_available(requests)
+                        if self._requests
+                        else 0.0
+                    ),
+                    (
+                        self._tokens.time_until_available(tokens)
+                        if self._tokens
+                        else 0.0
+                    ),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self._requests:
+                self._requests.consume(requests)
+            if self._tokens:
+                self._tokens.consume(tokens)
+        return time.monotonic() - started_at
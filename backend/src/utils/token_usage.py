@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Iterator, Optional
+
+from llama_index.core.base.llms.types import ChatResponse
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.llm import LLMChatEndEvent
+
+# Rough characters per token, for responses that do not report their usage
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_calls: int = 0
+    # Calls whose usage was estimated from the message lengths
+    estimated_calls: int = 0
+    # Prompt tokens served from the provider's prompt cache, see `prompt_cache`
+    cached_tokens: int = 0
+
+    def __post_init__(self):
+        # Async and streaming wrappers re-dispatch the end event of the call they wrap
+        self._last_response: Optional[ChatResponse] = None
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "total_tokens": self.total_tokens}
+
+
+current_token_usage: ContextVar[Optional[TokenUsage]] = ContextVar(
+    "current_token_usage",
+    default=None,
+)
+
+
+def get_reported_usage(response: ChatResponse) -> Optional[tuple[int, int]]:
+    """Returns the prompt and completion tokens reported by the LLM API, if any."""
+    raw = response.raw
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        usage = response.additional_kwargs
+    if isinstance(usage, dict):
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+    else:
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens is None or completion_tokens is None:
+        return None
+    return prompt_tokens, completion_tokens
+
+
+class TokenUsageHandler(BaseEventHandler):
+    """
+    Adds the tokens of every LLM chat call to the `TokenUsage` of the calling context.
+
+    Workflow steps and agents run in tasks that inherit the context they were started from,
+    so all the LLM calls of a workflow run count towards the usage tracked around it.
+    Streamed responses usually carry no usage, and are estimated from their length.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "TokenUsageHandler"
+
+    def handle(self, event: BaseEvent, **kwargs: Any) -> None:
+        usage = current_token_usage.get()
+        if usage is None or not isinstance(event, LLMChatEndEvent):
+            return
+        if event.response is None or event.response is usage._last_response:
+            return
+        usage._last_response = event.response
+
+        reported = get_reported_usage(event.response)
+        if reported is None:
+            prompt_chars = sum(
+                len(str(message.content or "")) for message in event.messages
+            )
+            completion_chars = len(str(event.response.message.content or ""))
+            reported = (
+                prompt_chars // CHARS_PER_TOKEN,
+                completion_chars // CHARS_PER_TOKEN,
+            )
+            usage.estimated_calls += 1
+
+        usage.prompt_tokens += reported[0]
+        usage.completion_tokens += reported[1]
+        usage.llm_calls += 1
+
+
+_handler: Optional[TokenUsageHandler] = None
+
+
+def instrument_token_usage() -> None:
+    """Registers the token usage handler with the root dispatcher, once per process."""
+    global _handler
+    if _handler is None:
+        _handler = TokenUsageHandler()
+        get_dispatcher().add_event_handler(_handler)
+
+
+@contextmanager
+def track_token_usage() -> Iterator[TokenUsage]:
+    """Collects the tokens of the LLM calls made within the block and its tasks."""
+    usage = TokenUsage()
+    token = current_token_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        current_token_usage.reset(token)
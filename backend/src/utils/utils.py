@@ -3,6 +3,7 @@ import csv
 import hashlib
 import json
 import textwrap
+from typing import Optional
 
 import json5
 import regex as re
@@ -12,11 +13,12 @@ from src.logging import logger
 from src.models.products import PersonalizedProductSection
 from src.repository.personalized_product_section import PersonalizedProductRepository
 from src.schemas.agents import UserQueryAgentResponse
-from src.schemas.enums import StatusEnum
+from src.schemas.enums import PersonalizationSource, StatusEnum
 
 
 async def add_user_preference_to_memory_during_migration(
-    data: list, memory: Memory
+    data: list,
+    memory: Memory,
 ) -> None:
     for row in data:
         user_id = row.get("id")
@@ -184,25 +186,64 @@ def format_variants(variants) -> list:
             "price": f"${variant.price}",
             "in_stock": variant.in_stock,
         }
-        for attribute in variant.attributes:
+        for attribute in sorted(
+            variant.attributes,
+            key=lambda attribute: attribute.attribute_name,
+        ):
             variant_data[attribute.attribute_name] = attribute.attribute_value
         formatted_variants.append(variant_data)
 
     return formatted_variants
 
 
+def to_prompt_json(value) -> str:
+    """Renders a value as JSON with sorted keys, so equal values render to the same text."""
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def format_agent_input(
+    task: str,
+    product: Optional[dict] = None,
+    variants: Optional[list] = None,
+    review_digest: Optional[dict] = None,
+    user_profile: Optional[dict] = None,
+) -> str:
+    """
+    Assembles an agent's message from its context and task, the most widely shared first.
+
+    Azure OpenAI caches prompt prefixes from 1024 tokens on. Following the agent's static
+    system prompt with the product and its reviews, the same for every user, then the
+    user's profile, and only then the task, lets calls of an agent reuse the cached prefix
+    across the users of a product and across the runs of a user.
+    """
+    sections = []
+    if product is not None:
+        sections.append(f"Product:\n{to_prompt_json(product)}")
+    if variants is not None:
+        sections.append(f"Product variants:\n{to_prompt_json(variants)}")
+    if review_digest is not None:
+        sections.append(f"Review digest:\n{to_prompt_json(review_digest)}")
+    if user_profile is not None:
+        sections.append(f"User profile:\n{to_prompt_json(user_profile)}")
+    sections.append(task)
+    return "\n\n".join(sections)
+
+
 async def set_personalization_status(
     db: AsyncSession,
     user_id: int,
     product_id: int,
     status: StatusEnum,
+    source: Optional[PersonalizationSource] = PersonalizationSource.ON_DEMAND,
 ) -> None:
-    """Set the status of the personalized product section."""
+    """Set the status of the personalized product section, keeping its source if None."""
     personalized_section = PersonalizedProductSection(
         product_id=product_id,
         user_id=user_id,
         status=status,
     )
+    if source is not None:
+        personalized_section.source = source.value
     await PersonalizedProductRepository(db).add_or_update(personalized_section)
     logger.info(
         "Personalized product section status set to running for user_id=%s, product_id=%s",
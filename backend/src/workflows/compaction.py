@@ -0,0 +1,182 @@
+from functools import lru_cache
+from typing import Callable
+
+import json5
+import tiktoken
+from src.config.config import settings
+from src.utils.utils import extract_json_blocks
+
+# Fields of each agent's output the presentation agent builds its cards from. The rest,
+# like the reasoning, never makes it into a card.
+AGENT_OUTPUT_FIELDS = {
+    "ProductPersonalizationCompletedEvent": ("product_information",),
+    "ReviewsCompletedEvent": ("review_summary",),
+    "InventoryCompletedEvent": ("message",),
+}
+
+_stats: dict[str, dict] = {}
+
+
+@lru_cache(maxsize=1)
+def get_encoding() -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(settings.LLM_MODEL)
+    except KeyError:
+        # Deployments can be named differently from their model
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokens = get_encoding().encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return get_encoding().decode(tokens[:max_tokens]) + "..."
+
+
+def summarize_variants(variants) -> dict:
+    """
+    Summarizes a product's variants into the ranges of their prices and attributes.
+
+    Attributes with one value across the variants are given as that value, numeric ones
+    as a "min - max" range, and the others as the list of their distinct values. Stock is
+    left to the inventory agent.
+    """
+    values: dict[str, set[str]] = {}
+    for variant in variants:
+        for attribute in variant.attributes:
+            values.setdefault(attribute.attribute_name, set()).add(
+                attribute.attribute_value,
+            )
+
+    prices = [variant.price for variant in variants]
+    return {
+        "variants": len(variants),
+        "price": _format_range([f"${price}" for price in sorted(prices)]),
+        "attributes": {
+            name: _summarize_values(values[name]) for name in sorted(values)
+        },
+    }
+
+
+def _summarize_values(values: set[str]):
+    if len(values) == 1:
+        return next(iter(values))
+    try:
+        numbers = sorted(values, key=float)
+    except ValueError:
+        return sorted(values)
+    return _format_range(numbers)
+
+
+def _format_range(ordered: list[str]):
+    if not ordered:
+        return None
+    if ordered[0] == ordered[-1]:
+        return ordered[0]
+    return f"{ordered[0]} - {ordered[-1]}"
+
+
+def trim_agent_output(event_name: str, result: str):
+    """Keeps the fields of an agent's JSON output the presentation uses, if it has them."""
+    blocks = extract_json_blocks(result)
+    if not blocks or event_name not in AGENT_OUTPUT_FIELDS:
+        return result
+    try:
+        output = json5.loads(blocks[0])
+    except ValueError:
+        return result
+    if not isinstance(output, dict):
+        return result
+    trimmed = {
+        field: output[field]
+        for field in AGENT_OUTPUT_FIELDS[event_name]
+        if field in output
+    }
+    return trimmed or result
+
+
+def drop_preferences(user_profile: dict, count: int, keep_last: int = 0) -> dict:
+    """
+    Drops the `count` least relevant memories from a user profile's preferences.
+
+    The preferences are the user's memories, most relevant first, followed by `keep_last`
+    messages not persisted yet, which are always kept.
+    """
+    if not count:
+        return user_profile
+    preferences = user_profile["user_preferences"]
+    persisted = len(preferences) - keep_last
+    return {
+        **user_profile,
+        "user_preferences": (
+            preferences[: max(persisted - count, 0)] + preferences[persisted:]
+        ),
+    }
+
+
+def truncate_strings(value, max_tokens: int):
+    """Truncates every string within a JSON-like value to `max_tokens`."""
+    if isinstance(value, str):
+        return truncate_to_tokens(value, max_tokens)
+    if isinstance(value, dict):
+        return {key: truncate_strings(item, max_tokens) for key, item in value.items()}
+    if isinstance(value, list):
+        return [truncate_strings(item, max_tokens) for item in value]
+    return value
+
+
+def longest_string_tokens(value) -> int:
+    """Returns the tokens of the longest string within a JSON-like value."""
+    if isinstance(value, str):
+        return count_tokens(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return max((longest_string_tokens(item) for item in value), default=0)
+    return 0
+
+
+def fit_to_budget(build: Callable[[int], str], levels: int, budget: int) -> str:
+    """
+    Returns the input built at the lowest compaction level that fits the token budget.
+
+    Args:
+        build (Callable[[int], str]): Builds the input at a level from 0 to `levels`,
+            higher levels building shorter inputs.
+        levels (int): The highest level.
+        budget (int): Tokens the input may use. When no level fits, the input built at
+            `levels` is returned.
+    """
+    low, high = 0, levels
+    while low < high:
+        level = (low + high) // 2
+        if count_tokens(build(level)) <= budget:
+            high = level
+        else:
+            low = level + 1
+    return build(low)
+
+
+def record_compaction(agent: str, original: str, compacted: str) -> int:
+    """Records the tokens of an agent's input before and after compaction."""
+    original_tokens = count_tokens(original)
+    tokens = count_tokens(compacted)
+    stats = _stats.setdefault(
+        agent,
+        {"inputs": 0, "original_tokens": 0, "tokens": 0},
+    )
+    stats["inputs"] += 1
+    stats["original_tokens"] += original_tokens
+    stats["tokens"] += tokens
+    return original_tokens - tokens
+
+
+def get_compaction_stats() -> dict:
+    return {
+        agent: {**stats, "tokens_saved": stats["original_tokens"] - stats["tokens"]}
+        for agent, stats in _stats.items()
+    }
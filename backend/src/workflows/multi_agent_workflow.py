@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import textwrap
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 import json5
 from llama_index.core.agent.types import BaseAgent
@@ -15,7 +15,6 @@ from llama_index.core.workflow import (
     step,
 )
 from llama_index.core.workflow.errors import WorkflowTimeoutError
-from mem0 import AsyncMemory
 from openinference.instrumentation.llama_index import get_current_span
 from src.agents.prompts import SELF_REFLECTION_PROMPT
 from src.config.config import settings
@@ -29,12 +28,28 @@ from src.repository import (
 )
 from src.schemas.enums import EventType
 from src.schemas.personalization import PersonalizationSection
+from src.services.memory import MemoryService
+from src.services.personalization_versions import get_catalog_versions
+from src.services.review_digests import get_review_digest
 from src.utils.utils import (
     convert_trace_id_to_hex,
     extract_json_blocks,
+    format_agent_input,
     format_variants,
+    to_prompt_json,
 )
+from src.workflows.compaction import (
+    drop_preferences,
+    fit_to_budget,
+    longest_string_tokens,
+    record_compaction,
+    summarize_variants,
+    trim_agent_output,
+    truncate_strings,
+)
+from src.workflows.provisional import AGENT_NAMES, format_provisional_cards
 from src.workflows.schemas import ProductSchema, UserSchema
+from src.workflows.speculation import Speculation, get_plan_history
 from src.workflows.utils import send_stream_event
 
 
@@ -74,16 +89,20 @@ class MultiAgentFlow(Workflow):
         product_personalization_agent: BaseAgent,
         inventory_agent: BaseAgent,
         reviews_agent: BaseAgent,
+        reviews_search_agent: BaseAgent,
         presentation_agent: BaseAgent,
         planning_agent: BaseAgent,
         evaluation_agent: BaseAgent,
-        memory: AsyncMemory,
+        memory: MemoryService,
         message_queue: Optional[asyncio.Queue] = None,
         fault_correction: bool = False,
+        fallback_agents: Optional[dict[str, BaseAgent]] = None,
         **kwargs,
     ):
         self.product_personalization_agent = product_personalization_agent
+        # Reviews agent of products with a review digest, and the one searching raw reviews
         self.reviews_agent = reviews_agent
+        self.reviews_search_agent = reviews_search_agent
         self.inventory_agent = inventory_agent
         self.presentation_agent = presentation_agent
         self.planning_agent = planning_agent
@@ -91,6 +110,7 @@ class MultiAgentFlow(Workflow):
         self.memory = memory
         self.message_queue = message_queue
         self.fault_correction = fault_correction
+        self.fallback_agents = fallback_agents or {}
 
         super().__init__(**kwargs)
 
@@ -111,24 +131,24 @@ class MultiAgentFlow(Workflow):
         )
         await self._setup_workflow_context(ctx, ev)
 
-        user_profile = await ctx.get("user_profile")
-        planning_agent_query = f"Generate an execution plan based on the following user profile\n \
-            user={user_profile} \n"
-
-        if hasattr(ev, "user_msg") and ev.user_msg:
-            planning_agent_query += f"\n and user query={ev.user_msg}"
-
-        planner_response = await self.planning_agent.run(planning_agent_query)
-
-        logger.info("Planning Result: %s", planner_response)
-
-        agents_to_call = extract_json_blocks(str(planner_response))
-        agents_to_call = json5.loads(agents_to_call[0]) if agents_to_call else []
-
-        # To showcase fault correction, we need to call the reviews agent
-        # even if it is not in the planner response
-        if self.fault_correction and "reviews" not in agents_to_call:
-            agents_to_call.append("reviews")
+        if getattr(ev, "agents", None):
+            # Refreshing a section: only the agents whose inputs changed run again, and
+            # the presentation merges their results into the previous section.
+            agents_to_call = ev.agents
+            await ctx.set("refreshed_agents", ev.agents)
+            await ctx.set(
+                "planned_agents",
+                getattr(ev, "planned_agents", None) or ev.agents,
+            )
+        else:
+            speculation = await self._speculate(ctx, ev)
+            try:
+                agents_to_call = await self._plan(ctx, ev)
+            except BaseException:
+                speculation.cancel()
+                raise
+            speculation.resolve(agents_to_call)
+            await ctx.set("planned_agents", agents_to_call)
 
         triggered_agents = []
 
@@ -150,21 +170,12 @@ class MultiAgentFlow(Workflow):
         ctx: Context,
         ev: ProductPersonalizationEvent,
     ) -> ProductPersonalizationCompletedEvent:
-        user_info = await ctx.get("user_profile")
-        product_info = await ctx.get("product_information")
-        vaiants_info = await ctx.get("product_variants")
-
-        try:
-            result = await self.product_personalization_agent.run(
-                f"""Personalize the product for user: {user_info},
-                product: {product_info}, product variants: {vaiants_info}""",
-                timeout=settings.PRODUCT_PERSONALIZATION_AGENT_TIMEOUT,
-            )
-        except WorkflowTimeoutError:
-            logger.info("Personalization Agent has timed out.")
-            result = "Personalization agent timed out. No response"
-
-        return ProductPersonalizationCompletedEvent(result=str(result))
+        result = await self._claim_or_run(
+            ctx,
+            "product_personalization",
+            lambda: self._personalize(ctx),
+        )
+        return ProductPersonalizationCompletedEvent(result=result)
 
     @step
     async def review(
@@ -172,51 +183,17 @@ class MultiAgentFlow(Workflow):
         ctx: Context,
         ev: ReviewsEvent,
     ) -> ReviewsCompletedEvent | EvaluationEvent:
-
-        user_info = await ctx.get("user_profile")
-        user_message = await ctx.get("user_msg")
-
-        self_reflection_prompt = ""
-        generate_error_prompt = ""
-
-        if self.fault_correction and not ev.self_reflection:
-            # To mock faulty output...
-            # Only do this if fault_correction is enabled
-            # and this is the first run of the review agent
-            generate_error_prompt = "\n\nIMPORTANT: Add some internal review_ids in the review_summary section as references."
-
-        if ev.self_reflection:
-            self_reflection_prompt = SELF_REFLECTION_PROMPT.format(
-                wrong_answer=ev.prev_result,
-                error=ev.self_reflection,
-            )
-
-        try:
-            prompt = textwrap.dedent(
-                f"""
-                {self_reflection_prompt}
-                Generate a summary of relevant reviews of the product based on the
-                user's preferences: {user_info['user_preferences']}
-                and the optional user query: {user_message}.
-                {generate_error_prompt}
-            """,
-            )
-
-            logger.debug("Review Prompt: %s", prompt)
-
-            result = await self.reviews_agent.run(
-                prompt,
-                timeout=settings.REVIEW_AGENT_TIMEOUT,
-            )
-
-        except WorkflowTimeoutError:
-            logger.info("Review Agent has timed out.")
-            result = "Review agent timed out. No response"
+        # Only the first run of the agent can have been speculated
+        result = await self._claim_or_run(
+            ctx,
+            "reviews",
+            lambda: self._summarize_reviews(ctx, ev),
+        )
 
         if self.fault_correction:
-            return EvaluationEvent(result=str(result))
+            return EvaluationEvent(result=result)
         else:
-            return ReviewsCompletedEvent(result=str(result))
+            return ReviewsCompletedEvent(result=result)
 
     @step
     async def evaluate_output(
@@ -254,25 +231,12 @@ class MultiAgentFlow(Workflow):
         ctx: Context,
         ev: InventoryEvent,
     ) -> InventoryCompletedEvent:
-        product_id = await ctx.get("product_id")
-        user_info = await ctx.get("user_profile")
-
-        try:
-            result = await self.inventory_agent.run(
-                textwrap.dedent(
-                    f"""
-                    Perform the inventory analysis for the following user profile and the product:
-                    User Profile: {user_info}
-                    Product id: {product_id}
-                    """,
-                ),
-                timeout=settings.INVENTORY_AGENT_TIMEOUT,
-            )
-        except WorkflowTimeoutError:
-            logger.info("Inventory Agent has timed out.")
-            result = "Inventory agent timed out. No response"
-
-        return InventoryCompletedEvent(result=str(result))
+        result = await self._claim_or_run(
+            ctx,
+            "inventory",
+            lambda: self._analyze_inventory(ctx),
+        )
+        return InventoryCompletedEvent(result=result)
 
     @step
     async def presentation(
@@ -287,6 +251,9 @@ class MultiAgentFlow(Workflow):
 
         trace_id = get_current_span().get_span_context().trace_id
 
+        # Shown as each agent completes, until the merged section below replaces them
+        await self._send_provisional_cards(ctx, ev)
+
         triggered_agents = await ctx.get("triggered_agents")
         result_current_agents = ctx.collect_events(
             ev,
@@ -301,17 +268,54 @@ class MultiAgentFlow(Workflow):
         )
 
         user_msg = await ctx.get("user_msg")
-
-        result = await self.presentation_agent.run(
-            textwrap.dedent(
+        refreshed_agents = await ctx.get("refreshed_agents", None)
+        refreshed_agents_prompt = ""
+        if refreshed_agents:
+            refreshed_agents_prompt = textwrap.dedent(
                 f"""
-                Here is the previous response and the current response. Synthesize and merge the
-                information intelligently.
-                previous_response={existing_personalized_section}
-                current_response={events_response}
-                user_query={user_msg}""",
+                Only the following agents were run again, as their inputs changed. Update the
+                parts of the previous response they cover and keep the rest unchanged:
+                {refreshed_agents}""",
+            )
+
+        def build(current_response: dict) -> str:
+            return (
+                textwrap.dedent(
+                    f"""
+                    Here is the previous response and the current response. Synthesize and merge the
+                    information intelligently.
+                    previous_response={to_prompt_json(existing_personalized_section)}
+                    current_response={to_prompt_json(current_response)}
+                    user_query={user_msg}""",
+                )
+                + refreshed_agents_prompt
+            )
+
+        # Only the fields the cards are built from are sent, and when that is still over
+        # budget, their texts are truncated evenly.
+        trimmed_response = {
+            name: trim_agent_output(name, result)
+            for name, result in events_response.items()
+        }
+        longest = longest_string_tokens(trimmed_response)
+        prompt = fit_to_budget(
+            lambda level: build(
+                (
+                    truncate_strings(trimmed_response, longest - level)
+                    if level
+                    else trimmed_response
+                ),
             ),
+            levels=longest,
+            budget=settings.PRESENTATION_AGENT_INPUT_TOKENS,
         )
+        await ctx.set(
+            "tokens_saved:presentation",
+            record_compaction("presentation", build(events_response), prompt),
+        )
+        self._report_tokens_saved(await self._get_tokens_saved(ctx))
+
+        result = await self.presentation_agent.run(prompt)
 
         extracted_json = extract_json_blocks(str(result))
         extracted_json = json5.loads(extracted_json[0]) if extracted_json else {}
@@ -326,6 +330,333 @@ class MultiAgentFlow(Workflow):
 
         return StopEvent(result=personalization_response)
 
+    async def _speculate(self, ctx: Context, ev: StartEvent) -> Speculation:
+        """
+        Starts the agents the planner is likely to pick, so they run while it plans.
+
+        Agents are likely when the planner picked them in at least
+        AGENT_SPECULATION_MIN_PLAN_RATE of its recent plans for runs with, or without, a
+        user message. With fault correction, the reviews agent always runs.
+        """
+        speculation = Speculation()
+        await ctx.set("speculation", speculation)
+        if not settings.AGENT_SPECULATION:
+            return speculation
+
+        runs = {
+            "product_personalization": lambda: self._personalize(ctx),
+            "reviews": lambda: self._summarize_reviews(ctx, ReviewsEvent()),
+            "inventory": lambda: self._analyze_inventory(ctx),
+        }
+        likely_agents = get_plan_history(
+            bool(getattr(ev, "user_msg", None)),
+        ).get_likely_agents(
+            list(runs),
+            settings.AGENT_SPECULATION_MIN_PLAN_RATE,
+        )
+        if self.fault_correction and "reviews" not in likely_agents:
+            likely_agents.append("reviews")
+
+        for name in likely_agents:
+            speculation.start(name, runs[name]())
+        logger.info("Speculatively started agents: %s", likely_agents)
+        return speculation
+
+    @staticmethod
+    async def _claim_or_run(
+        ctx: Context,
+        name: str,
+        run: Callable[[], Awaitable[str]],
+    ) -> str:
+        """Returns the result of the agent's speculated run, or runs it if none was started."""
+        speculation = await ctx.get("speculation", None)
+        task = speculation.claim(name) if speculation else None
+        if task is not None:
+            return await task
+        return await run()
+
+    async def _personalize(self, ctx: Context) -> str:
+        user_info = await ctx.get("user_profile")
+        product_info = await ctx.get("product_information")
+        vaiants_info = await ctx.get("product_variants")
+        variant_summary = await ctx.get("variant_summary")
+        task = "Personalize the product above for the user above."
+
+        prompt = await self._fit_input(
+            ctx,
+            "product_personalization",
+            original=format_agent_input(
+                task,
+                product=product_info,
+                variants=vaiants_info,
+                user_profile=user_info,
+            ),
+            build=lambda user_profile: format_agent_input(
+                task,
+                product=product_info,
+                variants=variant_summary,
+                user_profile=user_profile,
+            ),
+            user_profile=user_info,
+            budget=settings.PRODUCT_PERSONALIZATION_AGENT_INPUT_TOKENS,
+        )
+
+        try:
+            result = await self._run_agent(
+                "product_personalization",
+                self.product_personalization_agent,
+                prompt,
+                timeout=settings.PRODUCT_PERSONALIZATION_AGENT_TIMEOUT,
+            )
+        except WorkflowTimeoutError:
+            logger.info("Personalization Agent has timed out.")
+            result = "Personalization agent timed out. No response"
+
+        return str(result)
+
+    async def _summarize_reviews(self, ctx: Context, ev: ReviewsEvent) -> str:
+        user_info = await ctx.get("user_profile")
+        user_message = await ctx.get("user_msg")
+        review_digest = await get_review_digest(await ctx.get("product_id"))
+        # A digest without reviews may predate the product's first ones, which are only
+        # added to it by the next refresh, so the reviews are searched as without a digest.
+        if not review_digest.get("review_count"):
+            review_digest = None
+
+        self_reflection_prompt = ""
+        generate_error_prompt = ""
+
+        if self.fault_correction and not ev.self_reflection:
+            # To mock faulty output...
+            # Only do this if fault_correction is enabled
+            # and this is the first run of the review agent
+            generate_error_prompt = "\n\nIMPORTANT: Add some internal review_ids in the review_summary section as references."
+
+        if ev.self_reflection:
+            self_reflection_prompt = SELF_REFLECTION_PROMPT.format(
+                wrong_answer=ev.prev_result,
+                error=ev.self_reflection,
+            )
+
+        try:
+            # The reflection on a previous answer is only known now, so it goes last
+            task = textwrap.dedent(
+                f"""
+                Generate a summary of relevant reviews of the product based on the
+                user's preferences above and the optional user query: {user_message}.
+                {generate_error_prompt}
+                {self_reflection_prompt}
+                """,
+            )
+            preferences = {"user_preferences": user_info["user_preferences"]}
+            prompt = await self._fit_input(
+                ctx,
+                "reviews",
+                original=format_agent_input(
+                    task,
+                    review_digest=review_digest,
+                    user_profile=preferences,
+                ),
+                build=lambda user_profile: format_agent_input(
+                    task,
+                    review_digest=review_digest,
+                    user_profile=user_profile,
+                ),
+                user_profile=preferences,
+                budget=settings.REVIEW_AGENT_INPUT_TOKENS,
+            )
+
+            logger.debug("Review Prompt: %s", prompt)
+
+            # Only products without a digest of their reviews need them searched
+            if review_digest:
+                name, agent = "reviews", self.reviews_agent
+            else:
+                name, agent = "reviews_search", self.reviews_search_agent
+            result = await self._run_agent(
+                name,
+                agent,
+                prompt,
+                timeout=settings.REVIEW_AGENT_TIMEOUT,
+            )
+
+        except WorkflowTimeoutError:
+            logger.info("Review Agent has timed out.")
+            result = "Review agent timed out. No response"
+
+        return str(result)
+
+    async def _analyze_inventory(self, ctx: Context) -> str:
+        product_id = await ctx.get("product_id")
+        user_info = await ctx.get("user_profile")
+
+        def build(user_profile: dict) -> str:
+            return format_agent_input(
+                "Perform the inventory analysis for the user profile and the product above.",
+                product={"id": product_id},
+                user_profile=user_profile,
+            )
+
+        prompt = await self._fit_input(
+            ctx,
+            "inventory",
+            original=build(user_info),
+            build=build,
+            user_profile=user_info,
+            budget=settings.INVENTORY_AGENT_INPUT_TOKENS,
+        )
+
+        try:
+            result = await self._run_agent(
+                "inventory",
+                self.inventory_agent,
+                prompt,
+                timeout=settings.INVENTORY_AGENT_TIMEOUT,
+            )
+        except WorkflowTimeoutError:
+            logger.info("Inventory Agent has timed out.")
+            result = "Inventory agent timed out. No response"
+
+        return str(result)
+
+    async def _run_agent(
+        self,
+        name: str,
+        agent: BaseAgent,
+        prompt: str,
+        timeout: float,
+    ) -> str:
+        """
+        Runs an agent within its latency SLO of `timeout` seconds.
+
+        An agent with a fallback on the faster deployment gets the SLO minus
+        LLM_FALLBACK_TIMEOUT, and when it fails or times out, the fallback agent gets the
+        rest.
+
+        Raises:
+            WorkflowTimeoutError: When no agent answered within the SLO.
+        """
+        fallback = self.fallback_agents.get(name)
+        try:
+            return await self._run_agent_with_timeout(
+                agent,
+                prompt,
+                timeout - settings.LLM_FALLBACK_TIMEOUT if fallback else timeout,
+            )
+        except Exception as exc:
+            if fallback is None:
+                raise
+            logger.info("%s agent failed, falling back: %r", name, exc)
+
+        return await self._run_agent_with_timeout(
+            fallback,
+            prompt,
+            settings.LLM_FALLBACK_TIMEOUT,
+        )
+
+    @staticmethod
+    async def _run_agent_with_timeout(
+        agent: BaseAgent,
+        prompt: str,
+        timeout: float,
+    ) -> str:
+        handler = agent.run(prompt)
+        try:
+            return str(await asyncio.wait_for(asyncio.shield(handler), timeout))
+        except asyncio.TimeoutError as exc:
+            await handler.cancel_run()
+            raise WorkflowTimeoutError(f"Agent timed out after {timeout}s") from exc
+        except asyncio.CancelledError:
+            await handler.cancel_run()
+            raise
+
+    async def _plan(self, ctx: Context, ev: StartEvent) -> list[str]:
+        user_profile = await ctx.get("user_profile")
+        task = "Generate an execution plan based on the user profile above."
+        if hasattr(ev, "user_msg") and ev.user_msg:
+            task += f"\nUser query={ev.user_msg}"
+
+        prompt = await self._fit_input(
+            ctx,
+            "planning",
+            original=format_agent_input(task, user_profile=user_profile),
+            build=lambda profile: format_agent_input(task, user_profile=profile),
+            user_profile=user_profile,
+            budget=settings.PLANNING_AGENT_INPUT_TOKENS,
+        )
+        planner_response = await self.planning_agent.run(prompt)
+
+        logger.info("Planning Result: %s", planner_response)
+
+        agents_to_call = extract_json_blocks(str(planner_response))
+        agents_to_call = json5.loads(agents_to_call[0]) if agents_to_call else []
+        get_plan_history(bool(getattr(ev, "user_msg", None))).record(agents_to_call)
+
+        # To showcase fault correction, we need to call the reviews agent
+        # even if it is not in the planner response
+        if self.fault_correction and "reviews" not in agents_to_call:
+            agents_to_call.append("reviews")
+
+        return agents_to_call
+
+    async def _fit_input(
+        self,
+        ctx: Context,
+        name: str,
+        original: str,
+        build: Callable[[dict], str],
+        user_profile: dict,
+        budget: int,
+    ) -> str:
+        """
+        Fits an agent's message into its token budget, recording the tokens saved.
+
+        `build` renders the compacted message for a user profile. When it is over budget,
+        the user's least relevant memories are dropped from `user_profile` until it fits,
+        always keeping the messages not persisted yet.
+
+        Args:
+            original (str): The message without compaction, to count the tokens saved.
+        """
+        pending = await ctx.get("pending_preferences")
+        prompt = fit_to_budget(
+            lambda level: build(drop_preferences(user_profile, level, pending)),
+            levels=max(len(user_profile["user_preferences"]) - pending, 0),
+            budget=budget,
+        )
+        await ctx.set(f"tokens_saved:{name}", record_compaction(name, original, prompt))
+        return prompt
+
+    @staticmethod
+    async def _get_tokens_saved(ctx: Context) -> dict:
+        names = (
+            "planning",
+            "product_personalization",
+            "reviews",
+            "inventory",
+            "presentation",
+        )
+        return {name: await ctx.get(f"tokens_saved:{name}", 0) for name in names}
+
+    @staticmethod
+    def _report_tokens_saved(tokens_saved: dict) -> None:
+        total = sum(tokens_saved.values())
+        get_current_span().set_attribute("context_compaction.tokens_saved", total)
+        logger.info("Context compaction saved %s tokens: %s", total, tokens_saved)
+
+    async def _send_provisional_cards(self, ctx: Context, ev: Event) -> None:
+        if not self.message_queue or not settings.PROGRESSIVE_PERSONALIZATION:
+            return
+        event_name = ev.__class__.__name__
+        cards = format_provisional_cards(event_name, ev.result)
+        if cards:
+            await send_stream_event(
+                {"agent": AGENT_NAMES[event_name], "cards": cards},
+                EventType.PROVISIONAL_CARDS.value,
+                await ctx.get("product_id"),
+                self.message_queue,
+            )
+
     def _structure_events_response(self, events):
         """
         Structure the event responses into a dictionary.
@@ -339,9 +670,15 @@ class MultiAgentFlow(Workflow):
             variants = await VariantRepository(db).get_variants_by_product_id(
                 ev.product_id,
             )
+            # Read before the agents run, so changes made while they run make it stale
+            catalog_versions = await get_catalog_versions(db, ev.product_id)
 
+        # The memory is updated in the background; until then the message is returned as
+        # one of the user's preferences, so this run already takes it into account.
         if hasattr(ev, "user_msg") and ev.user_msg:
-            await self._update_user_memory(ev.product_id, ev.user_id, ev.user_msg)
+            self._update_user_memory(ev.product_id, ev.user_id, ev.user_msg)
+        # Counted first, so messages persisted meanwhile are kept as if still pending
+        pending_preferences = len(self.memory.get_pending_messages(ev.user_id))
         user_preferences = await self._get_user_preferences_from_memory(ev.user_id)
 
         user_info = UserSchema(**user.to_dict()).model_dump()
@@ -355,33 +692,29 @@ class MultiAgentFlow(Workflow):
         await ctx.set("user_profile", user_info)
         await ctx.set("product_information", product_info)
         await ctx.set("product_variants", variants_info)
+        await ctx.set("variant_summary", summarize_variants(variants))
+        await ctx.set("pending_preferences", pending_preferences)
+        await ctx.set("catalog_versions", catalog_versions)
 
     async def _get_user_preferences_from_memory(self, user_id: int) -> list[str]:
 
-        search_results = await self.memory.search(
-            query="User's specific preferences, likes, dislikes, past interactions, and shopping behavior patterns?",
-            user_id=str(user_id),
-        )
-
-        user_preferences_messages = search_results.get("results", [])
-
-        user_preferences = [
-            message.get("memory") for message in user_preferences_messages
-        ]
+        user_preferences = await self.memory.get_user_preferences(user_id)
         logger.info("Fetch user preferences: %s", user_preferences)
         return user_preferences
 
-    async def _update_user_memory(self, product_id: int, user_id: int, user_msg: str):
-        results = await self.memory.add(messages=user_msg, user_id=str(user_id))
-        logger.info("Update user memory: %s", results)
-        if len(results.get("results", [])) > 0 and self.message_queue:
-            await send_stream_event(
-                {"message": "Memory updated!"},
-                EventType.MEMORY.value,
-                product_id,
-                self.message_queue,
-            )
-            logger.info("Memory Updated")
+    def _update_user_memory(self, product_id: int, user_id: int, user_msg: str):
+        async def notify(results: dict):
+            logger.info("Update user memory: %s", results)
+            if self.message_queue:
+                await send_stream_event(
+                    {"message": "Memory updated!"},
+                    EventType.MEMORY.value,
+                    product_id,
+                    self.message_queue,
+                )
+                logger.info("Memory Updated")
+
+        self.memory.enqueue(user_msg, user_id, on_update=notify)
 
     async def _get_existing_personalized_section(self, ctx) -> Optional[dict]:
         user_id = await ctx.get("user_id")
@@ -421,5 +754,27 @@ class MultiAgentFlow(Workflow):
             "trace_id": convert_trace_id_to_hex(
                 trace_id,
             ),
+            "input_versions": await self._get_input_versions(ctx),
+            "agents": await ctx.get("planned_agents"),
         }
         return agent_response
+
+    async def _get_input_versions(self, ctx: Context) -> dict:
+        """
+        Returns the versions of the inputs the section was generated from.
+
+        The user's messages still queued for their memory, like the one of this run, were
+        given to the agents as preferences, so the memory changes they cause must not make
+        the section stale. Instead of waiting for them, their number is recorded as
+        `memory_pending`, which `get_stale_inputs` allows the memory version to move by.
+        """
+        user_id = await ctx.get("user_id")
+        # Counted before the version is read, so a write finishing in between is allowed for
+        memory_pending = len(self.memory.get_pending_messages(user_id))
+        async with Session() as db:
+            memory_version = await self.memory.get_version(user_id, db)
+        return {
+            **await ctx.get("catalog_versions"),
+            "memory": memory_version,
+            "memory_pending": memory_pending,
+        }
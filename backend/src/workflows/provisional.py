@@ -0,0 +1,63 @@
+from src.schemas.enums import PersonalizedCardTypes
+from src.schemas.personalization import ListItem, TextCard
+from src.workflows.compaction import trim_agent_output
+
+# Limits of the presentation agent's cards
+TEXT_CARD_CONTENT_LENGTH = 200
+LIST_CARD_ITEMS = 5
+
+AGENT_NAMES = {
+    "ProductPersonalizationCompletedEvent": "product_personalization",
+    "ReviewsCompletedEvent": "reviews",
+    "InventoryCompletedEvent": "inventory",
+}
+
+
+def _shorten(text: str, length: int) -> str:
+    return text if len(text) <= length else text[: length - 3].rstrip() + "..."
+
+
+def _text_card(title: str, content) -> list[dict]:
+    if not isinstance(content, str) or not content:
+        return []
+    card = TextCard(
+        type=PersonalizedCardTypes.TEXT_CARD.value,
+        title=title,
+        content=_shorten(content, TEXT_CARD_CONTENT_LENGTH),
+    )
+    return [card.model_dump()]
+
+
+def format_provisional_cards(event_name: str, result: str) -> list[dict]:
+    """
+    Formats an agent's output into cards shown until the presentation agent's section.
+
+    The cards are built without an LLM call, from the fields of the output the presentation
+    builds its cards from. Outputs without them, like timeouts, get no cards.
+    """
+    output = trim_agent_output(event_name, result)
+    if not isinstance(output, dict):
+        return []
+
+    if event_name == "ReviewsCompletedEvent":
+        return _text_card("What Reviewers Say", output.get("review_summary"))
+    if event_name == "InventoryCompletedEvent":
+        return _text_card("Availability", output.get("message"))
+
+    product_information = output.get("product_information") or {}
+    if not isinstance(product_information, dict):
+        return []
+    cards = _text_card("Made for You", product_information.get("custom_description"))
+    features = [
+        feature["feature"]
+        for feature in product_information.get("features_highlighting") or []
+        if isinstance(feature, dict) and feature.get("feature")
+    ]
+    if features:
+        card = ListItem(
+            type=PersonalizedCardTypes.LIST_CARD.value,
+            title="Highlights for You",
+            items=features[:LIST_CARD_ITEMS],
+        )
+        cards.append(card.model_dump())
+    return cards
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Optional
+
+# Plans the planner's pick rates are computed over, and needed before they are trusted
+PLAN_WINDOW = 200
+MIN_PLANS = 20
+
+
+class PlanHistory:
+    """How often the planner picked each agent in its latest `window` plans."""
+
+    def __init__(self, window: int = PLAN_WINDOW):
+        self.plans: deque[frozenset[str]] = deque(maxlen=window)
+
+    def record(self, agents: list[str]) -> None:
+        self.plans.append(frozenset(agents))
+
+    def rate(self, agent: str) -> Optional[float]:
+        if len(self.plans) < MIN_PLANS:
+            return None
+        return sum(agent in plan for plan in self.plans) / len(self.plans)
+
+    def get_likely_agents(self, agents: list[str], min_rate: float) -> list[str]:
+        """
+        Returns the agents picked in at least `min_rate` of the plans.
+
+        Until enough plans are known, every agent is likely, as the planner usually picks
+        them all.
+        """
+        return [
+            agent
+            for agent in agents
+            if (rate := self.rate(agent)) is None or rate >= min_rate
+        ]
+
+
+@dataclass
+class SpeculationStats:
+    speculated: int = 0
+    # Speculated agents the plan needed, and the seconds they ran before it was known
+    used: int = 0
+    saved_seconds: float = 0.0
+    # Speculated agents the plan did not need, and the seconds they ran until cancelled
+    cancelled: int = 0
+    wasted_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# Plans with a user query pick agents differently from plain personalizations
+_plan_histories = {True: PlanHistory(), False: PlanHistory()}
+_stats = SpeculationStats()
+
+
+def get_plan_history(has_user_msg: bool) -> PlanHistory:
+    return _plan_histories[has_user_msg]
+
+
+def get_speculation_stats() -> dict:
+    return {
+        **_stats.to_dict(),
+        "plan_rates": {
+            "with_user_msg": _get_rates(_plan_histories[True]),
+            "without_user_msg": _get_rates(_plan_histories[False]),
+        },
+    }
+
+
+def _get_rates(history: PlanHistory) -> dict:
+    agents = sorted(set().union(*history.plans))
+    return {agent: history.rate(agent) for agent in agents}
+
+
+class Speculation:
+    """
+    Agents of a workflow run started while its planner runs, on the bet it picks them.
+
+    Once the plan is known, `resolve` cancels the agents it does not need, and the steps
+    of the others `claim` their running task instead of starting the agent again.
+    """
+
+    def __init__(self):
+        self.tasks: dict[str, asyncio.Task] = {}
+        self.started_at: dict[str, float] = {}
+        self.finished_at: dict[str, float] = {}
+
+    def start(self, name: str, run: Awaitable[str]) -> None:
+        task = asyncio.create_task(run)
+        self.tasks[name] = task
+        self.started_at[name] = time.monotonic()
+        task.add_done_callback(
+            lambda _: self.finished_at.setdefault(name, time.monotonic()),
+        )
+        # Cancelled agents' errors are never awaited
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        _stats.speculated += 1
+
+    def resolve(self, plan: list[str]) -> None:
+        """Cancels the agents the plan does not need, counting the time saved and wasted."""
+        resolved_at = time.monotonic()
+        for name, task in list(self.tasks.items()):
+            ran = self.finished_at.get(name, resolved_at) - self.started_at[name]
+            if name in plan:
+                _stats.used += 1
+                _stats.saved_seconds += ran
+            else:
+                task.cancel()
+                del self.tasks[name]
+                _stats.cancelled += 1
+                _stats.wasted_seconds += ran
+
+    def cancel(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+
+    def claim(self, name: str) -> Optional[asyncio.Task]:
+        """Returns the task of a speculated agent the plan needs, at most once."""
+        return self.tasks.pop(name, None)
@@ -19,6 +19,8 @@ from src.repository import (
     ProductRepository,
     UserRepository,
 )
+from src.schemas.enums import PersonalizationSource
+from src.utils.rate_governor import Priority, request_priority
 from src.utils.utils import set_personalization_status
 from src.workflows.schemas import EventData
 
@@ -51,6 +53,7 @@ async def run_workflows_in_background(
                 user_id,
                 product_id,
                 StatusEnum.running,
+                PersonalizationSource.BACKGROUND,
             )
             await _add_workflow_task(
                 user_id,
@@ -108,21 +111,23 @@ async def _run_workflow_for_product(
     from src.services.agent_workflow import MultiAgentWorkflowService
 
     try:
-        workflow_service = MultiAgentWorkflowService(
-            user_id=user_id,
-            product_id=product_id,
-            llm=llm,
-            embed_model=embed_model,
-            vector_store_products_embeddings=vector_store_products_embeddings,
-            vector_store_reviews_embeddings=vector_store_reviews_embeddings,
-            filters=filters,
-            memory=memory,
-        )
-        response, trace_id = await workflow_service.run_workflow()
-        await workflow_service.save_workflow_response(
-            response,
-            trace_id,
-        )
+        # Prefetched sections yield the LLM to the requests of users waiting for a response
+        with request_priority(Priority.BACKGROUND):
+            workflow_service = MultiAgentWorkflowService(
+                user_id=user_id,
+                product_id=product_id,
+                llm=llm,
+                embed_model=embed_model,
+                vector_store_products_embeddings=vector_store_products_embeddings,
+                vector_store_reviews_embeddings=vector_store_reviews_embeddings,
+                filters=filters,
+                memory=memory,
+            )
+            response, trace_id = await workflow_service.run_workflow()
+            await workflow_service.save_workflow_response(
+                response,
+                trace_id,
+            )
     except Exception as e:
         logger.error(
             f"Error running workflow for user ID {user_id} and product ID {product_id}: {str(e)}",
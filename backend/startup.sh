@@ -5,6 +5,9 @@ alembic upgrade head
 # Default to development if not set
 ENV=${ENVIRONMENT:-dev}
 
+# Read by the app to split the database connection budget between workers
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-8}
+
 if [ "$ENV" = "prod" ]; then
   echo "Starting in production mode..."
   uvicorn src.main:app \
@@ -12,7 +15,7 @@ if [ "$ENV" = "prod" ]; then
     --port 8000 \
     --access-log \
     --log-config logging_config.yaml \
-    --workers 8
+    --workers "$WEB_CONCURRENCY"
 else
   echo "Starting in development mode..."
   uvicorn src.main:app \
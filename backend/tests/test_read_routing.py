@@ -0,0 +1,57 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src import database
+from src.middleware.user_middleware import add_user_id_to_request
+from src.services.catalog_cache import NOTIFY_CHANNEL, CatalogCache
+from starlette.background import BackgroundTask
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.middleware("http")(add_user_id_to_request)
+    app.state.catalog_cache = CatalogCache(shared=False)
+
+    @app.post("/search")
+    async def search():
+        async def save_search():
+            # Stands for the commit of the search history, made once the response is sent
+            database.mark_user_write(None)
+
+        return StreamingResponse(
+            iter(['{"event": "search"}\n']),
+            media_type="application/x-ndjson",
+            background=BackgroundTask(save_search),
+        )
+
+    @app.get("/read")
+    async def read():
+        return {"primary": database.get_read_session_factory() is database.Session}
+
+    return app
+
+
+def test_search_then_read_is_routed_to_primary(monkeypatch):
+    app = create_app()
+    monkeypatch.setattr(database, "ReadSession", async_sessionmaker())
+    monkeypatch.setattr(database, "_replica_unavailable_until", 0.0)
+
+    async def publish_user_write(user_id: int) -> None:
+        # Delivers the bump as the listener would, without a database
+        key = CatalogCache.user_writes_key(user_id)
+        app.state.catalog_cache._on_notify(None, 0, NOTIFY_CHANNEL, f"{key}=1")
+
+    monkeypatch.setattr(database, "_publish_user_write", publish_user_write)
+
+    with TestClient(app) as client:
+        response = client.post("/search", headers={"X-User-ID": "1"})
+        assert response.status_code == 200
+        # The write happened after the headers were sent, so they carry no marker
+        assert "X-Last-Write-At" not in response.headers
+
+        read = client.get("/read", headers={"X-User-ID": "1"})
+        assert read.json() == {"primary": True}
+
+        other_user = client.get("/read", headers={"X-User-ID": "2"})
+        assert other_user.json() == {"primary": False}
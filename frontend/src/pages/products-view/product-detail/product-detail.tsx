@@ -158,6 +158,15 @@ const ProductDetailPage = () => {
     return null;
   }, [isStreaming, streamData]);
 
+  // Cards of the agents completed so far, shown until the final section replaces them
+  const provisionalData = useMemo(() => {
+    if (!isStreaming || !Array.isArray(streamData)) return null;
+    const cards = streamData
+      .filter((item) => item.type === 'provisional_cards')
+      .flatMap((item) => item.data?.cards || []);
+    return cards.length > 0 ? { personalization: cards } : null;
+  }, [isStreaming, streamData]);
+
   useEffect(() => {
     if (!isSomething(streamData)) setContentType('product_detail');
     else setContentType(streamData?.[0]?.type);
@@ -205,7 +214,7 @@ const ProductDetailPage = () => {
             />
           </Section>
           <PersonalizedSection
-            personalizationStreamingData={personalizationData}
+            personalizationStreamingData={personalizationData ?? provisionalData ?? undefined}
             enableErrorCorrection={enableErrorCorrection}
           />
         </Grid>
@@ -214,7 +223,9 @@ const ProductDetailPage = () => {
         </CenteredNavigation>
         <ProductSections product={product} />
       </Container>
-      {isStreaming && <OverlayWithSpinner loadingInfoText={workFlowUpdateMessage?.streamingMessage} />}
+      {isStreaming && !provisionalData && (
+        <OverlayWithSpinner loadingInfoText={workFlowUpdateMessage?.streamingMessage} />
+      )}
     </ProductLayout>
   );
 };
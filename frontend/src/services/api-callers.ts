@@ -3,7 +3,12 @@ import { useQuery, useQueryClient, UseQueryResult } from '@tanstack/react-query'
 import axios from 'axios';
 import { BASE_URL } from 'constants/constants';
 import { useCallback, useState } from 'react';
-import { getUserIdFromSession } from 'utils/common-functions';
+import {
+  getLastWriteFromSession,
+  getUserIdFromSession,
+  LAST_WRITE_HEADER,
+  saveLastWriteToSession,
+} from 'utils/common-functions';
 
 // Axios instance with interceptor
 const axiosInstance = axios.create({
@@ -18,9 +23,20 @@ axiosInstance.interceptors.request.use((config) => {
     // eslint-disable-next-line no-param-reassign
     config.headers['X-User-Id'] = userId; // Add the X-User-Id header
   }
+  const lastWriteAt = getLastWriteFromSession();
+  if (lastWriteAt) {
+    // eslint-disable-next-line no-param-reassign
+    config.headers[LAST_WRITE_HEADER] = lastWriteAt;
+  }
   return config;
 });
 
+// Keep when the backend last saw this client write
+axiosInstance.interceptors.response.use((response) => {
+  saveLastWriteToSession(response.headers[LAST_WRITE_HEADER.toLowerCase()]);
+  return response;
+});
+
 // Fetcher function using Axios instance
 const fetcher = async <T>(endpoint: string): Promise<T> => {
   const response = await axiosInstance.get<T>(endpoint);
@@ -95,6 +111,7 @@ export function useStreamingSearch() {
     async (body: Record<string, unknown>, endpoint: string) => {
       const { product_id, user_query } = body;
       const userId = getUserIdFromSession();
+      const lastWriteAt = getLastWriteFromSession();
       const queryKey = ['productSearch', product_id, user_query];
 
       setIsLoading(true);
@@ -108,9 +125,11 @@ export function useStreamingSearch() {
           headers: {
             'Content-Type': 'application/json',
             ...(userId ? { 'X-User-Id': userId } : {}),
+            ...(lastWriteAt ? { [LAST_WRITE_HEADER]: lastWriteAt } : {}),
           },
           body: JSON.stringify(body),
         });
+        saveLastWriteToSession(response.headers.get(LAST_WRITE_HEADER));
         if (!response.ok) {
           throw new Error(`HTTP error! Status: ${response.status}`);
         }
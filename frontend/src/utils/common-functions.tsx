@@ -31,6 +31,15 @@ export default isSomething;
 
 export const getUserIdFromSession = (): string | null => sessionStorage.getItem('userId');
 
+// When the backend last saw this client write, echoed back so its reads see the writes
+export const LAST_WRITE_HEADER = 'X-Last-Write-At';
+
+export const getLastWriteFromSession = (): string | null => sessionStorage.getItem('lastWriteAt');
+
+export const saveLastWriteToSession = (lastWriteAt: string | null | undefined) => {
+  if (lastWriteAt) sessionStorage.setItem('lastWriteAt', lastWriteAt);
+};
+
 // Function to get color value from the color name
 type ColorName = keyof typeof COLOR_MAP;
 